@@ -1,8 +1,10 @@
 # app/__init__.py
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from config import Config
-from .extensions import db, bcrypt, jwt
+from .extensions import db, bcrypt, jwt, password_hasher, blob_store
+from . import db_routing
+from .json_provider import FastJSONProvider
 
 
 def create_app():
@@ -16,10 +18,22 @@ def create_app():
     app.config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False)
     app.config.setdefault("JWT_SECRET_KEY", "super-secret-key")
 
+    # JSON 輸出：有 orjson 就用 orjson，datetime 直接輸出 ISO 8601
+    app.json = FastJSONProvider(app)
+
+    # 讀取用的 replica，各自變成一個 bind（replica_0, replica_1, ...）
+    replica_urls = app.config.get("REPLICA_DATABASE_URLS") or []
+    if replica_urls:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds.update(db_routing.replica_binds(replica_urls))
+        app.config["SQLALCHEMY_BINDS"] = binds
+
     # === 初始化 extensions（每個只呼叫一次）===
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
+    password_hasher.init_app(app, bcrypt)
+    blob_store.init_app(app)
 
     # === import models & blueprints（放在 init_app 之後，避免循環引用）===
     from . import models  # 確保資料表的 model 都載入
@@ -29,10 +43,28 @@ def create_app():
     from .routes.version_routes import version_bp
     from .routes.tag_routes import tag_bp
     from .routes.search_routes import search_bp
+    from .routes.job_routes import job_bp
+    from .routes.asset_routes import asset_bp
+
+    from . import (
+        assets, authz, history_index, job_handlers, jobs, metrics, migrations,
+        project_stats, prompt_store, search_index,
+    )
 
-    # === 建立所有資料表 ===
-    with app.app_context():
-        db.create_all()
+    # === 資料表 ===
+    # 啟動時不建表、不反射 schema；建表 / 升級是部署步驟：flask db-upgrade
+    # 第一個請求進來時只查一次 schema 版本，資料庫還沒升級就回 503
+    migrations.init_app(app)
+    db_routing.init_app(app)
+
+    search_index.init_app(app)
+    history_index.init_app(app)
+    project_stats.init_app(app)
+    authz.configure(app)
+    prompt_store.init_app(app)
+    assets.init_app(app)
+    # 背景工作（job_handlers 在 import 時註冊各種工作）
+    jobs.init_app(app)
 
     # === 註冊藍圖 ===
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -41,10 +73,22 @@ def create_app():
     app.register_blueprint(version_bp, url_prefix="/api/versions")
     app.register_blueprint(tag_bp, url_prefix="/api/tags")
     app.register_blueprint(search_bp, url_prefix="/api/search")
+    app.register_blueprint(job_bp, url_prefix="/api/jobs")
+    app.register_blueprint(asset_bp, url_prefix="/api/assets")
 
     # ✅ Health Check（不碰資料庫）
     @app.route("/api/health", methods=["GET"])
     def health():
         return jsonify({"status": "ok"}), 200
 
+    # Prometheus 格式的請求統計（各 endpoint 的延遲、SQL、序列化等 histogram）
+    @app.route("/api/metrics", methods=["GET"], endpoint=metrics.METRICS_ENDPOINT)
+    def metrics_endpoint():
+        if not metrics.metrics_allowed():
+            return jsonify({"message": "沒有權限讀取 metrics"}), 403
+        return Response(metrics.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    # 每個請求的 SQL / JWT / view / JSON 計時（要在所有 route 註冊完之後）
+    metrics.init_app(app)
+
     return app
@@ -0,0 +1,133 @@
+# app/assets.py
+# 上傳檔案的中繼資料與權限；檔案本身存在 blob_store，這裡管 asset / project_asset 兩張表
+# - ContentVersion.file_url 可以填上傳 API 回傳的 /api/assets/<sha256>，
+#   寫入版本時會檢查這個檔案有上傳到同一個專案
+# - 同樣內容被多個專案上傳時檔案只存一份，各專案各自一筆 project_asset
+import time
+
+import click
+from sqlalchemy import select
+
+from .authz import get_project_roles
+from .blob_store import SHA256_RE
+from .extensions import blob_store, db
+from .models import Asset, ProjectAsset
+from .tagging import dialect_insert
+
+ASSET_URL_PREFIX = "/api/assets/"
+
+FILENAME_MAX = ProjectAsset.__table__.c.filename.type.length
+CONTENT_TYPE_MAX = Asset.__table__.c.content_type.type.length
+
+# 下載時可以直接在瀏覽器開（inline）的類型；其他一律當附件下載，
+# 上傳者自己填的 text/html、image/svg+xml 之類才不會在 API 的網域上執行（stored XSS）
+INLINE_CONTENT_TYPES = frozenset({
+    "image/png", "image/jpeg", "image/gif", "image/webp", "image/avif",
+    "audio/mpeg", "audio/ogg", "audio/wav", "audio/webm",
+    "video/mp4", "video/webm", "video/ogg",
+    "text/plain",
+})
+
+
+def asset_url(sha256):
+    return ASSET_URL_PREFIX + sha256
+
+
+def missing_assets(session, project_id, file_urls):
+    """
+    file_urls 裡指向 /api/assets/ 的網址，檔案不存在或沒有上傳到這個專案的那些（set）
+    其他網址（外部連結、None）不檢查
+    """
+    wanted = {
+        url: url[len(ASSET_URL_PREFIX):]
+        for url in file_urls
+        if isinstance(url, str) and url.startswith(ASSET_URL_PREFIX)
+    }
+    valid = sorted({sha for sha in wanted.values() if SHA256_RE.match(sha)})
+    found = set()
+    if valid:
+        found = set(session.scalars(
+            select(ProjectAsset.sha256)
+            .where(ProjectAsset.project_id == project_id, ProjectAsset.sha256.in_(valid))
+        ))
+    return {url for url, sha in wanted.items() if sha not in found}
+
+
+def inline_allowed(content_type):
+    return (content_type or "").split(";")[0].strip().lower() in INLINE_CONTENT_TYPES
+
+
+def register(session, project_id, user_id, sha256, size, content_type, filename=None):
+    """
+    記錄上傳的檔案（不會 commit）；已經有紀錄就略過
+    回傳 (Content-Type（以第一次上傳的為準）, 這個專案是不是第一次有這個檔案)
+    只看這個專案：別的專案有沒有同樣的檔案不能讓上傳的人知道
+    """
+    asset = {
+        "sha256": sha256,
+        "size": size,
+        "content_type": content_type[:CONTENT_TYPE_MAX],
+    }
+    link = {
+        "sha256": sha256,
+        "project_id": project_id,
+        "filename": filename[:FILENAME_MAX] if filename else None,
+        "created_by": user_id,
+    }
+    insert = dialect_insert(session.get_bind().dialect.name)
+    if insert is not None:
+        session.execute(
+            insert(Asset).values(**asset).on_conflict_do_nothing(index_elements=["sha256"])
+        )
+        linked = session.execute(
+            insert(ProjectAsset).values(**link)
+            .on_conflict_do_nothing(index_elements=["sha256", "project_id"])
+        ).rowcount > 0
+    else:
+        if session.get(Asset, sha256) is None:
+            session.add(Asset(**asset))
+        linked = session.get(ProjectAsset, (sha256, project_id)) is None
+        if linked:
+            session.add(ProjectAsset(**link))
+        session.flush()
+    content_type = session.scalar(select(Asset.content_type).where(Asset.sha256 == sha256))
+    return content_type, linked
+
+
+def readable_asset(user_id, sha256):
+    """使用者看得到的檔案（Asset）；檔案不存在或沒有權限都回傳 None"""
+    project_ids = sorted(get_project_roles(user_id))
+    if not project_ids:
+        return None
+    return db.session.scalars(
+        select(Asset)
+        .join(ProjectAsset, ProjectAsset.sha256 == Asset.sha256)
+        .where(Asset.sha256 == sha256, ProjectAsset.project_id.in_(project_ids))
+        .limit(1)
+    ).first()
+
+
+# ======================
+# Flask 整合
+# ======================
+def init_app(app):
+    @app.cli.command("assets-gc")
+    @click.option("--min-age", type=int, default=3600,
+                  help="只處理超過幾秒沒動過的檔案（正在上傳的不會被刪）")
+    def assets_gc(min_age):
+        """刪除上傳到一半的暫存檔，以及資料庫裡沒有紀錄的檔案"""
+        stale = blob_store.remove_stale_uploads(min_age)
+
+        cutoff = time.time() - min_age
+        candidates = [sha for sha, mtime in blob_store.iter_blobs() if mtime < cutoff]
+        orphans = 0
+        for i in range(0, len(candidates), 1000):
+            chunk = candidates[i:i + 1000]
+            known = set(db.session.scalars(
+                select(Asset.sha256).where(Asset.sha256.in_(chunk))
+            ))
+            for sha in chunk:
+                if sha not in known:
+                    blob_store.remove(sha)
+                    orphans += 1
+        click.echo(f"已刪除 {stale} 個暫存檔、{orphans} 個沒有紀錄的檔案")
@@ -0,0 +1,144 @@
+# app/authz.py
+# 專案權限檢查：所有 blueprint 共用
+# - 同一個 request 內只查一次（存在 flask.g）
+# - process 內用 TTL + LRU 快取 user_id -> {project_id: role}
+# - ProjectMember 有變動時自動清掉相關使用者的快取（只清得到這個 process 的；
+#   其他 process 最久要等 AUTHZ_CACHE_TTL 秒才會看到，見 config.py）
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_app_context
+from sqlalchemy import event, inspect, select
+
+from .extensions import db
+from .models import ProjectMember
+
+# 角色權限大小：owner > editor > viewer
+ROLE_RANK = {"viewer": 1, "editor": 2, "owner": 3}
+
+_PENDING_KEY = "authz_dirty_user_ids"
+
+
+class MembershipCache:
+    """執行緒安全的 TTL + LRU 快取"""
+
+    def __init__(self, ttl=30.0, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_cache = MembershipCache()
+
+
+def configure(app):
+    _cache.ttl = app.config.get("AUTHZ_CACHE_TTL", 30)
+    _cache.maxsize = app.config.get("AUTHZ_CACHE_SIZE", 10000)
+    _cache.clear()
+
+
+def get_project_roles(user_id):
+    """回傳 {project_id: role}，這個使用者參與的所有專案"""
+    user_id = int(user_id)
+
+    memo = g.setdefault("_project_roles", {})
+    if user_id in memo:
+        return memo[user_id]
+
+    roles = _cache.get(user_id)
+    if roles is None:
+        # 一定讀 primary：replica 落後時會把剛加入的專案當成沒權限，還被快取 AUTHZ_CACHE_TTL 秒
+        rows = db.session.execute(
+            select(ProjectMember.project_id, ProjectMember.role)
+            .where(ProjectMember.user_id == user_id),
+            bind_arguments={"bind": db.engine},
+        ).all()
+        roles = {project_id: role for project_id, role in rows}
+        _cache.set(user_id, roles)
+
+    memo[user_id] = roles
+    return roles
+
+
+def project_role(user_id, project_id):
+    """使用者在這個專案的角色，不是成員就回傳 None"""
+    return get_project_roles(user_id).get(int(project_id))
+
+
+def user_in_project(user_id, project_id, min_role="viewer"):
+    """是不是專案成員，而且角色至少是 min_role"""
+    role = project_role(user_id, project_id)
+    if role is None:
+        return False
+    return ROLE_RANK.get(role, 0) >= ROLE_RANK[min_role]
+
+
+def invalidate_user(user_id):
+    _cache.discard(int(user_id))
+    if has_app_context():
+        g.get("_project_roles", {}).pop(int(user_id), None)
+
+
+# ======================
+# ProjectMember 變動時清快取
+# ======================
+@event.listens_for(db.session, "after_flush")
+def _collect_membership_changes(session, flush_context):
+    user_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, ProjectMember):
+            continue
+        user_ids.add(obj.user_id)
+        # user_id 被改掉時，原本那個使用者的快取也要清（after_flush 時 history 還在）
+        user_ids.update(inspect(obj).attrs.user_id.history.deleted)
+    user_ids.discard(None)
+    if not user_ids:
+        return
+    # 同一個 request 之後的檢查要看到這次的變動
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_after_commit(session):
+    # commit 前別的 thread 可能又把舊資料放回快取，commit 後再清一次
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_pending(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_user(user_id)
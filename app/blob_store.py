@@ -0,0 +1,120 @@
+# app/blob_store.py
+# 內容定址的檔案儲存（本機目錄），檔名就是內容的 SHA-256
+# - 上傳邊讀邊寫到暫存檔、邊算雜湊，不會把整個檔案放進記憶體
+# - 算完雜湊才知道檔名：已經有同樣內容的檔案就直接丟掉暫存檔（去重）
+# - 目錄分兩層（ab/cd/abcd...），單一目錄不會塞太多檔案
+# 檔案一旦寫入就不會再變，下載可以放心用很長的快取
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+# 每次從 request stream 讀多少
+CHUNK_SIZE = 1024 * 1024
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobTooLarge(Exception):
+    """檔案超過 ASSET_MAX_BYTES"""
+
+
+class BlobMismatch(Exception):
+    """上傳的內容跟用戶端宣告的 SHA-256 不一樣"""
+
+
+class BlobStore:
+    def __init__(self):
+        self.root = None
+        self.max_bytes = None
+
+    def init_app(self, app):
+        self.root = app.config.get("ASSET_STORE_DIR") or os.path.join(
+            app.instance_path, "assets"
+        )
+        self.max_bytes = app.config.get("ASSET_MAX_BYTES") or None
+
+    @property
+    def tmp_dir(self):
+        return os.path.join(self.root, "tmp")
+
+    def relative_path(self, sha256):
+        return os.path.join(sha256[:2], sha256[2:4], sha256)
+
+    def path(self, sha256):
+        return os.path.join(self.root, self.relative_path(sha256))
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def save_stream(self, stream, expected_sha256=None):
+        """
+        把 stream（有 read(n) 的物件）存起來，回傳 (sha256, size, created)
+        created 是 False 代表同樣內容的檔案本來就有了
+        超過 max_bytes 丟 BlobTooLarge，跟 expected_sha256 不符丟 BlobMismatch（都不會留下檔案）
+        """
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        # 暫存檔跟正式檔案在同一個檔案系統，最後 os.replace 是原子的
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".upload")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if self.max_bytes is not None and size > self.max_bytes:
+                        raise BlobTooLarge()
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            sha256 = digest.hexdigest()
+            if expected_sha256 is not None and expected_sha256 != sha256:
+                raise BlobMismatch()
+
+            final = self.path(sha256)
+            if os.path.exists(final):
+                # 同樣的內容已經存過了；更新時間，清理時不會被當成孤兒檔
+                os.utime(final)
+                os.remove(tmp_path)
+                return sha256, size, False
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(tmp_path, final)
+            return sha256, size, True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def iter_blobs(self):
+        """所有已存的檔案：(sha256, 最後修改時間)"""
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if os.path.abspath(dirpath) == os.path.abspath(self.tmp_dir):
+                dirnames[:] = []
+                continue
+            for name in filenames:
+                if SHA256_RE.match(name):
+                    yield name, os.path.getmtime(os.path.join(dirpath, name))
+
+    def remove_stale_uploads(self, max_age):
+        """刪掉超過 max_age 秒的暫存檔（上傳到一半 process 掛掉留下的），回傳刪了幾個"""
+        if not os.path.isdir(self.tmp_dir):
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def remove(self, sha256):
+        path = self.path(sha256)
+        if os.path.exists(path):
+            os.remove(path)
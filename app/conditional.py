@@ -0,0 +1,79 @@
+# app/conditional.py
+# 列表 API 的 ETag / Last-Modified（conditional GET）
+# validator 用一條聚合查詢（筆數、最大 id、最新時間）算出來，
+# 跟 If-None-Match / If-Modified-Since 對得上就直接回 304，不用撈資料、不用序列化
+import hashlib
+
+from flask import Response, request
+from sqlalchemy import func, select
+
+from .extensions import db
+from .models import Content, ContentVersion
+
+
+def _etag(kind, key, *parts):
+    # 分頁參數不同，回應內容也不同，要一起算進去
+    raw = "|".join(
+        [kind, str(key), request.query_string.decode("utf-8", "replace")]
+        + [str(p) for p in parts]
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def project_contents_validators(project_id):
+    """
+    專案 content 列表：筆數、最大 content_id、最大 latest_version_id，
+    以及 content / 最新版本兩邊最新的 created_at（新增版本也算修改）
+    """
+    count, max_id, max_version, content_at, version_at = db.session.execute(
+        select(
+            func.count(Content.content_id),
+            func.max(Content.content_id),
+            func.max(Content.latest_version_id),
+            func.max(Content.created_at),
+            func.max(ContentVersion.created_at),
+        )
+        .select_from(Content)
+        .outerjoin(ContentVersion, ContentVersion.version_id == Content.latest_version_id)
+        .where(Content.project_id == project_id)
+    ).one()
+    last_modified = max((t for t in (content_at, version_at) if t), default=None)
+    etag = _etag("contents", project_id, count, max_id, max_version, last_modified)
+    return etag, last_modified
+
+
+def content_versions_validators(content_id):
+    """content 的版本列表：筆數、最大 version_id、最新 created_at"""
+    count, max_id, last_modified = db.session.execute(
+        select(
+            func.count(ContentVersion.version_id),
+            func.max(ContentVersion.version_id),
+            func.max(ContentVersion.created_at),
+        ).where(ContentVersion.content_id == content_id)
+    ).one()
+    etag = _etag("versions", content_id, count, max_id, last_modified)
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified):
+    """client 手上的版本還是最新的嗎（If-None-Match 優先）"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        # HTTP 時間只到秒；資料庫存的是 UTC naive datetime
+        since = request.if_modified_since.replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def with_validators(response, etag, last_modified):
+    """把 ETag / Last-Modified 加到回應上；client 每次都要重新驗證"""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    return with_validators(Response(status=304), etag, last_modified)
@@ -0,0 +1,107 @@
+# app/db_routing.py
+# 讀寫分離：GET / HEAD 的查詢走 replica，其餘走 primary
+# - 同一個 request 裡寫過（flush 過）之後，後面的讀取都留在 primary（read-after-write）
+# - 寫入 commit 後，同一個用戶端 REPLICA_STALE_SECONDS 秒內的讀取都走 primary：
+#   寫入時間放在 cookie（WRITE_COOKIE）裡帶回來，不管下一個請求落在哪個 worker / 機器都有效
+# - 沒有設定 REPLICA_DATABASE_URLS 時完全等於原本的單一資料庫
+import math
+import random
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND_PREFIX = "replica_"
+
+_READ_METHODS = ("GET", "HEAD")
+_WROTE_KEY = "routing_wrote"
+_REPLICA_KEY = "routing_replica"
+
+# 用戶端最後一次寫入的時間（epoch 秒）；偽造只會讓自己的讀取走 primary
+WRITE_COOKIE = "db_last_write"
+
+
+def replica_binds(replica_urls):
+    """把 REPLICA_DATABASE_URLS 轉成 SQLALCHEMY_BINDS 的項目"""
+    return {f"{REPLICA_BIND_PREFIX}{i}": url for i, url in enumerate(replica_urls)}
+
+
+def mark_primary_write():
+    """這個請求寫入了資料庫：回應時設定 cookie（見 init_app）"""
+    if has_request_context():
+        g._db_wrote_at = time.time()
+
+
+def replica_is_stale():
+    """這個用戶端最近寫過，replica 可能還沒追上"""
+    window = current_app.config.get("REPLICA_STALE_SECONDS", 0)
+    if g.get("_db_wrote_at") is not None:
+        return True
+    try:
+        at = float(request.cookies.get(WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    # 各機器的時鐘可能差一點，時間在未來也算剛寫過
+    return time.time() - at < window
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not self._use_replica():
+            return primary
+
+        engines = self._db.engines
+        if primary is not engines.get(None):
+            # 有指定 __bind_key__ 的 model 照原本的 bind
+            return primary
+
+        key = self.info.get(_REPLICA_KEY)
+        if key is None:
+            replicas = [k for k in engines if isinstance(k, str)
+                        and k.startswith(REPLICA_BIND_PREFIX)]
+            if not replicas:
+                return primary
+            # 同一個 session 固定用同一台 replica，讀到的資料才一致
+            key = self.info[_REPLICA_KEY] = random.choice(replicas)
+        return engines[key]
+
+    def _use_replica(self):
+        if self._flushing or self.info.get(_WROTE_KEY):
+            return False
+        if not has_request_context() or request.method not in _READ_METHODS:
+            return False
+        return not replica_is_stale()
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_write(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _remember_bulk_write(orm_execute_state):
+    # session.execute(insert/update/delete) 不會觸發 flush，一樣要記成寫入
+    if (orm_execute_state.is_insert or orm_execute_state.is_update
+            or orm_execute_state.is_delete):
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_write_time(session):
+    if session.info.get(_WROTE_KEY):
+        mark_primary_write()
+
+
+def init_app(app):
+    @app.after_request
+    def _set_write_cookie(response):
+        at = g.get("_db_wrote_at")
+        window = app.config.get("REPLICA_STALE_SECONDS", 0)
+        if at is not None and window > 0 and app.config.get("REPLICA_DATABASE_URLS"):
+            response.set_cookie(
+                WRITE_COOKIE, f"{at:.3f}", max_age=math.ceil(window),
+                httponly=True, samesite="Lax",
+            )
+        return response
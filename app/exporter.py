@@ -0,0 +1,222 @@
+# app/exporter.py
+# 專案匯出：content + 所有 content_version + 標籤，串流輸出 NDJSON / CSV / JSON 陣列
+# - 版本跟標籤各用一個 server-side cursor（yield_per）依 content_id 排序讀取，
+#   邊讀邊合併，記憶體只會放一個 content 的資料
+# - 可以邊輸出邊 gzip
+import csv
+import io
+import zlib
+
+from sqlalchemy import select
+
+from . import prompt_store, queries
+from .models import Content, ContentVersion, ContentTag, Tag
+
+# 累積到這個大小才送出一塊，避免每行一個 chunk
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("ndjson", "csv", "json")
+
+_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "json": "application/json"}
+
+CSV_COLUMNS = [
+    "content_id",
+    "title",
+    "primary_type",
+    "source_tool",
+    "creator_user_id",
+    "content_created_at",
+    "tags",
+    "version_id",
+    "version_number",
+    "created_by",
+    "version_created_at",
+    "prompt",
+    "file_url",
+]
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def iter_project_records(session, project_id, since=None, yield_per=1000):
+    """
+    依 content_id 順序產生每個 content 的完整資料：
+    {content 欄位..., "tags": [...], "versions": [...]}
+    since：只匯出這個時間（含）之後建立的版本
+    """
+    versions_stmt = (
+        select(
+            Content.content_id,
+            Content.title,
+            Content.primary_type,
+            Content.source_tool,
+            Content.creator_user_id,
+            Content.created_at.label("content_created_at"),
+            ContentVersion.version_id,
+            ContentVersion.version_number,
+            ContentVersion.created_by,
+            ContentVersion.created_at,
+            queries.prompt_column().label("prompt"),
+            ContentVersion.prompt_delta,
+            ContentVersion.file_url,
+        )
+        .join(ContentVersion, ContentVersion.content_id == Content.content_id)
+        .where(Content.project_id == project_id)
+        .order_by(Content.content_id, ContentVersion.version_number)
+    )
+    if since is not None:
+        versions_stmt = versions_stmt.where(ContentVersion.created_at >= since)
+
+    tags_stmt = (
+        select(ContentTag.content_id, Tag.name)
+        .join(Tag, Tag.tag_id == ContentTag.tag_id)
+        .join(Content, Content.content_id == ContentTag.content_id)
+        .where(Content.project_id == project_id)
+        .order_by(ContentTag.content_id, ContentTag.id)
+    )
+
+    options = {"yield_per": yield_per}
+    versions = session.execute(versions_stmt, execution_options=options)
+    tags = _TagCursor(session.execute(tags_stmt, execution_options=options))
+
+    current = None
+    for row in versions:
+        if current is None or current["content_id"] != row.content_id:
+            if current is not None:
+                yield _restore_prompts(current)
+            current = {
+                "content_id": row.content_id,
+                "title": row.title,
+                "primary_type": row.primary_type,
+                "source_tool": row.source_tool,
+                "creator_user_id": row.creator_user_id,
+                "created_at": _iso(row.content_created_at),
+                "tags": tags.take(row.content_id),
+                "versions": [],
+            }
+        current["versions"].append({
+            "version_id": row.version_id,
+            "version_number": row.version_number,
+            "created_by": row.created_by,
+            "created_at": _iso(row.created_at),
+            "prompt": row.prompt,
+            "prompt_delta": row.prompt_delta,
+            "file_url": row.file_url,
+        })
+    if current is not None:
+        yield _restore_prompts(current)
+
+
+def _restore_prompts(record):
+    """差異壓縮的版本還原成完整 prompt（同一個 content 的版本都在手上）"""
+    versions = record["versions"]
+    if any(v["prompt_delta"] is not None for v in versions):
+        texts = prompt_store.reconstruct(list(reversed(versions)))
+        for v in versions:
+            v["prompt"] = texts.get(v["version_number"])
+    for v in versions:
+        del v["prompt_delta"]
+    return record
+
+
+class _TagCursor:
+    """跟版本的 cursor 一起往前走（merge join），取出某個 content 的標籤"""
+
+    def __init__(self, result):
+        self._rows = iter(result)
+        self._pending = next(self._rows, None)
+
+    def take(self, content_id):
+        # 版本依 content_id 遞增，比它小的標籤（content 沒有符合的版本）直接跳過
+        while self._pending is not None and self._pending.content_id < content_id:
+            self._pending = next(self._rows, None)
+        names = []
+        while self._pending is not None and self._pending.content_id == content_id:
+            names.append(self._pending.name)
+            self._pending = next(self._rows, None)
+        return names
+
+
+def export_chunks(records, fmt, json_provider, use_gzip=False):
+    """
+    records 轉成要輸出的 bytes（fmt：ndjson / csv / json），API 串流與背景匯出共用
+    json_provider 是 app.json；欄位照 record 的順序輸出
+    """
+    if fmt == "csv":
+        chunks = csv_chunks(records)
+    elif fmt == "json":
+        chunks = json_provider.stream_array(records, sort_keys=False, chunk_size=CHUNK_SIZE)
+    else:
+        chunks = ndjson_chunks(
+            records, lambda r: json_provider.dumps(r, ensure_ascii=False, sort_keys=False)
+        )
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+    return chunks
+
+
+def export_filename(project_id, fmt, use_gzip=False):
+    """回傳 (檔名, mimetype)"""
+    mimetype = _MIMETYPES[fmt]
+    filename = f"project-{project_id}.{fmt}"
+    if use_gzip:
+        mimetype = "application/gzip"
+        filename += ".gz"
+    return filename, mimetype
+
+
+def ndjson_chunks(records, json_dumps):
+    buf = []
+    size = 0
+    for record in records:
+        line = json_dumps(record) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def csv_chunks(records):
+    """一個版本一列，content 欄位重複、標籤用 ; 串起來"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for record in records:
+        tags = ";".join(record["tags"])
+        for v in record["versions"]:
+            writer.writerow([
+                record["content_id"],
+                record["title"],
+                record["primary_type"],
+                record["source_tool"],
+                record["creator_user_id"],
+                record["created_at"],
+                tags,
+                v["version_id"],
+                v["version_number"],
+                v["created_by"],
+                v["created_at"],
+                v["prompt"],
+                v["file_url"],
+            ])
+        if out.tell() >= CHUNK_SIZE:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """邊輸出邊壓縮（gzip 格式）"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -2,8 +2,16 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
+from .blob_store import BlobStore
+from .db_routing import RoutingSession
+from .hashing import PasswordHasher
 
 # ❗這裡只建立物件，不要傳 app 進來
-db = SQLAlchemy()
+# session 會依 request 把讀取分到 replica（見 db_routing.py）
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
+# bcrypt 透過這個執行（有大小限制的 thread pool）
+password_hasher = PasswordHasher()
+# 上傳的檔案（內容定址，見 blob_store.py）
+blob_store = BlobStore()
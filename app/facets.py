@@ -0,0 +1,157 @@
+# app/facets.py
+# 搜尋的篩選條件與 facet 統計
+# - 篩選：tag（可多個，全部都要有）、primary_type / source_tool / creator（可多個，符合其一）、
+#   project_id、created_after / created_before（content 建立時間）
+# - facet：在「符合搜尋 + 篩選」的所有 content 上分組計數，不只這一頁
+#   所有 facet 用一條 UNION ALL 查詢算完，符合的 content_id 放在 CTE 裡只算一次
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import Integer, String, cast, func, literal, null, select, union_all
+
+from .models import Content, ContentTag, Tag, normalize_tag_name
+
+FACETS = ("primary_type", "source_tool", "tag")
+
+# content 本身的欄位：可以重複給的篩選參數，也是 facet
+_MULTI_FILTERS = ("primary_type", "source_tool")
+
+
+def parse_filters():
+    """
+    讀取篩選參數，回傳 (filters, error)；error 不是 None 時請直接回 400
+    filters 只包含有給的條件，沒有任何篩選時是空 dict
+    """
+    args = request.args
+    filters = {}
+
+    tags = [normalize_tag_name(t) for t in args.getlist("tag")]
+    tags = [t for t in dict.fromkeys(tags) if t]
+    if tags:
+        filters["tag"] = tags
+
+    for name in _MULTI_FILTERS:
+        values = [v for v in args.getlist(name) if v.strip()]
+        if values:
+            filters[name] = values
+
+    try:
+        creators = [int(v) for v in args.getlist("creator")]
+        project_id = args.get("project_id")
+        if project_id:
+            filters["project_id"] = int(project_id)
+    except ValueError:
+        return None, "creator / project_id 必須是整數"
+    if creators:
+        filters["creator"] = creators
+
+    for name in ("created_after", "created_before"):
+        raw = args.get(name)
+        if raw:
+            try:
+                filters[name] = datetime.fromisoformat(raw)
+            except ValueError:
+                return None, f"{name} 必須是 ISO 8601 時間格式"
+
+    return filters, None
+
+
+def parse_facets():
+    """讀取 ?facets=primary_type,tag（逗號分隔），回傳 (names, error)；沒給是空 tuple"""
+    raw = request.args.get("facets")
+    if not raw:
+        return (), None
+    names = tuple(dict.fromkeys(n.strip() for n in raw.split(",") if n.strip()))
+    unknown = set(names) - set(FACETS)
+    if unknown:
+        return None, f"facets 不支援：{', '.join(sorted(unknown))}（可用：{', '.join(FACETS)}）"
+    return names, None
+
+
+def conditions(filters):
+    """篩選條件（Content 欄位上的 WHERE），給已經 FROM content 的查詢用"""
+    clauses = []
+    for key in filters.get("tag", ()):
+        # 每個標籤各自一個 IN，走 content_tag (tag_id, content_id) 索引
+        clauses.append(Content.content_id.in_(
+            select(ContentTag.content_id)
+            .join(Tag, Tag.tag_id == ContentTag.tag_id)
+            .where(Tag.name_normalized == key)
+        ))
+    if "primary_type" in filters:
+        clauses.append(Content.primary_type.in_(filters["primary_type"]))
+    if "source_tool" in filters:
+        clauses.append(Content.source_tool.in_(filters["source_tool"]))
+    if "creator" in filters:
+        clauses.append(Content.creator_user_id.in_(filters["creator"]))
+    if "project_id" in filters:
+        clauses.append(Content.project_id == filters["project_id"])
+    if "created_after" in filters:
+        clauses.append(Content.created_at >= filters["created_after"])
+    if "created_before" in filters:
+        clauses.append(Content.created_at < filters["created_before"])
+    return clauses
+
+
+def filtered_ids(project_ids, filters):
+    """使用者看得到、而且符合篩選的 content_id（select）"""
+    return select(Content.content_id).where(
+        Content.project_id.in_(project_ids), *conditions(filters)
+    )
+
+
+def facet_counts(session, matched_ids, names, top_tags=20):
+    """
+    matched_ids：符合搜尋 + 篩選的 content_id（select，單一欄位）
+    回傳 {"total": n, "primary_type": [{"value", "count"}], "tag": [{"tag_id", "name", "count"}], ...}
+    """
+    matched = matched_ids.cte("matched_ids")
+    n = func.count().label("n")
+
+    branches = [
+        select(
+            literal("total").label("facet"), cast(null(), String).label("value"),
+            cast(null(), Integer).label("tag_id"), n,
+        ).select_from(matched)
+    ]
+    for name in _MULTI_FILTERS:
+        if name in names:
+            column = getattr(Content, name)
+            branches.append(
+                select(
+                    literal(name).label("facet"), column.label("value"),
+                    cast(null(), Integer).label("tag_id"), n,
+                )
+                .join(matched, matched.c.content_id == Content.content_id)
+                .group_by(column)
+            )
+    if "tag" in names:
+        # 用 IN 讓查詢從符合的 content 出發，各自走 content_tag (content_id, tag_id) 唯一索引；
+        # 寫成 JOIN 時 SQLite 會為了 GROUP BY 改成掃整個 (tag_id, content_id) 索引
+        top = (
+            select(ContentTag.tag_id, func.count().label("n"))
+            .where(ContentTag.content_id.in_(select(matched.c.content_id)))
+            .group_by(ContentTag.tag_id)
+            .order_by(func.count().desc(), ContentTag.tag_id.asc())
+            .limit(top_tags)
+            .subquery()
+        )
+        branches.append(
+            select(literal("tag").label("facet"), Tag.name, Tag.tag_id, top.c.n)
+            .join(Tag, Tag.tag_id == top.c.tag_id)
+        )
+
+    result = {name: [] for name in names}
+    result["total"] = 0
+    for facet, value, tag_id, count in session.execute(union_all(*branches)):
+        if facet == "total":
+            result["total"] = count
+        elif facet == "tag":
+            result["tag"].append({"tag_id": tag_id, "name": value, "count": count})
+        else:
+            result[facet].append({"value": value, "count": count})
+
+    # 多到少；同數量時依值排序，結果才穩定
+    for name in names:
+        result[name].sort(key=lambda e: (-e["count"], e.get("tag_id") or 0, e.get("value") or ""))
+    return result
@@ -0,0 +1,66 @@
+# app/hashing.py
+# bcrypt 雜湊放到獨立、固定大小的 thread pool 執行
+# - 同時最多 BCRYPT_WORKERS 個雜湊在跑，不會把所有 worker thread 都卡在 CPU 上
+# - 排隊 + 執行中的數量超過 BCRYPT_MAX_PENDING 就直接丟 HashingBusy（回 503）
+# - 設定的 cost（BCRYPT_LOG_ROUNDS）變了，登入成功時順便重新雜湊
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class HashingBusy(Exception):
+    """雜湊佇列已滿，請稍後再試"""
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.bcrypt = None
+        self._executor = None
+        self._slots = None
+        self.timeout = None
+        self.log_rounds = 12
+        self.workers = None
+        self.max_pending = None
+
+    def init_app(self, app, bcrypt):
+        self.bcrypt = bcrypt
+        workers = app.config.get("BCRYPT_WORKERS") or min(4, os.cpu_count() or 1)
+        max_pending = app.config.get("BCRYPT_MAX_PENDING") or workers * 8
+        self.workers, self.max_pending = workers, max_pending
+        self.timeout = app.config.get("BCRYPT_TIMEOUT", 10)
+        self.log_rounds = app.config.get("BCRYPT_LOG_ROUNDS", 12)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # 等太久代表佇列塞住了，一樣當成忙碌
+            raise HashingBusy() from None
+
+    def hash_password(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password).decode("utf-8")
+
+    def check_password(self, pw_hash, password):
+        return self._run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """雜湊的 cost 跟目前設定不同（格式：$2b$12$...）"""
+        try:
+            return int(pw_hash.split("$")[2]) != self.log_rounds
+        except (IndexError, ValueError):
+            return True
@@ -0,0 +1,269 @@
+# app/history_index.py
+# 歷史版本搜尋用的反向索引：term -> (project_id, content_id, version_id)
+# - 版本建立之後 prompt 就不會變（差異壓縮只改存法），所以只要處理「新增的版本」
+# - 新版本在 after_flush 收集，commit 前一次寫入 posting（跟 search_index 同一個交易）
+# - 查詢：每個字各自走 (term, project_id) 主鍵，版本要包含所有的字才算符合
+# 版本被刪掉時 posting 不會跟著刪；結果會再 JOIN content / content_version，不會回傳已刪除的，
+# 需要清乾淨時跑 flask history-reindex
+import re
+
+import click
+from sqlalchemy import and_, bindparam, case, delete, event, func, insert, or_, select
+
+from . import prompt_store, queries
+from .extensions import db
+from .models import Content, ContentVersion, VersionTerm
+from .search_index import parse_query
+
+# session.info 裡暫存「這次交易新增的 version_id」
+_NEW_VERSIONS_KEY = "history_new_version_ids"
+
+TERM_MAX = VersionTerm.__table__.c.term.type.length
+
+# 切字規則跟全文檢索（search_index）一樣
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# 前綴查詢用範圍：term >= 'cat' AND term < 'cat' + U+FFFF（走得到索引，LIKE 不一定）
+_PREFIX_END = "\uffff"
+
+
+def extract_terms(prompt):
+    """prompt 裡不重複的字（小寫、太長的截斷），切字規則跟全文檢索一樣"""
+    return {w[:TERM_MAX] for w in _WORD_RE.findall((prompt or "").lower())}
+
+
+def posting_rows(project_id, content_id, version_id, prompt):
+    return [
+        {
+            "term": term,
+            "project_id": project_id,
+            "content_id": content_id,
+            "version_id": version_id,
+        }
+        for term in sorted(extract_terms(prompt))
+    ]
+
+
+# ======================
+# 寫入
+# ======================
+def mark_new_versions(session, version_ids):
+    """標記新增的版本，commit 前會一次寫入 posting（bulk INSERT 不經過 ORM 時要自己呼叫）"""
+    session.info.setdefault(_NEW_VERSIONS_KEY, set()).update(version_ids)
+
+
+def index_versions(conn, version_ids):
+    """替指定的版本寫入 posting（新版本一定存完整 prompt，不用還原差異）"""
+    ids = sorted({int(i) for i in version_ids if i is not None})
+    if not ids:
+        return
+    rows = conn.execute(
+        select(
+            ContentVersion.version_id,
+            ContentVersion.content_id,
+            Content.project_id,
+            queries.prompt_column().label("prompt"),
+        )
+        .join(Content, Content.content_id == ContentVersion.content_id)
+        .where(ContentVersion.version_id.in_(bindparam("ids", expanding=True))),
+        {"ids": ids},
+    ).all()
+    postings = []
+    for row in rows:
+        postings.extend(
+            posting_rows(row.project_id, row.content_id, row.version_id, row.prompt)
+        )
+    for i in range(0, len(postings), 1000):
+        conn.execute(insert(VersionTerm), postings[i:i + 1000])
+
+
+def rebuild(conn, batch=200, progress=None):
+    """
+    整個索引重建：逐批撈版本、還原差異壓縮的 prompt 再寫入，回傳處理了幾個版本
+    progress(已處理的 content 數, content 總數)：每批呼叫一次（背景工作回報進度用）
+    """
+    conn.execute(delete(VersionTerm))
+    content_ids = conn.scalars(
+        select(Content.content_id).order_by(Content.content_id)
+    ).all()
+    total = 0
+    for i in range(0, len(content_ids), batch):
+        if progress is not None:
+            progress(i, len(content_ids))
+        chunk = content_ids[i:i + batch]
+        rows = conn.execute(
+            select(
+                ContentVersion.version_id,
+                ContentVersion.content_id,
+                ContentVersion.version_number,
+                queries.prompt_column().label("prompt"),
+                ContentVersion.prompt_delta,
+                Content.project_id,
+            )
+            .join(Content, Content.content_id == ContentVersion.content_id)
+            .where(ContentVersion.content_id.in_(chunk))
+            .order_by(ContentVersion.content_id, ContentVersion.version_number.desc())
+        ).mappings().all()
+        postings = history_postings(rows)
+        for j in range(0, len(postings), 1000):
+            conn.execute(insert(VersionTerm), postings[j:j + 1000])
+        total += len(rows)
+    return total
+
+
+def history_postings(rows):
+    """
+    rows: 依 (content_id, version_number DESC) 排好的版本 mapping，需要
+    project_id / content_id / version_id / version_number / prompt / prompt_delta
+    差異壓縮的版本先還原再切字，回傳所有 posting
+    """
+    postings = []
+    group = []
+    for row in list(rows) + [None]:
+        if group and (row is None or row["content_id"] != group[-1]["content_id"]):
+            texts = prompt_store.reconstruct(group)
+            for version in group:
+                postings.extend(posting_rows(
+                    version["project_id"], version["content_id"], version["version_id"],
+                    texts.get(version["version_number"]),
+                ))
+            group = []
+        if row is not None:
+            group.append(row)
+    return postings
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_new_versions(session, flush_context):
+    ids = {obj.version_id for obj in session.new if isinstance(obj, ContentVersion)}
+    if ids:
+        mark_new_versions(session, ids)
+
+
+@event.listens_for(db.session, "before_commit")
+def _index_before_commit(session):
+    session.flush()
+    ids = session.info.pop(_NEW_VERSIONS_KEY, None)
+    if ids:
+        index_versions(session.connection(), ids)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_new_versions(session):
+    session.info.pop(_NEW_VERSIONS_KEY, None)
+
+
+# ======================
+# 查詢
+# ======================
+def query_terms(raw):
+    """
+    把查詢字串拆成 [(term, is_prefix), ...]
+    索引沒有記位置，"片語" 會拆成各個字（都要出現，但不檢查順序）
+    """
+    terms = []
+    for words, is_prefix in parse_query(raw):
+        for word in words:
+            terms.append((word[:TERM_MAX], is_prefix and len(words) == 1))
+    return list(dict.fromkeys(terms))
+
+
+def _term_clause(term, is_prefix):
+    if is_prefix:
+        return and_(VersionTerm.term >= term, VersionTerm.term < term + _PREFIX_END)
+    return VersionTerm.term == term
+
+
+def matching_versions(project_ids, terms, content_ids=None):
+    """
+    包含所有 terms 的版本：select (content_id, version_id)
+    content_ids（list 或 select）有給時只看這些 content
+    """
+    clauses = [_term_clause(term, is_prefix) for term, is_prefix in terms]
+    # 每個版本命中了幾個「不同的」查詢字；前綴可能命中好幾個 term，只算一次
+    which = case(*[(clause, i) for i, clause in enumerate(clauses)])
+    stmt = (
+        select(VersionTerm.content_id, VersionTerm.version_id)
+        .where(VersionTerm.project_id.in_(project_ids), or_(*clauses))
+        .group_by(VersionTerm.content_id, VersionTerm.version_id)
+        .having(func.count(func.distinct(which)) == len(clauses))
+    )
+    if content_ids is not None:
+        stmt = stmt.where(VersionTerm.content_id.in_(content_ids))
+    return stmt
+
+
+def matched_content_ids(project_ids, raw_query, restrict=None):
+    """有任何一個版本符合的 content_id（select，facet 統計用）；解析不出任何字時回傳 None"""
+    terms = query_terms(raw_query)
+    if not terms:
+        return None
+    matched = matching_versions(project_ids, terms, content_ids=restrict).subquery()
+    return select(matched.c.content_id).distinct()
+
+
+def search(session, project_ids, raw_query, limit=50, after=None, max_versions=20,
+           restrict=None):
+    """
+    歷史版本搜尋，依「最近一次命中的版本」新到舊排序
+    回傳 ([(content_id, last_version_id, [version Row, ...]), ...], has_more)；
+    查詢字串解析不出任何字時回傳 None
+    after 是上一頁最後一筆的 last_version_id；restrict 是 content_id 的 select()（篩選條件）
+    """
+    terms = query_terms(raw_query)
+    if not terms:
+        return None
+    if not project_ids:
+        return [], False
+
+    matched = matching_versions(project_ids, terms, content_ids=restrict).subquery()
+    last_match = func.max(matched.c.version_id)
+    page = (
+        select(matched.c.content_id, last_match.label("last_version_id"))
+        .group_by(matched.c.content_id)
+        .order_by(last_match.desc())
+        .limit(limit + 1)
+    )
+    if after is not None:
+        page = page.having(last_match < after)
+    contents = session.execute(page).all()
+    has_more = len(contents) > limit
+    contents = contents[:limit]
+    if not contents:
+        return [], False
+
+    # 這一頁的 content 各自命中了哪些版本（新到舊，每個 content 最多 max_versions 筆）
+    ids = [row.content_id for row in contents]
+    hits = matching_versions(project_ids, terms, content_ids=ids).subquery()
+    rows = session.execute(
+        select(
+            ContentVersion.content_id,
+            ContentVersion.version_id,
+            ContentVersion.version_number,
+            ContentVersion.created_at,
+        )
+        .join(hits, hits.c.version_id == ContentVersion.version_id)
+        .order_by(ContentVersion.content_id, ContentVersion.version_number.desc())
+    ).all()
+    versions = {}
+    for row in rows:
+        bucket = versions.setdefault(row.content_id, [])
+        if len(bucket) < max_versions:
+            bucket.append(row)
+
+    return [
+        (row.content_id, row.last_version_id, versions.get(row.content_id, []))
+        for row in contents
+    ], has_more
+
+
+# ======================
+# Flask 整合
+# ======================
+def init_app(app):
+    @app.cli.command("history-reindex")
+    def history_reindex():
+        """重建歷史版本搜尋的反向索引"""
+        with db.engine.begin() as conn:
+            total = rebuild(conn)
+        click.echo(f"歷史版本索引已重建（{total} 個版本）")
@@ -0,0 +1,223 @@
+# app/importer.py
+# 大量匯入 content（各帶第一個版本，可選標籤）
+# 每批用多筆 INSERT ... RETURNING 寫入 content / content_version，
+# 再一次 UPDATE 補上 latest_version_id；單筆資料有問題只記錯誤，不會整批失敗
+# 回應只有筆數與前 MAX_ERRORS 筆錯誤，匯入幾百萬筆也不會把結果都放在記憶體裡
+import json
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import assets, history_index, project_stats, prompt_store, search_index
+from .extensions import db
+from .models import Content, ContentVersion
+from .tagging import attach_tag_map
+
+TITLE_MAX = Content.__table__.c.title.type.length
+PRIMARY_TYPE_MAX = Content.__table__.c.primary_type.type.length
+SOURCE_TOOL_MAX = Content.__table__.c.source_tool.type.length
+# prompt / file_url 在資料庫是 TEXT，匯入時另外限制長度
+PROMPT_MAX = 100_000
+FILE_URL_MAX = 2048
+
+# 回應最多列幾筆錯誤（其餘只算進 failed）
+MAX_ERRORS = 1000
+
+
+def iter_ndjson(stream):
+    """一行一行讀 NDJSON，回傳 (index, item, error)"""
+    index = 0
+    for raw in stream:
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            yield index, json.loads(line), None
+        except ValueError:
+            yield index, None, "不是合法的 JSON"
+        index += 1
+
+
+def iter_json_array(items):
+    for index, item in enumerate(items):
+        yield index, item, None
+
+
+def validate_item(item):
+    """檢查單筆資料，回傳 (cleaned, error)"""
+    if not isinstance(item, dict):
+        return None, "每一筆必須是 JSON 物件"
+
+    title = item.get("title")
+    primary_type = item.get("primary_type") or "text"
+    source_tool = item.get("source_tool")
+    tags = item.get("tags") or []
+
+    if not title or not isinstance(title, str):
+        return None, "title 必填"
+    if len(title) > TITLE_MAX:
+        return None, f"title 最長 {TITLE_MAX} 字"
+    if not isinstance(primary_type, str) or len(primary_type) > PRIMARY_TYPE_MAX:
+        return None, f"primary_type 必須是字串，最長 {PRIMARY_TYPE_MAX} 字"
+    if source_tool is not None and (
+        not isinstance(source_tool, str) or len(source_tool) > SOURCE_TOOL_MAX
+    ):
+        return None, f"source_tool 必須是字串，最長 {SOURCE_TOOL_MAX} 字"
+    if not isinstance(tags, list):
+        return None, "tags 必須是陣列"
+    prompt = item.get("prompt")
+    if prompt is not None and (not isinstance(prompt, str) or len(prompt) > PROMPT_MAX):
+        return None, f"prompt 必須是字串，最長 {PROMPT_MAX} 字"
+    file_url = item.get("file_url")
+    if file_url is not None and (not isinstance(file_url, str) or len(file_url) > FILE_URL_MAX):
+        return None, f"file_url 必須是字串，最長 {FILE_URL_MAX} 字"
+
+    return {
+        "title": title,
+        "primary_type": primary_type,
+        "source_tool": source_tool,
+        "prompt": prompt,
+        "file_url": file_url,
+        "tags": tags,
+    }, None
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, index, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"index": index, "message": message})
+
+    def to_dict(self):
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def import_contents(project_id, user_id, records, batch_size=500):
+    """
+    records: iter_ndjson / iter_json_array 產生的 (index, item, error)
+    每一批各自 commit，回傳 ImportResult
+    """
+    result = ImportResult()
+    batch = []
+    for index, item, error in records:
+        if error is None:
+            item, error = validate_item(item)
+        if error is not None:
+            result.add_error(index, error)
+            continue
+        batch.append((index, item))
+        if len(batch) >= batch_size:
+            _import_batch(project_id, user_id, batch, result)
+            batch = []
+    if batch:
+        _import_batch(project_id, user_id, batch, result)
+    return result
+
+
+def _import_batch(project_id, user_id, batch, result):
+    # file_url 指向上傳的檔案時，整批一次查有沒有上傳到這個專案
+    missing = assets.missing_assets(
+        db.session, project_id, [item["file_url"] for _, item in batch]
+    )
+    if missing:
+        for index, item in batch:
+            if item["file_url"] in missing:
+                result.add_error(index, "file_url 指向的檔案不存在，或沒有上傳到這個專案")
+        batch = [(index, item) for index, item in batch if item["file_url"] not in missing]
+        if not batch:
+            return
+
+    try:
+        created = _write_rows(project_id, user_id, batch)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        # 整批失敗時逐筆重試，找出是哪幾筆有問題
+        created = 0
+        for entry in batch:
+            try:
+                created += _write_rows(project_id, user_id, [entry])
+                db.session.commit()
+            except SQLAlchemyError as exc:
+                db.session.rollback()
+                result.add_error(entry[0], f"寫入失敗：{exc.__class__.__name__}")
+
+    result.imported += created
+
+
+def _write_rows(project_id, user_id, batch):
+    """寫入一批，回傳寫了幾筆（不會 commit）"""
+    session = db.session
+
+    # 1. 多筆 INSERT content，RETURNING 依參數順序拿回 content_id
+    content_ids = session.scalars(
+        insert(Content).returning(Content.content_id, sort_by_parameter_order=True),
+        [
+            {
+                "project_id": project_id,
+                "creator_user_id": user_id,
+                "title": item["title"],
+                "primary_type": item["primary_type"],
+                "source_tool": item["source_tool"],
+                "version_counter": 1,
+            }
+            for _, item in batch
+        ],
+    ).all()
+
+    # 2. 多筆 INSERT 第一個版本（prompt 文字先整批存進 prompt_text）
+    prompt_hashes = prompt_store.intern_prompts(session, [item["prompt"] for _, item in batch])
+    version_ids = session.scalars(
+        insert(ContentVersion).returning(
+            ContentVersion.version_id, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "content_id": content_id,
+                "created_by": user_id,
+                "version_number": 1,
+                "prompt": item["prompt"] if prompt_store.keep_inline_copy() else None,
+                "prompt_sha256": prompt_hashes.get(item["prompt"]),
+                "file_url": item["file_url"],
+            }
+            for content_id, (_, item) in zip(content_ids, batch)
+        ],
+    ).all()
+
+    # 3. 一次補上 latest_version_id（依主鍵的 bulk UPDATE）
+    session.execute(
+        update(Content),
+        [
+            {"content_id": content_id, "latest_version_id": version_id}
+            for content_id, version_id in zip(content_ids, version_ids)
+        ],
+    )
+
+    # 4. 標籤：所有名稱一次查 / 建
+    tag_map = {
+        content_id: item["tags"]
+        for content_id, (_, item) in zip(content_ids, batch)
+        if item["tags"]
+    }
+    if tag_map:
+        attach_tag_map(tag_map, user_id)
+
+    # bulk INSERT 不經過 ORM flush，要自己通知全文索引、歷史版本索引與專案統計
+    search_index.mark_dirty(session, content_ids)
+    history_index.mark_new_versions(session, version_ids)
+    project_stats.record_contents(session, [
+        (project_id, item["primary_type"], item["source_tool"]) for _, item in batch
+    ])
+    project_stats.record_versions(session, content_ids)
+
+    return len(content_ids)
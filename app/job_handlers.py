@@ -0,0 +1,197 @@
+# app/job_handlers.py
+# 背景工作的種類（見 jobs.py）
+#   project-export         專案匯出成檔案，做完用 GET /api/jobs/<id>/result 下載
+#   project-stats-rebuild  重算一個專案的統計
+#   tags-bulk              大量 content 掛標籤（超過 /api/tags/bulk 一次的上限時用）
+#   search-reindex / history-reindex  整個資料庫的索引重建，只能從 CLI 送出
+import os
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from . import exporter, history_index, project_stats, search_index
+from .authz import user_in_project
+from .extensions import db
+from .jobs import JobRejected, job_type, result_dir
+from .models import Content, Project, ProjectStats
+from .tagging import attach_tags
+
+# tags-bulk 每批處理幾個 content（每批各自 commit）
+BULK_TAG_BATCH = 1000
+
+
+def _project_param(user_id, params):
+    try:
+        project_id = int(params.get("project_id"))
+    except (TypeError, ValueError):
+        raise JobRejected("project_id 必須是整數") from None
+    if user_id is None:
+        if db.session.get(Project, project_id) is None:
+            raise JobRejected("專案不存在", 404)
+    elif not user_in_project(user_id, project_id):
+        raise JobRejected("你沒有這個專案的權限", 403)
+    return project_id
+
+
+# ======================
+# project-export
+# ======================
+def _prepare_export(user_id, params):
+    project_id = _project_param(user_id, params)
+
+    fmt = params.get("format", "ndjson")
+    if fmt not in exporter.FORMATS:
+        raise JobRejected("format 只能是 ndjson、csv 或 json")
+
+    since = params.get("since")
+    if since:
+        try:
+            since = datetime.fromisoformat(since).isoformat()
+        except (TypeError, ValueError):
+            raise JobRejected("since 必須是 ISO 8601 時間格式") from None
+
+    return {
+        "project_id": project_id,
+        "format": fmt,
+        "gzip": bool(params.get("gzip")),
+        "since": since or None,
+    }, project_id
+
+
+@job_type("project-export", prepare=_prepare_export, concurrency=2, max_attempts=3)
+def export_project(ctx, params):
+    project_id = params["project_id"]
+    since = datetime.fromisoformat(params["since"]) if params["since"] else None
+
+    # content 總數直接讀統計表，不用另外 COUNT
+    stats = db.session.get(ProjectStats, project_id)
+    ctx.progress(0, stats.content_count if stats else None)
+
+    filename, mimetype = exporter.export_filename(project_id, params["format"], params["gzip"])
+    name = f"job-{ctx.job_id}-{filename}"
+    directory = result_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    partial = path + ".partial"
+
+    def counted(records):
+        for i, record in enumerate(records, 1):
+            yield record
+            ctx.progress(i)
+
+    records = exporter.iter_project_records(db.session, project_id, since=since)
+    chunks = exporter.export_chunks(
+        counted(records), params["format"], current_app.json, params["gzip"]
+    )
+    size = 0
+    try:
+        with open(partial, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    return {
+        "file": name,
+        "filename": filename,
+        "mimetype": mimetype,
+        "bytes": size,
+        "contents": ctx.done,
+    }
+
+
+# ======================
+# project-stats-rebuild
+# ======================
+def _prepare_stats_rebuild(user_id, params):
+    project_id = _project_param(user_id, params)
+    return {"project_id": project_id}, project_id
+
+
+@job_type("project-stats-rebuild", prepare=_prepare_stats_rebuild, max_attempts=3)
+def rebuild_project_stats(ctx, params):
+    ctx.progress(0, 1)
+    with db.engine.begin() as conn:
+        project_stats.rebuild(conn, [params["project_id"]])
+    ctx.progress(1)
+    return {"project_id": params["project_id"]}
+
+
+# ======================
+# tags-bulk
+# ======================
+def _prepare_bulk_tags(user_id, params):
+    content_ids = params.get("content_ids") or []
+    names = params.get("tags") or []
+    max_contents = current_app.config.get("JOBS_BULK_TAG_MAX", 100_000)
+
+    if not isinstance(content_ids, list) or len(content_ids) == 0:
+        raise JobRejected("content_ids 必須是非空的陣列")
+    if len(content_ids) > max_contents:
+        raise JobRejected(f"content_ids 一次最多 {max_contents} 筆")
+    if not all(isinstance(i, int) for i in content_ids):
+        raise JobRejected("content_ids 必須是整數陣列")
+    if not isinstance(names, list) or len(names) == 0:
+        raise JobRejected("tags 必須是非空的陣列")
+
+    # 送出時就檢查 content 存在、權限（專案成員），執行時不用再查
+    content_ids = list(dict.fromkeys(content_ids))
+    projects = set()
+    found = 0
+    for i in range(0, len(content_ids), BULK_TAG_BATCH):
+        rows = db.session.execute(
+            select(Content.content_id, Content.project_id)
+            .where(Content.content_id.in_(content_ids[i:i + BULK_TAG_BATCH]))
+        ).all()
+        found += len(rows)
+        projects.update(project_id for _, project_id in rows)
+    if found != len(content_ids):
+        raise JobRejected("content 不存在", 404)
+    if user_id is not None:
+        for project_id in projects:
+            if not user_in_project(user_id, project_id):
+                raise JobRejected("你沒有這個專案的權限", 403)
+
+    project_id = projects.pop() if len(projects) == 1 else None
+    return {"content_ids": content_ids, "tags": names}, project_id
+
+
+@job_type("tags-bulk", prepare=_prepare_bulk_tags, concurrency=2, max_attempts=3)
+def bulk_tags(ctx, params):
+    """每批各自 commit；重試時已經掛上的標籤會略過，不會重複"""
+    content_ids = params["content_ids"]
+    tags, attached = [], 0
+    for i in range(0, len(content_ids), BULK_TAG_BATCH):
+        ctx.progress(i, len(content_ids))
+        tags, count = attach_tags(
+            content_ids[i:i + BULK_TAG_BATCH], params["tags"], ctx.user_id
+        )
+        db.session.commit()
+        attached += count
+    ctx.progress(len(content_ids))
+    return {"tags": tags, "attached": attached, "contents": len(content_ids)}
+
+
+# ======================
+# 整個資料庫的索引（只限 CLI）
+# ======================
+@job_type("search-reindex", public=False)
+def reindex_search(ctx, params):
+    with db.engine.begin() as conn:
+        if not search_index.create_search_index(conn):
+            return {"indexed": False}
+        search_index.rebuild(conn)
+    return {"indexed": True}
+
+
+@job_type("history-reindex", public=False)
+def reindex_history(ctx, params):
+    with db.engine.begin() as conn:
+        total = history_index.rebuild(conn, progress=ctx.progress)
+    ctx.progress(ctx.total or 0)
+    return {"versions": total}
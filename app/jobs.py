@@ -0,0 +1,508 @@
+# app/jobs.py
+# 背景工作：匯出、重建索引 / 統計、大量掛標籤等耗時的工作不佔用 request thread
+# - 工作存在同一個資料庫的 job 表；API 送出後立刻回 202，之後用 GET /api/jobs/<id> 看進度
+# - runner：一個 dispatcher thread 定期（有新工作時立刻）認領 queued 的工作，交給固定大小的 thread pool
+# - 每種工作有同時執行的上限，以 job 表裡 running 的數量判斷（多個 process 合計）：
+#   認領的 UPDATE 本身帶著「running 數量 < 上限」的條件，SQLite 上一條 UPDATE 是原子的；
+#   Postgres 另外用 advisory lock 排隊
+# - 失敗依 max_attempts 重試（指數退避）；取消：queued 直接取消，running 只設旗標，
+#   工作下次回報進度時中止
+# - 進度、heartbeat 由 dispatcher 定期一起寫回（工作本身不用另外開連線寫入）；
+#   process 掛掉留下的 running 工作，heartbeat 超過 JOBS_STALE_SECONDS 會放回佇列或標成失敗
+# web process 預設會一起跑 runner；JOBS_RUN_IN_APP=0 時改用 `flask jobs-worker` 獨立執行
+# （沒跑 jobs-worker 的話工作會一直留在 queued，web process 第一個請求時會記 warning 提醒）
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import delete, func, select, text, update
+
+from .extensions import db
+from .models import Job
+
+STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED = ("succeeded", "failed", "cancelled")
+
+# Postgres 認領同一種工作時排隊用（第二個 key 是工作種類名稱的 crc32）
+_ADVISORY_LOCK_ID = 74_210_023
+
+
+class JobRejected(Exception):
+    """送出的工作參數不對、沒有權限；status 是要回的 HTTP 狀態碼"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class JobCancelled(Exception):
+    """工作被取消（JobContext.progress / check_cancelled 會丟出）"""
+
+
+# ======================
+# 工作種類
+# ======================
+class JobType:
+    def __init__(self, name, handler, prepare=None, concurrency=1, max_attempts=1,
+                 public=True):
+        self.name = name
+        self.handler = handler
+        self.prepare = prepare
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        # False：只能從 CLI 送出（例如整個資料庫的重建索引）
+        self.public = public
+
+
+JOB_TYPES = {}
+
+
+def job_type(name, prepare=None, concurrency=1, max_attempts=1, public=True):
+    """
+    註冊工作種類的 decorator
+    handler(ctx, params) 的回傳值（可以轉成 JSON）存進 job.result
+    prepare(user_id, params) 在送出時檢查參數與權限，回傳 (params, project_id)，
+    不接受時丟 JobRejected；user_id 是 None 代表從 CLI 送出，不檢查權限
+    max_attempts > 1 的工作重試時會從頭再跑一次，handler 要能重複執行
+    """
+    def decorator(handler):
+        JOB_TYPES[name] = JobType(
+            name, handler, prepare=prepare, concurrency=concurrency,
+            max_attempts=max_attempts, public=public,
+        )
+        return handler
+    return decorator
+
+
+class JobContext:
+    """傳給 handler：回報進度、檢查是否被取消"""
+
+    def __init__(self, job_id, params, user_id, project_id, attempt):
+        self.job_id = job_id
+        self.params = params
+        self.user_id = user_id
+        self.project_id = project_id
+        self.attempt = attempt
+        self.done = 0
+        self.total = None
+        self._cancelled = threading.Event()
+
+    def progress(self, done, total=None):
+        """更新進度（只記在記憶體，runner 定期寫回）；已經被取消就丟 JobCancelled"""
+        self.done = done
+        if total is not None:
+            self.total = total
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+# ======================
+# 送出 / 取消
+# ======================
+def submit(session, name, params, user_id=None):
+    """新增一個 queued 的工作並 commit，回傳 Job；不支援的種類或參數不對丟 JobRejected"""
+    spec = JOB_TYPES.get(name)
+    if spec is None:
+        raise JobRejected(f"不支援的工作種類：{name}")
+    if not isinstance(params, dict):
+        raise JobRejected("params 必須是物件")
+
+    project_id = None
+    if spec.prepare is not None:
+        params, project_id = spec.prepare(user_id, params)
+
+    job = Job(
+        job_type=name,
+        status="queued",
+        params=params,
+        created_by=user_id,
+        project_id=project_id,
+        max_attempts=spec.max_attempts,
+        progress_done=0,
+        attempts=0,
+        cancel_requested=False,
+    )
+    session.add(job)
+    session.commit()
+    runner.wake()
+    return job
+
+
+def cancel(session, job):
+    """
+    queued 的工作直接取消；running 的只設旗標，工作下次回報進度時中止
+    回傳 False 代表工作已經結束，不能取消
+    """
+    now = datetime.utcnow()
+    result = session.execute(
+        update(Job)
+        .where(Job.job_id == job.job_id, Job.status == "queued")
+        .values(status="cancelled", finished_at=now)
+    )
+    if result.rowcount == 0:
+        result = session.execute(
+            update(Job)
+            .where(Job.job_id == job.job_id, Job.status == "running")
+            .values(cancel_requested=True)
+        )
+    session.commit()
+    session.refresh(job)
+    runner.wake()
+    return result.rowcount > 0
+
+
+def result_dir(app=None):
+    """工作產生的檔案（例如匯出）放在這裡"""
+    app = app or current_app
+    return app.config.get("JOBS_RESULT_DIR") or os.path.join(app.instance_path, "job-results")
+
+
+def result_path(job):
+    """工作結果裡的檔案路徑；沒有檔案時回傳 None"""
+    result = job.result if isinstance(job.result, dict) else {}
+    name = result.get("file")
+    if not name:
+        return None
+    return os.path.join(result_dir(), os.path.basename(name))
+
+
+# ======================
+# Runner
+# ======================
+class JobRunner:
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self.poll_seconds = 2.0
+        self.stale_seconds = 300.0
+        self.retry_delay = 10.0
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        # 這個 process 正在執行的工作：job_id -> JobContext
+        self._active = {}
+
+    def init_app(self, app):
+        self.stop()
+        self.app = app
+        self.workers = app.config.get("JOBS_WORKERS", 2)
+        self.poll_seconds = app.config.get("JOBS_POLL_SECONDS", 2.0)
+        self.stale_seconds = app.config.get("JOBS_STALE_SECONDS", 300.0)
+        self.retry_delay = app.config.get("JOBS_RETRY_DELAY", 10.0)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            # 每個 dispatcher 各自一個停止旗標，stop 之後馬上 start 不會讓舊的繼續跑
+            self._stop = threading.Event()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="job"
+            )
+            self._thread = threading.Thread(
+                target=self._loop, args=(self._stop, self._executor),
+                name="job-dispatcher", daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self, wait=False):
+        """停止認領新工作；wait=True 時等執行中的工作做完"""
+        with self._lock:
+            thread, executor, stop = self._thread, self._executor, self._stop
+            self._thread = self._executor = None
+        if thread is None:
+            return
+        stop.set()
+        self._wake.set()
+        if wait:
+            thread.join()
+        executor.shutdown(wait=wait)
+
+    def wake(self):
+        """有新的工作或取消時叫醒 dispatcher，不用等下一輪"""
+        self._wake.set()
+
+    def _loop(self, stop, executor):
+        with self.app.app_context():
+            while not stop.is_set():
+                try:
+                    self._sync_active()
+                    self._requeue_stale()
+                    self._dispatch(executor)
+                except Exception:
+                    # 資料庫暫時連不上、還沒升級等，下一輪再試
+                    self.app.logger.exception("背景工作 runner 發生錯誤")
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def _sync_active(self):
+        """寫回執行中工作的進度與 heartbeat，順便讀取取消的旗標"""
+        with self._lock:
+            active = dict(self._active)
+        if not active:
+            return
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            for job_id, ctx in active.items():
+                conn.execute(
+                    update(Job)
+                    .where(Job.job_id == job_id, Job.status == "running")
+                    .values(heartbeat_at=now, progress_done=ctx.done, progress_total=ctx.total)
+                )
+            cancelled = conn.scalars(
+                select(Job.job_id)
+                .where(Job.job_id.in_(list(active)), Job.cancel_requested.is_(True))
+            ).all()
+        for job_id in cancelled:
+            active[job_id].cancel()
+
+    def _requeue_stale(self):
+        """heartbeat 太久沒更新的 running 工作（process 掛了）：還能重試就放回佇列，否則標成失敗"""
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.stale_seconds)
+        with db.engine.begin() as conn:
+            stale = conn.execute(
+                select(Job.job_id, Job.attempts, Job.max_attempts)
+                .where(Job.status == "running", Job.heartbeat_at < cutoff)
+            ).all()
+            for job_id, attempts, max_attempts in stale:
+                values = {"error": "執行工作的 process 中斷", "heartbeat_at": None}
+                if attempts < max_attempts:
+                    values.update(status="queued", run_after=now)
+                else:
+                    values.update(status="failed", finished_at=now)
+                # heartbeat 條件再檢查一次，別的 process 可能剛處理過
+                conn.execute(
+                    update(Job)
+                    .where(Job.job_id == job_id, Job.status == "running",
+                           Job.heartbeat_at < cutoff)
+                    .values(**values)
+                )
+
+    def _dispatch(self, executor):
+        free = self.workers - len(self._active)
+        if free <= 0:
+            return
+        with db.engine.connect() as conn:
+            names = conn.scalars(
+                select(Job.job_type).where(Job.status == "queued").distinct()
+            ).all()
+        for name in names:
+            spec = JOB_TYPES.get(name)
+            if spec is None:
+                # 別的版本的程式註冊的工作，留給它處理
+                continue
+            while free > 0:
+                row = self._claim(spec)
+                if row is None:
+                    break
+                free -= 1
+                self._start_job(executor, spec, row)
+
+    def _claim(self, spec):
+        """認領一個這種工作（同時執行數沒有超過上限時），回傳 job 的那一列或 None"""
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(
+                    text("SELECT pg_advisory_xact_lock(:id, :key)"),
+                    {"id": _ADVISORY_LOCK_ID,
+                     "key": zlib.crc32(spec.name.encode("utf-8")) & 0x7FFFFFFF},
+                )
+            running = conn.scalar(
+                select(func.count()).select_from(Job)
+                .where(Job.status == "running", Job.job_type == spec.name)
+            )
+            if running >= spec.concurrency:
+                return None
+            row = conn.execute(
+                select(
+                    Job.job_id, Job.params, Job.created_by, Job.project_id,
+                    Job.attempts, Job.max_attempts,
+                )
+                .where(Job.status == "queued", Job.job_type == spec.name,
+                       Job.run_after <= now)
+                .order_by(Job.job_id)
+                .limit(1)
+            ).first()
+            if row is None:
+                return None
+            # 上限在 UPDATE 裡再檢查一次：別的 process 可能在上面的 count 之後認領了同一種工作
+            running_now = (
+                select(func.count()).select_from(Job)
+                .where(Job.status == "running", Job.job_type == spec.name)
+                .scalar_subquery()
+            )
+            claimed = conn.execute(
+                update(Job)
+                .where(Job.job_id == row.job_id, Job.status == "queued",
+                       running_now < spec.concurrency)
+                .values(
+                    status="running", attempts=Job.attempts + 1, started_at=now,
+                    heartbeat_at=now, progress_done=0, progress_total=None,
+                )
+            ).rowcount
+        return row if claimed else None
+
+    def _start_job(self, executor, spec, row):
+        ctx = JobContext(
+            row.job_id, row.params, row.created_by, row.project_id, row.attempts + 1
+        )
+        with self._lock:
+            self._active[row.job_id] = ctx
+        try:
+            executor.submit(self._run, spec, ctx, row.max_attempts)
+        except RuntimeError:
+            # runner 正在停止；這個工作不再 heartbeat，過期後會放回佇列
+            with self._lock:
+                self._active.pop(row.job_id, None)
+            raise
+
+    def _run(self, spec, ctx, max_attempts):
+        app = self.app
+        with app.app_context():
+            try:
+                result = spec.handler(ctx, ctx.params)
+            except JobCancelled:
+                db.session.rollback()
+                self._finish(ctx, status="cancelled")
+            except Exception as exc:
+                db.session.rollback()
+                app.logger.exception("背景工作 %s（%s）失敗", ctx.job_id, spec.name)
+                error = f"{type(exc).__name__}: {exc}"
+                if ctx.cancelled:
+                    self._finish(ctx, status="cancelled", error=error)
+                elif ctx.attempt < max_attempts:
+                    delay = self.retry_delay * 2 ** (ctx.attempt - 1)
+                    self._finish(
+                        ctx, status="queued", error=error,
+                        run_after=datetime.utcnow() + timedelta(seconds=delay),
+                    )
+                else:
+                    self._finish(ctx, status="failed", error=error)
+            else:
+                self._finish(ctx, status="succeeded", result=result)
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._active.pop(ctx.job_id, None)
+                self._wake.set()
+
+    def _finish(self, ctx, status, result=None, error=None, run_after=None):
+        now = datetime.utcnow()
+        values = {
+            "status": status,
+            "error": error,
+            "progress_done": ctx.done,
+            "progress_total": ctx.total,
+            "heartbeat_at": None,
+        }
+        if result is not None:
+            values["result"] = result
+        if status == "queued":
+            values["run_after"] = run_after
+        else:
+            values["finished_at"] = now
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    update(Job)
+                    .where(Job.job_id == ctx.job_id, Job.status == "running")
+                    .values(**values)
+                )
+        except Exception:
+            # 寫不回去的話，heartbeat 過期後會被當成中斷的工作處理
+            self.app.logger.exception("背景工作 %s 的狀態寫入失敗", ctx.job_id)
+
+
+runner = JobRunner()
+
+
+# ======================
+# Flask 整合
+# ======================
+def init_app(app):
+    runner.init_app(app)
+
+    if app.config.get("JOBS_RUN_IN_APP", True):
+        # 第一個請求（schema 檢查通過之後）才啟動，CLI 指令不會多開 thread
+        @app.before_request
+        def _start_job_runner():
+            if not runner.running:
+                runner.start()
+    else:
+        warned = threading.Event()
+
+        # 只在 web process 提醒（CLI 的 jobs-worker 自己也會建 app，不用提醒）
+        @app.before_request
+        def _warn_no_runner():
+            if not warned.is_set():
+                warned.set()
+                app.logger.warning(
+                    "JOBS_RUN_IN_APP=0：這個 process 不執行背景工作，"
+                    "送出的工作要另外跑 `flask jobs-worker` 才會處理"
+                )
+
+    @app.cli.command("jobs-worker")
+    def jobs_worker():
+        """在前景執行背景工作（web process 設了 JOBS_RUN_IN_APP=0 時用；可以開多個）"""
+        runner.start()
+        click.echo(f"背景工作 runner 已啟動（{runner.workers} 個 thread），Ctrl+C 結束")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            click.echo("等待執行中的工作結束…")
+        finally:
+            runner.stop(wait=True)
+
+    @app.cli.command("jobs-submit")
+    @click.argument("name")
+    @click.option("--params", "raw_params", default="{}", help="工作參數（JSON 物件）")
+    def jobs_submit(name, raw_params):
+        """送出一個背景工作（不檢查專案權限，可以送只限 CLI 的工作）"""
+        try:
+            job = submit(db.session, name, json.loads(raw_params))
+        except ValueError as exc:
+            raise click.BadParameter(str(exc), param_hint="--params")
+        except JobRejected as exc:
+            raise click.ClickException(exc.message)
+        click.echo(f"已送出工作 {job.job_id}（{name}）")
+
+    @app.cli.command("jobs-prune")
+    @click.option("--days", type=int, default=7, help="刪除幾天前結束的工作")
+    def jobs_prune(days):
+        """刪除結束很久的工作紀錄與產生的檔案"""
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        condition = (Job.status.in_(FINISHED), Job.finished_at < cutoff)
+        jobs = db.session.scalars(select(Job).where(*condition)).all()
+        for job in jobs:
+            path = result_path(job)
+            if path and os.path.exists(path):
+                os.remove(path)
+        db.session.execute(delete(Job).where(*condition))
+        db.session.commit()
+        click.echo(f"已刪除 {len(jobs)} 個工作")
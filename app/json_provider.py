@@ -0,0 +1,115 @@
+# app/json_provider.py
+# 比較快的 JSON 輸出
+# - 有安裝 orjson 就用 orjson（C 實作，直接產生 bytes），沒有就退回標準庫 json
+# - datetime / date 一律輸出 ISO 8601（route 裡直接放 datetime 就好，不用自己 isoformat()）
+# - 列表分頁最多 200 筆、本來就整頁在記憶體裡，直接一次編碼
+# - 來源是 generator、筆數沒有上限的陣列（例如專案匯出的 format=json）用 stream_array：
+#   一次編碼一筆、累積到 64 KiB 送出，不用先組成一整個大字串
+# JSON_PROVIDER = auto（預設）/ orjson / stdlib
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 沒有安裝 orjson 時全部走標準庫
+    orjson = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _default(o):
+    """標準 JSON 不支援的型別；跟 Flask 預設支援的一樣，只有日期改成 ISO 8601"""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        choice = app.config.get("JSON_PROVIDER", "auto")
+        if choice == "orjson" and orjson is None:
+            raise RuntimeError("JSON_PROVIDER=orjson，但是沒有安裝 orjson")
+        self.use_orjson = orjson is not None and choice != "stdlib"
+
+    def _orjson_option(self, indent=False, sort_keys=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False, sort_keys=None):
+        """編碼成 UTF-8 bytes（串流、Response body 直接用，不用再轉一次）"""
+        if self.use_orjson:
+            try:
+                return orjson.dumps(
+                    obj, default=_default, option=self._orjson_option(indent, sort_keys)
+                )
+            except orjson.JSONEncodeError:
+                # 超過 64 bit 的整數之類 orjson 不收的，交給標準庫
+                pass
+        kwargs = {} if sort_keys is None else {"sort_keys": sort_keys}
+        return self._stdlib_dumps(obj, indent=2 if indent else None, **kwargs).encode("utf-8")
+
+    def stream_array(self, items, sort_keys=None, chunk_size=CHUNK_SIZE):
+        """
+        把 items（可以是 generator）編碼成 JSON 陣列，產生 bytes 片段
+        一次只編碼一筆，累積到 chunk_size 才送出；要串流輸出時自己選用
+        """
+        buf = bytearray(b"[")
+        first = True
+        for item in items:
+            if not first:
+                buf += b","
+            buf += self.dumps_bytes(item, sort_keys=sort_keys)
+            first = False
+            if len(buf) >= chunk_size:
+                yield bytes(buf)
+                buf.clear()
+        buf += b"]\n"
+        yield bytes(buf)
+
+    def _stdlib_dumps(self, obj, **kwargs):
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        # 只有 sort_keys / ensure_ascii 時才走 orjson（orjson 一律輸出 UTF-8，不跳脫非 ASCII）
+        if self.use_orjson and set(kwargs) <= {"sort_keys", "ensure_ascii"}:
+            sort_keys = kwargs.get("sort_keys", self.sort_keys)
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+            try:
+                return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+            except orjson.JSONEncodeError:
+                pass
+        return self._stdlib_dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype
+        )
+
+
+def items_response(items, **fields):
+    """列表 API 的回應 {"items": [...], **fields}"""
+    return jsonify({"items": items, **fields})
@@ -0,0 +1,316 @@
+# app/metrics.py
+# 每個請求的效能量測：時間花在 SQL、ORM 物件建立、JWT 驗證、view 本身還是 JSON 序列化
+# - SQLAlchemy engine 事件：計算 SQL 條數與耗時，超過 SLOW_QUERY_MS 的記 log（含 SQL 原文）
+# - ORM load 事件：這個請求建立了幾個 entity
+# - view function 外面包一層計時；app.json 外面包一層計時 jsonify
+# - JWT：before_request 裡自己呼叫一次 verify_jwt_in_request 計時（不改 flask-jwt-extended 的 callback）
+# 結果依 endpoint 累積成 Prometheus histogram，由 GET /api/metrics 輸出（render_metrics）；
+# 單一請求的分項時間也會放在 Server-Timing header，瀏覽器 devtools 看得到
+# /api/metrics 要帶 METRICS_TOKEN（Authorization: Bearer ...）；沒設定 token 時只接受本機直連
+import functools
+import hmac
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+ENTITY_BUCKETS = (0, 1, 10, 50, 100, 250, 500, 1000, 5000, 10000)
+
+# /api/metrics 自己的請求不列入統計
+METRICS_ENDPOINT = "metrics"
+
+_LOOPBACK = {"127.0.0.1", "::1"}
+
+_PERF_KEY = "_perf"
+_QUERY_START_KEY = "metrics_query_start"
+
+
+# ======================
+# Prometheus histogram
+# ======================
+class Histogram:
+    def __init__(self, name, help_text, buckets, labelnames=("endpoint",)):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [各 bucket 的數量..., sum, count]
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            base = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+            for bound, count in zip(self.buckets, series):
+                labels = ",".join(base + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {count}")
+            labels = ",".join(base + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{labels}}} {series[-1]}")
+            labels = ",".join(base)
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "整個請求的處理時間",
+    DURATION_BUCKETS, ("endpoint", "method", "status"),
+)
+VIEW_SECONDS = Histogram(
+    "http_request_view_seconds", "view function 的時間（含 SQL、JWT、序列化）",
+    DURATION_BUCKETS,
+)
+SQL_SECONDS = Histogram(
+    "http_request_sql_seconds", "請求內所有 SQL 的總時間", DURATION_BUCKETS,
+)
+SQL_STATEMENTS = Histogram(
+    "http_request_sql_statements", "請求內送出的 SQL 條數", COUNT_BUCKETS,
+)
+ORM_ENTITIES = Histogram(
+    "http_request_orm_entities", "請求內從資料庫建立的 ORM entity 數", ENTITY_BUCKETS,
+)
+JWT_SECONDS = Histogram(
+    "http_request_jwt_seconds", "JWT 解碼與驗證的時間", DURATION_BUCKETS,
+)
+SERIALIZE_SECONDS = Histogram(
+    "http_request_serialize_seconds", "JSON 序列化的時間", DURATION_BUCKETS,
+)
+
+HISTOGRAMS = (
+    REQUEST_SECONDS, VIEW_SECONDS, SQL_SECONDS, SQL_STATEMENTS,
+    ORM_ENTITIES, JWT_SECONDS, SERIALIZE_SECONDS,
+)
+
+
+def render_metrics():
+    return "\n".join(h.render() for h in HISTOGRAMS) + "\n"
+
+
+def metrics_allowed():
+    """
+    可不可以讀 /api/metrics
+    有設定 METRICS_TOKEN：要帶 Authorization: Bearer <token>
+    沒設定：只接受本機直接連線（經過 reverse proxy 的會帶 X-Forwarded-For，一律拒絕）
+    """
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        scheme, _, given = request.headers.get("Authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(
+            given.strip().encode(), token.encode()
+        )
+    return request.remote_addr in _LOOPBACK and "X-Forwarded-For" not in request.headers
+
+
+# ======================
+# 請求內的累計
+# ======================
+def _perf():
+    """目前請求的累計數字；不在請求裡回傳 None"""
+    if not has_request_context():
+        return None
+    perf = g.get(_PERF_KEY)
+    if perf is None:
+        perf = {
+            "start": time.perf_counter(),
+            "sql_count": 0, "sql_time": 0.0, "entities": 0,
+            "view_time": 0.0, "jwt_time": 0.0,
+            "serialize_time": 0.0, "status": None,
+        }
+        setattr(g, _PERF_KEY, perf)
+    return perf
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_QUERY_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    perf = _perf()
+    if perf is not None:
+        perf["sql_count"] += 1
+        perf["sql_time"] += elapsed
+
+    if has_app_context():
+        threshold = current_app.config.get("SLOW_QUERY_MS", 200)
+        if threshold and elapsed * 1000 >= threshold:
+            current_app.logger.warning(
+                "慢查詢 %.1f ms（%s）：%s",
+                elapsed * 1000,
+                request.endpoint if has_request_context() else "-",
+                statement,
+            )
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_query_start(exception_context):
+    # 執行失敗不會有 after_cursor_execute，開始時間要自己丟掉
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_QUERY_START_KEY):
+        conn.info[_QUERY_START_KEY].pop()
+
+
+@event.listens_for(Mapper, "load")
+def _count_loaded_entity(target, context):
+    perf = _perf()
+    if perf is not None:
+        perf["entities"] += 1
+
+
+# ======================
+# view / JSON / JWT 計時
+# ======================
+def _timed_view(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            perf = _perf()
+            if perf is not None:
+                perf["view_time"] += time.perf_counter() - started
+
+    return wrapper
+
+
+class TimedJSONProvider:
+    """包住 app.json：dumps / dumps_bytes / response 的時間算進序列化；其他屬性原樣轉給原本的 provider"""
+
+    def __init__(self, provider):
+        self._provider = provider
+        if hasattr(provider, "dumps_bytes"):
+            self.dumps_bytes = lambda obj, **kwargs: self._timed(
+                provider.dumps_bytes, obj, **kwargs
+            )
+
+    def __getattr__(self, name):
+        return getattr(self._provider, name)
+
+    def _timed(self, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            perf = _perf()
+            if perf is not None:
+                perf["serialize_time"] += time.perf_counter() - started
+
+    def dumps(self, obj, **kwargs):
+        return self._timed(self._provider.dumps, obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        return self._timed(self._provider.response, *args, **kwargs)
+
+
+# ======================
+# 掛到 app 上
+# ======================
+def init_app(app):
+    """在所有 route 註冊完之後呼叫"""
+    for endpoint, view in list(app.view_functions.items()):
+        app.view_functions[endpoint] = _timed_view(view)
+    app.json = TimedJSONProvider(app.json)
+
+    @app.before_request
+    def _start_request_timer():
+        _perf()
+
+    @app.before_request
+    def _time_jwt():
+        # 只量有帶 token 的請求；驗證失敗不在這裡處理，交給 view 上的 @jwt_required 回錯誤
+        # （token 會多解碼一次，HS256 只要幾十微秒）
+        if request.endpoint == METRICS_ENDPOINT or "Authorization" not in request.headers:
+            return
+        started = time.perf_counter()
+        try:
+            verify_jwt_in_request(optional=True)
+        except Exception:
+            pass
+        finally:
+            _perf()["jwt_time"] += time.perf_counter() - started
+
+    @app.after_request
+    def _add_server_timing(response):
+        perf = _perf()
+        perf["status"] = response.status_code
+        response.headers["Server-Timing"] = ", ".join(
+            f"{name};dur={value * 1000:.2f}"
+            for name, value in (
+                ("db", perf["sql_time"]),
+                ("jwt", perf["jwt_time"]),
+                ("json", perf["serialize_time"]),
+                ("view", perf["view_time"]),
+            )
+        )
+        if response.is_streamed and request.endpoint != METRICS_ENDPOINT:
+            # 串流回應（export）等 server 把 body 送完、關掉 response 才記，
+            # 產生 body 期間的 SQL 也算得進去
+            perf["deferred"] = True
+            endpoint, method, status = request.endpoint, request.method, response.status_code
+            response.call_on_close(lambda: _record(perf, endpoint, method, status))
+        return response
+
+    @app.teardown_request
+    def _record_request(exc):
+        perf = g.get(_PERF_KEY)
+        if perf is None or perf.get("deferred") or request.endpoint == METRICS_ENDPOINT:
+            return
+        status = perf["status"] or (500 if exc is not None else 200)
+        _record(perf, request.endpoint, request.method, status)
+
+
+def _record(perf, endpoint, method, status):
+    """一個請求只記一次（stream_with_context 會讓 teardown 跑兩次）"""
+    if perf.get("recorded"):
+        return
+    perf["recorded"] = True
+    endpoint = endpoint or "unmatched"
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - perf["start"],
+        endpoint=endpoint, method=method, status=status,
+    )
+    VIEW_SECONDS.observe(perf["view_time"], endpoint=endpoint)
+    SQL_SECONDS.observe(perf["sql_time"], endpoint=endpoint)
+    SQL_STATEMENTS.observe(perf["sql_count"], endpoint=endpoint)
+    ORM_ENTITIES.observe(perf["entities"], endpoint=endpoint)
+    JWT_SECONDS.observe(perf["jwt_time"], endpoint=endpoint)
+    SERIALIZE_SECONDS.observe(perf["serialize_time"], endpoint=endpoint)
@@ -0,0 +1,152 @@
+# app/migrations/__init__.py
+# 版本化的 schema migration（取代每次啟動都跑 db.create_all()）
+# - 每個版本一個模組 vNNNN_xxx.py，提供 upgrade(conn)；依序執行、每個版本一個交易
+# - 大表回填另外提供 backfill(engine)：schema 變更 commit 之後逐批各自 commit，
+#   全部做完才記錄版本；中斷後重跑會從還沒做的地方繼續（backfill 必須可以重複執行）
+# - 資料庫目前的版本記在 schema_version 表（只有一列）
+# - 部署時先跑 `flask db-upgrade`；app 啟動後第一個請求查一次版本，資料庫比程式舊就回 503
+# migration 模組只有升級時才 import，啟動時只用到 LATEST_VERSION
+import importlib
+import threading
+
+import click
+from flask import current_app, jsonify, request
+from sqlalchemy import Column, Integer, MetaData, Table, func, inspect, select, text
+
+from ..extensions import db
+
+# (版本, 模組名稱)：只能往後加，已經發佈的不要改
+MIGRATIONS = [
+    (1, "v0001_baseline"),
+    (2, "v0002_indexes"),
+    (3, "v0003_version_terms"),
+    (4, "v0004_project_stats"),
+    (5, "v0005_jobs"),
+    (6, "v0006_assets"),
+    (7, "v0007_prompt_text"),
+    (8, "v0008_tag_name_normalized"),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+_metadata = MetaData()
+schema_version = Table(
+    SCHEMA_VERSION_TABLE, _metadata,
+    Column("version", Integer, nullable=False),
+)
+
+# 多個 process 同時升級時，Postgres 用 advisory lock 排隊
+_ADVISORY_LOCK_ID = 74_210_018
+
+# 不碰資料庫的 endpoint 不用等 schema 檢查
+_SKIP_CHECK_ENDPOINTS = {"health", "metrics", "static"}
+
+
+def current_version(conn):
+    """資料庫目前的 schema 版本；還沒有 schema_version 表時是 0"""
+    if not inspect(conn).has_table(SCHEMA_VERSION_TABLE):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine, target=None, echo=None):
+    """
+    把資料庫升到 target（預設最新），回傳這次執行的 [(版本, 模組名稱), ...]
+    echo：每做完一個版本呼叫一次（CLI 用來印進度）
+    """
+    target = LATEST_VERSION if target is None else target
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        if conn.execute(select(func.count()).select_from(schema_version)).scalar() == 0:
+            conn.execute(schema_version.insert().values(version=0))
+
+    applied = []
+    for version, name in MIGRATIONS:
+        if version > target:
+            break
+        with engine.begin() as conn:
+            _lock(conn)
+            # 拿到鎖之後再讀一次，別的 process 可能已經升級過了
+            if current_version(conn) >= version:
+                continue
+            module = importlib.import_module(f"{__name__}.{name}")
+            module.upgrade(conn)
+            backfill = getattr(module, "backfill", None)
+            if backfill is None:
+                conn.execute(schema_version.update().values(version=version))
+        if backfill is not None:
+            backfill(engine)
+            with engine.begin() as conn:
+                _lock(conn)
+                conn.execute(
+                    schema_version.update()
+                    .where(schema_version.c.version < version)
+                    .values(version=version)
+                )
+        applied.append((version, name))
+        if echo is not None:
+            echo(version, name)
+    return applied
+
+
+def _lock(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+
+
+def init_app(app):
+    @app.cli.command("db-upgrade")
+    @click.option("--to", "target", type=int, default=None, help="升到哪一版（預設最新）")
+    def db_upgrade(target):
+        """執行還沒跑過的 schema migration"""
+        applied = upgrade(
+            db.engine, target,
+            echo=lambda version, name: click.echo(f"  {version:04d} {name}"),
+        )
+        with db.engine.connect() as conn:
+            version = current_version(conn)
+        if applied:
+            click.echo(f"已升級到第 {version} 版")
+        else:
+            click.echo(f"已經是第 {version} 版，不用升級")
+
+    @app.cli.command("db-status")
+    def db_status():
+        """顯示資料庫與程式的 schema 版本"""
+        with db.engine.connect() as conn:
+            version = current_version(conn)
+        click.echo(f"資料庫：第 {version} 版 / 程式：第 {LATEST_VERSION} 版")
+        for number, name in MIGRATIONS:
+            mark = "x" if number <= version else " "
+            click.echo(f"  [{mark}] {number:04d} {name}")
+
+    if not app.config.get("SCHEMA_CHECK", True):
+        return
+
+    state = {"ok": False}
+    lock = threading.Lock()
+
+    @app.before_request
+    def _check_schema_version():
+        # 每個 process 只要成功檢查一次；之後完全不碰資料庫
+        if state["ok"] or request.endpoint in _SKIP_CHECK_ENDPOINTS:
+            return None
+        with lock:
+            if state["ok"]:
+                return None
+            with db.engine.connect() as conn:
+                version = current_version(conn)
+            if version < LATEST_VERSION:
+                current_app.logger.error(
+                    "資料庫 schema 是第 %s 版，程式需要第 %s 版，請執行 flask db-upgrade",
+                    version, LATEST_VERSION,
+                )
+                return jsonify({"message": "資料庫尚未升級，請稍後再試"}), 503
+            if version > LATEST_VERSION:
+                # 滾動部署時舊程式會遇到新 schema；migration 只做相容的變更，照常服務
+                current_app.logger.warning(
+                    "資料庫 schema 是第 %s 版，比程式（第 %s 版）新", version, LATEST_VERSION,
+                )
+            state["ok"] = True
+        return None
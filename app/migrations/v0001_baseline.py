@@ -0,0 +1,153 @@
+# app/migrations/v0001_baseline.py
+# 第 1 版：目前所有資料表 + 全文檢索索引
+# 新資料庫直接建表；以前用 db.create_all() 建出來的舊資料庫，補上後來加的欄位與
+# unique 限制，並回填 version_counter / name_normalized
+# 這裡的表定義是凍結的，之後 models.py 再改要另外寫新的 migration
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text,
+    UniqueConstraint, inspect, text,
+)
+
+from .. import search_index
+
+metadata = MetaData()
+
+user = Table(
+    "user", metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("email", String(255), unique=True, nullable=False),
+    Column("username", String(100), nullable=False),
+    Column("password_hash", String(255), nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+project = Table(
+    "project", metadata,
+    Column("project_id", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("description", Text),
+    Column("owner_id", Integer, ForeignKey("user.user_id"), nullable=False),
+)
+
+project_member = Table(
+    "project_member", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("project_id", Integer, ForeignKey("project.project_id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("user.user_id"), nullable=False),
+    Column("role", String(20), nullable=False),
+    Column("joined_at", DateTime),
+)
+
+content = Table(
+    "content", metadata,
+    Column("content_id", Integer, primary_key=True),
+    Column("project_id", Integer, ForeignKey("project.project_id"), nullable=False),
+    Column("creator_user_id", Integer, ForeignKey("user.user_id")),
+    Column("latest_version_id", Integer, ForeignKey("content_version.version_id")),
+    Column("title", String(255), nullable=False),
+    Column("primary_type", String(30), nullable=False),
+    Column("source_tool", String(100)),
+    Column("created_at", DateTime),
+    Column("version_counter", Integer, nullable=False, server_default="0"),
+)
+
+content_version = Table(
+    "content_version", metadata,
+    Column("version_id", Integer, primary_key=True),
+    Column("content_id", Integer, ForeignKey("content.content_id"), nullable=False),
+    Column("created_by", Integer, ForeignKey("user.user_id")),
+    Column("version_number", Integer, nullable=False),
+    Column("prompt", Text),
+    Column("prompt_delta", Text),
+    Column("file_url", Text),
+    Column("created_at", DateTime),
+    UniqueConstraint(
+        "content_id", "version_number", name="uq_content_version_content_number"
+    ),
+)
+
+tag = Table(
+    "tag", metadata,
+    Column("tag_id", Integer, primary_key=True),
+    Column("name", String(100), unique=True, nullable=False),
+    Column("name_normalized", String(100), unique=True, nullable=False),
+    Column("created_by", Integer, ForeignKey("user.user_id")),
+)
+
+content_tag = Table(
+    "content_tag", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("content_id", Integer, ForeignKey("content.content_id"), nullable=False),
+    Column("tag_id", Integer, ForeignKey("tag.tag_id"), nullable=False),
+    UniqueConstraint("content_id", "tag_id", name="uq_content_tag_content_tag"),
+)
+
+
+def upgrade(conn):
+    existing = set(inspect(conn).get_table_names())
+    metadata.create_all(conn, checkfirst=True)
+
+    # 舊資料庫：create_all 不會改已經存在的表，後來加的東西要自己補
+    if "content" in existing:
+        _upgrade_legacy(conn)
+
+    search_index.create_search_index(conn)
+
+
+def _columns(conn, table):
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _upgrade_legacy(conn):
+    if "version_counter" not in _columns(conn, "content"):
+        conn.execute(text(
+            "ALTER TABLE content ADD COLUMN version_counter INTEGER NOT NULL DEFAULT 0"
+        ))
+        conn.execute(text(
+            "UPDATE content SET version_counter = coalesce(("
+            " SELECT max(v.version_number) FROM content_version v"
+            " WHERE v.content_id = content.content_id), 0)"
+        ))
+
+    if "prompt_delta" not in _columns(conn, "content_version"):
+        conn.execute(text("ALTER TABLE content_version ADD COLUMN prompt_delta TEXT"))
+
+    if "name_normalized" not in _columns(conn, "tag"):
+        # SQLite 不能事後加 NOT NULL 欄位，舊資料庫上這欄是 nullable（程式一定會填）
+        conn.execute(text("ALTER TABLE tag ADD COLUMN name_normalized VARCHAR(100)"))
+        conn.execute(text("UPDATE tag SET name_normalized = lower(trim(name))"))
+
+    # 同一個 content 重複掛同一個 tag：留最早那筆就好
+    conn.execute(text(
+        "DELETE FROM content_tag WHERE id NOT IN ("
+        " SELECT min(id) FROM content_tag GROUP BY content_id, tag_id)"
+    ))
+
+    _unique_index(conn, "uq_tag_name_normalized", "tag", ["name_normalized"])
+    _unique_index(
+        conn, "uq_content_version_content_number",
+        "content_version", ["content_id", "version_number"],
+    )
+    _unique_index(
+        conn, "uq_content_tag_content_tag", "content_tag", ["content_id", "tag_id"],
+    )
+
+
+def _unique_index(conn, name, table, columns):
+    """建 unique index；有重複資料就停下來，請人工處理（不猜要刪哪一筆）"""
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table)}
+    existing |= {uc["name"] for uc in inspect(conn).get_unique_constraints(table)}
+    if name in existing:
+        return
+    cols = ", ".join(columns)
+    duplicates = conn.execute(text(
+        f"SELECT {cols}, count(*) FROM {table} GROUP BY {cols} HAVING count(*) > 1 LIMIT 5"
+    )).all()
+    if duplicates:
+        sample = ", ".join(str(tuple(row)) for row in duplicates)
+        raise RuntimeError(
+            f"{table}({cols}) 有重複資料，無法建立 unique index {name}：{sample}"
+        )
+    conn.execute(text(f"CREATE UNIQUE INDEX {name} ON {table} ({cols})"))
@@ -0,0 +1,21 @@
+# app/migrations/v0002_indexes.py
+# 第 2 版：依實際的查詢補上次要索引（外鍵本身不會自動建 index）
+#   content(project_id, created_at, content_id)      專案 content 列表、ETag、匯出、search 的 ILIKE 退路
+#   project_member(user_id, project_id, role)        權限檢查（covering，不用回表）
+#   content_tag(tag_id, content_id)                  依標籤列 content
+# content_version(content_id, version_number) 與 content_tag(content_id, tag_id)
+# 在第 1 版已經是 unique index，不用重建
+from sqlalchemy import text
+
+INDEXES = [
+    ("ix_content_project_created", "content", ["project_id", "created_at", "content_id"]),
+    ("ix_project_member_user_project", "project_member", ["user_id", "project_id", "role"]),
+    ("ix_content_tag_tag_content", "content_tag", ["tag_id", "content_id"]),
+]
+
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+        ))
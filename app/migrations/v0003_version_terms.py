@@ -0,0 +1,58 @@
+# app/migrations/v0003_version_terms.py
+# 第 3 版：歷史版本搜尋的反向索引 version_term，並把既有的所有版本灌進去（backfill，分批 commit）
+# 回填直接讀這一版的 content_version 欄位（prompt / prompt_delta），不依賴之後的 model
+from sqlalchemy import Column, Integer, MetaData, String, Table, text
+
+from ..history_index import history_postings
+
+metadata = MetaData()
+
+version_term = Table(
+    "version_term", metadata,
+    Column("term", String(64), primary_key=True),
+    Column("project_id", Integer, primary_key=True, autoincrement=False),
+    Column("content_id", Integer, primary_key=True, autoincrement=False),
+    Column("version_id", Integer, primary_key=True, autoincrement=False),
+)
+
+# 每批回填幾個 content 的版本（每批一個交易）
+_BATCH = 200
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+
+
+def backfill(engine):
+    """
+    既有版本的 posting 分批寫入 version_term，每批一個交易
+    中斷後重跑從已經寫到的最後一個 content 之後繼續（每批整批 commit，寫到一半的不會留下）
+    """
+    with engine.connect() as conn:
+        last_id = conn.execute(text("SELECT max(content_id) FROM version_term")).scalar() or 0
+    while True:
+        with engine.begin() as conn:
+            content_ids = conn.execute(
+                text(
+                    "SELECT content_id FROM content WHERE content_id > :last "
+                    "ORDER BY content_id LIMIT :limit"
+                ),
+                {"last": last_id, "limit": _BATCH},
+            ).scalars().all()
+            if not content_ids:
+                return
+            rows = conn.execute(
+                text(
+                    "SELECT v.version_id, v.content_id, v.version_number, v.prompt,"
+                    " v.prompt_delta, c.project_id "
+                    "FROM content_version v JOIN content c ON c.content_id = v.content_id "
+                    "WHERE v.content_id BETWEEN :lo AND :hi "
+                    "ORDER BY v.content_id, v.version_number DESC"
+                ),
+                {"lo": content_ids[0], "hi": content_ids[-1]},
+            ).mappings().all()
+
+            postings = history_postings(rows)
+            for j in range(0, len(postings), 1000):
+                conn.execute(version_term.insert(), postings[j:j + 1000])
+        last_id = content_ids[-1]
@@ -0,0 +1,46 @@
+# app/migrations/v0004_project_stats.py
+# 第 4 版：專案統計表（project_stats / project_stat_bucket / project_tag_stat），
+# 並從既有資料算出初始值
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, MetaData, String, Table,
+)
+
+from .. import project_stats
+
+metadata = MetaData()
+
+# 外鍵指向的 project 表只要有名字就好（不會建立）
+Table("project", metadata, Column("project_id", Integer, primary_key=True))
+
+Table(
+    "project_stats", metadata,
+    Column("project_id", Integer, ForeignKey("project.project_id"),
+           primary_key=True, autoincrement=False),
+    Column("content_count", Integer, nullable=False),
+    Column("version_count", Integer, nullable=False),
+    Column("last_activity_at", DateTime),
+)
+
+Table(
+    "project_stat_bucket", metadata,
+    Column("project_id", Integer, primary_key=True, autoincrement=False),
+    Column("dimension", String(30), primary_key=True),
+    Column("bucket", String(100), primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+Table(
+    "project_tag_stat", metadata,
+    Column("project_id", Integer, primary_key=True, autoincrement=False),
+    Column("tag_id", Integer, primary_key=True, autoincrement=False),
+    Column("content_count", Integer, nullable=False),
+)
+
+_TABLES = ("project_stats", "project_stat_bucket", "project_tag_stat")
+
+
+def upgrade(conn):
+    metadata.create_all(
+        conn, tables=[metadata.tables[name] for name in _TABLES], checkfirst=True,
+    )
+    project_stats.rebuild(conn)
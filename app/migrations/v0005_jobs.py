@@ -0,0 +1,39 @@
+# app/migrations/v0005_jobs.py
+# 第 5 版：背景工作的 job 表（見 jobs.py）
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table,
+    Text,
+)
+
+metadata = MetaData()
+
+# 外鍵指向的 user 表只要有名字就好（不會建立）
+Table("user", metadata, Column("user_id", Integer, primary_key=True))
+
+job = Table(
+    "job", metadata,
+    Column("job_id", Integer, primary_key=True),
+    Column("job_type", String(50), nullable=False),
+    Column("status", String(20), nullable=False),
+    Column("params", JSON, nullable=False),
+    Column("result", JSON),
+    Column("error", Text),
+    Column("created_by", Integer, ForeignKey("user.user_id")),
+    Column("project_id", Integer),
+    Column("progress_done", Integer, nullable=False),
+    Column("progress_total", Integer),
+    Column("attempts", Integer, nullable=False),
+    Column("max_attempts", Integer, nullable=False),
+    Column("cancel_requested", Boolean, nullable=False),
+    Column("created_at", DateTime),
+    Column("run_after", DateTime),
+    Column("started_at", DateTime),
+    Column("finished_at", DateTime),
+    Column("heartbeat_at", DateTime),
+    Index("ix_job_status_type", "status", "job_type", "job_id"),
+    Index("ix_job_created_by", "created_by", "job_id"),
+)
+
+
+def upgrade(conn):
+    job.create(conn, checkfirst=True)
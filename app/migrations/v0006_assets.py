@@ -0,0 +1,37 @@
+# app/migrations/v0006_assets.py
+# 第 6 版：內容定址的檔案（asset）與專案的關聯（project_asset）
+from sqlalchemy import (
+    BigInteger, Column, DateTime, ForeignKey, Integer, MetaData, String, Table,
+)
+
+metadata = MetaData()
+
+# 外鍵指向的表只要有名字就好（不會建立）
+Table("user", metadata, Column("user_id", Integer, primary_key=True))
+Table("project", metadata, Column("project_id", Integer, primary_key=True))
+
+Table(
+    "asset", metadata,
+    Column("sha256", String(64), primary_key=True),
+    Column("size", BigInteger, nullable=False),
+    Column("content_type", String(255), nullable=False),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "project_asset", metadata,
+    Column("sha256", String(64), ForeignKey("asset.sha256"), primary_key=True),
+    Column("project_id", Integer, ForeignKey("project.project_id"),
+           primary_key=True, autoincrement=False),
+    Column("filename", String(255)),
+    Column("created_by", Integer, ForeignKey("user.user_id")),
+    Column("created_at", DateTime),
+)
+
+_TABLES = ("asset", "project_asset")
+
+
+def upgrade(conn):
+    metadata.create_all(
+        conn, tables=[metadata.tables[name] for name in _TABLES], checkfirst=True,
+    )
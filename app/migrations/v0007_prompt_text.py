@@ -0,0 +1,84 @@
+# app/migrations/v0007_prompt_text.py
+# 第 7 版：版本 prompt 去重，文字存進 prompt_text（主鍵是 SHA-256），版本記 prompt_sha256
+# 只做相容的變更：content_version.prompt 保留不動，升級前的程式照樣讀得到
+# （新程式用 queries.prompt_column()，兩邊都看）；等舊程式都下線，
+# 用 `flask prompts-drop-inline` 分批清掉（見 config.py 的 PROMPT_INLINE_COPY）
+from sqlalchemy import Column, MetaData, String, Table, Text, bindparam, inspect, text
+
+from ..prompt_store import prompt_hash
+from ..tagging import dialect_insert
+
+metadata = MetaData()
+
+prompt_text = Table(
+    "prompt_text", metadata,
+    Column("sha256", String(64), primary_key=True),
+    Column("text", Text, nullable=False),
+)
+
+# 每批回填幾個版本（每批一個交易）
+_BATCH = 1000
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+
+    columns = {c["name"] for c in inspect(conn).get_columns("content_version")}
+    if "prompt_sha256" not in columns:
+        conn.execute(text(
+            "ALTER TABLE content_version ADD COLUMN prompt_sha256 VARCHAR(64)"
+            " REFERENCES prompt_text (sha256)"
+        ))
+    # prompts-gc 查「還有沒有版本用到」、Postgres 刪 prompt_text 時的外鍵檢查都走這個 index
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_content_version_prompt_sha256 "
+        "ON content_version (prompt_sha256)"
+    ))
+
+
+def backfill(engine):
+    """既有版本的文字存進 prompt_text 並填上 prompt_sha256；已經填過的略過"""
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT version_id, prompt FROM content_version "
+                    "WHERE version_id > :last AND prompt IS NOT NULL "
+                    " AND prompt_sha256 IS NULL "
+                    "ORDER BY version_id LIMIT :limit"
+                ),
+                {"last": last_id, "limit": _BATCH},
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1].version_id
+
+            hashes = {row.version_id: prompt_hash(row.prompt) for row in rows}
+            _insert_texts(conn, {hashes[row.version_id]: row.prompt for row in rows})
+            conn.execute(
+                text(
+                    "UPDATE content_version SET prompt_sha256 = :sha256 "
+                    "WHERE version_id = :version_id"
+                ),
+                [{"sha256": h, "version_id": i} for i, h in hashes.items()],
+            )
+
+
+def _insert_texts(conn, texts):
+    """texts: {sha256: 文字}，已經存在的略過"""
+    rows = [{"sha256": h, "text": t} for h, t in sorted(texts.items())]
+    insert = dialect_insert(conn.dialect.name)
+    if insert is not None:
+        conn.execute(
+            insert(prompt_text).on_conflict_do_nothing(index_elements=["sha256"]), rows
+        )
+        return
+    known = set(conn.execute(
+        text("SELECT sha256 FROM prompt_text WHERE sha256 IN :hashes")
+        .bindparams(bindparam("hashes", expanding=True)),
+        {"hashes": list(texts)},
+    ).scalars())
+    missing = [r for r in rows if r["sha256"] not in known]
+    if missing:
+        conn.execute(prompt_text.insert(), missing)
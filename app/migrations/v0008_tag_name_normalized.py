@@ -0,0 +1,10 @@
+# app/migrations/v0008_tag_name_normalized.py
+# 第 8 版：重算 tag.name_normalized
+# 第 1 版的舊資料回填用的是 SQL lower(trim(name))，SQLite 上非 ASCII 的大寫不會轉小寫，
+# 跟程式寫入時用的 normalize_tag_name 不一致；這裡統一改用 Python 重算
+# 重算後有重複的標籤會停下來（沒有自動合併），處理完再重跑
+from .. import tagging
+
+
+def upgrade(conn):
+    tagging.renormalize_tag_names(conn)
@@ -1,9 +1,15 @@
 
 # app/models.py
 from datetime import datetime
+from sqlalchemy.orm import validates
 from .extensions import db
 
 
+def normalize_tag_name(name):
+    """標籤比對一律用去頭尾空白 + 小寫"""
+    return (name or "").strip().lower()
+
+
 # ======================
 # User
 # ======================
@@ -43,6 +49,10 @@ class Project(db.Model):
 # ======================
 class ProjectMember(db.Model):
     __tablename__ = "project_member"
+    __table_args__ = (
+        # 權限檢查：某個使用者參與的所有專案與角色，只讀索引就夠（見 authz.py）
+        db.Index("ix_project_member_user_project", "user_id", "project_id", "role"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(
@@ -67,6 +77,11 @@ class ProjectMember(db.Model):
 # ======================
 class Content(db.Model):
     __tablename__ = "content"
+    __table_args__ = (
+        # 專案的 content 列表依 (created_at, content_id) 新到舊分頁；
+        # 方向一致，B-tree 倒著讀就是 DESC，SQLite / Postgres 都不用另外排序
+        db.Index("ix_content_project_created", "project_id", "created_at", "content_id"),
+    )
 
     content_id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(
@@ -88,6 +103,8 @@ class Content(db.Model):
     primary_type = db.Column(db.String(30), nullable=False)  # text/image/...
     source_tool = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 目前發到第幾版（新增版本時 UPDATE ... RETURNING 原子地 +1）
+    version_counter = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     project = db.relationship("Project", backref="contents")
     creator = db.relationship(
@@ -118,6 +135,14 @@ class Content(db.Model):
 # ======================
 class ContentVersion(db.Model):
     __tablename__ = "content_version"
+    __table_args__ = (
+        # 同一個 content 的版號不能重複；版本列表 / diff / 差異壓縮也都走這個 index
+        db.UniqueConstraint(
+            "content_id", "version_number", name="uq_content_version_content_number"
+        ),
+        # prompts-gc 與刪除 prompt_text 時的外鍵檢查用
+        db.Index("ix_content_version_prompt_sha256", "prompt_sha256"),
+    )
 
     version_id = db.Column(db.Integer, primary_key=True)
     # 指向這個版本屬於哪個 Content
@@ -131,7 +156,14 @@ class ContentVersion(db.Model):
         db.ForeignKey("user.user_id"),
     )
     version_number = db.Column(db.Integer, nullable=False)
+    # 完整的 prompt 存在 prompt_text，這裡只記文字的 SHA-256（相同文字的版本共用一筆）
+    prompt_sha256 = db.Column(db.String(64), db.ForeignKey("prompt_text.sha256"))
+    # 新增版本時填這裡，flush 時會存進 prompt_text 並填上 prompt_sha256；
+    # PROMPT_INLINE_COPY 開著時這裡也留一份（升級期間舊程式直接讀這欄）
+    # 讀取一律用 queries.prompt_column() / prompt_store.version_prompt()
     prompt = db.Column(db.Text)
+    # 差異壓縮時：這一版相對於下一版的差異，這時 prompt / prompt_sha256 是 NULL（見 prompt_store.py）
+    prompt_delta = db.Column(db.Text)
     file_url = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -148,6 +180,19 @@ class ContentVersion(db.Model):
         foreign_keys=[created_by],
     )
 
+    prompt_text = db.relationship("PromptText")
+
+
+# ======================
+# PromptText（版本 prompt 的文字，相同內容只存一份）
+# ======================
+class PromptText(db.Model):
+    """主鍵是文字的 SHA-256；寫入時整批 get-or-create（見 prompt_store.intern_prompts）"""
+    __tablename__ = "prompt_text"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    text = db.Column(db.Text, nullable=False)
+
 
 # ======================
 # Tag
@@ -157,6 +202,8 @@ class Tag(db.Model):
 
     tag_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
+    # 小寫後的名稱，不分大小寫比對時走這個 unique index（取代 ILIKE）
+    name_normalized = db.Column(db.String(100), unique=True, nullable=False)
     created_by = db.Column(
         db.Integer,
         db.ForeignKey("user.user_id"),
@@ -164,12 +211,23 @@ class Tag(db.Model):
 
     creator = db.relationship("User", backref="tags")
 
+    @validates("name")
+    def _sync_name_normalized(self, key, value):
+        self.name_normalized = normalize_tag_name(value)
+        return value
+
 
 # ======================
 # ContentTag（多對多關聯表）
 # ======================
 class ContentTag(db.Model):
     __tablename__ = "content_tag"
+    __table_args__ = (
+        # 同一個 content 不會重複掛同一個 tag（bulk insert 靠它略過重複）
+        db.UniqueConstraint("content_id", "tag_id", name="uq_content_tag_content_tag"),
+        # 反方向：某個 tag 底下的 content，依 content_id 分頁
+        db.Index("ix_content_tag_tag_content", "tag_id", "content_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     content_id = db.Column(
@@ -185,3 +243,138 @@ class ContentTag(db.Model):
 
     content = db.relationship("Content", backref="content_tags")
     tag = db.relationship("Tag", backref="content_tags")
+
+
+# ======================
+# VersionTerm（歷史版本 prompt 的反向索引）
+# ======================
+class VersionTerm(db.Model):
+    """
+    term -> 版本的 posting list，每個版本的 prompt 裡出現的每個字一筆（見 history_index.py）
+    主鍵開頭是 (term, project_id)，「某個字、這幾個專案」直接在索引上查完
+    """
+    __tablename__ = "version_term"
+
+    term = db.Column(db.String(64), primary_key=True)
+    project_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+
+# ======================
+# ProjectStats（每個專案的統計，見 project_stats.py）
+# ======================
+class ProjectStats(db.Model):
+    """新增 content / 版本 / 標籤時在同一個交易裡累加，summary API 只要一次主鍵查詢"""
+    __tablename__ = "project_stats"
+
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey("project.project_id"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    content_count = db.Column(db.Integer, nullable=False, default=0)
+    version_count = db.Column(db.Integer, nullable=False, default=0)
+    last_activity_at = db.Column(db.DateTime)
+
+
+class ProjectStatBucket(db.Model):
+    """依欄位值分組的 content 數：dimension 是 primary_type / source_tool"""
+    __tablename__ = "project_stat_bucket"
+
+    project_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    dimension = db.Column(db.String(30), primary_key=True)
+    # source_tool 沒填時存空字串（主鍵不能是 NULL）
+    bucket = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ProjectTagStat(db.Model):
+    """專案裡掛了這個標籤的 content 數"""
+    __tablename__ = "project_tag_stat"
+
+    project_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tag_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ======================
+# Job（背景工作，見 jobs.py）
+# ======================
+class Job(db.Model):
+    """
+    匯出、重建索引、大量掛標籤等耗時的工作；由 jobs.py 的 runner 在背景 thread 執行
+    status：queued → running → succeeded / failed / cancelled（失敗可重試時回到 queued）
+    """
+    __tablename__ = "job"
+    __table_args__ = (
+        # runner 找下一個要跑的工作、計算某種工作正在跑幾個
+        db.Index("ix_job_status_type", "status", "job_type", "job_id"),
+        # 使用者的工作列表，新到舊分頁
+        db.Index("ix_job_created_by", "created_by", "job_id"),
+    )
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    params = db.Column(db.JSON, nullable=False)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    # 從 CLI 送出的工作沒有使用者
+    created_by = db.Column(
+        db.Integer,
+        db.ForeignKey("user.user_id"),
+    )
+    project_id = db.Column(db.Integer)
+
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=1)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 重試時要等到這個時間之後才會再跑
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # 執行中的工作由 runner 定期更新；太久沒更新代表那個 process 掛了
+    heartbeat_at = db.Column(db.DateTime)
+
+
+# ======================
+# Asset（內容定址的檔案，見 blob_store.py / assets.py）
+# ======================
+class Asset(db.Model):
+    """同樣內容的檔案只存一份，主鍵就是 SHA-256（也是磁碟上的檔名）"""
+    __tablename__ = "asset"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    # 第一次上傳時的 Content-Type
+    content_type = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ProjectAsset(db.Model):
+    """哪些專案上傳過這個檔案；下載時只要是其中一個專案的成員就可以"""
+    __tablename__ = "project_asset"
+
+    sha256 = db.Column(
+        db.String(64),
+        db.ForeignKey("asset.sha256"),
+        primary_key=True,
+    )
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey("project.project_id"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    filename = db.Column(db.String(255))
+    created_by = db.Column(
+        db.Integer,
+        db.ForeignKey("user.user_id"),
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
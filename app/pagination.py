@@ -0,0 +1,148 @@
+# app/pagination.py
+# Keyset（cursor）分頁：用上一頁最後一筆的排序鍵往後找，不用 OFFSET
+# 不管翻到第幾頁，成本都一樣
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import Select, and_, or_, tuple_
+
+from .extensions import db
+
+
+class CursorKind:
+    """
+    一種 cursor：name 會編進 cursor 裡，types 是每個排序鍵的型別（int / float / str / datetime）
+    同一個 API 有兩種排序時（例如搜尋的相關度 / 建立時間），靠 name 分辨，不會拿錯
+    """
+
+    def __init__(self, name, *types):
+        self.name = name
+        self.types = types
+
+
+class CursorValues(list):
+    """解開的 cursor：排序鍵的值；kind 是產生這個 cursor 的 CursorKind"""
+
+    def __init__(self, kind, values):
+        super().__init__(values)
+        self.kind = kind
+
+
+def encode_cursor(values, kind):
+    """把排序鍵（list）編成不透明的字串"""
+    values = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps([kind.name] + values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, kinds):
+    """
+    encode_cursor 的反向，回傳 CursorValues；格式不對就丟 ValueError
+    kinds：這個 API 接受的 CursorKind；cursor 的種類、欄位數、每個值的型別都要對得上
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or not values:
+            raise ValueError("cursor 不是陣列")
+        kind = next((k for k in kinds if k.name == values[0]), None)
+        if kind is None:
+            raise ValueError("cursor 不是這個列表的")
+        values = values[1:]
+        if len(values) != len(kind.types):
+            raise ValueError("cursor 欄位數不對")
+        return CursorValues(kind, [_decode_value(v, t) for v, t in zip(values, kind.types)])
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise ValueError("cursor 格式錯誤") from exc
+
+
+def _decode_value(value, expected):
+    if value is None:
+        return None
+    if expected is datetime:
+        if not (isinstance(value, dict) and set(value) == {"$dt"}
+                and isinstance(value["$dt"], str)):
+            raise ValueError("cursor 的值應該是時間")
+        return datetime.fromisoformat(value["$dt"])
+    # bool 也是 int，一起擋掉；float 的欄位也接受整數（例如分數剛好是 0）
+    if isinstance(value, bool):
+        raise ValueError("cursor 的值型別不對")
+    if expected is float and isinstance(value, (int, float)):
+        return float(value)
+    if expected in (int, str) and isinstance(value, expected):
+        return value
+    raise ValueError("cursor 的值型別不對")
+
+
+def get_page_args(*kinds):
+    """
+    讀取 ?limit= 與 ?cursor=（kinds 是這個 API 接受的 CursorKind）
+    回傳 (limit, after, error)；after 是 CursorValues（after.kind 看是哪一種）；
+    error 不是 None 時請直接回 400
+    """
+    default_limit = current_app.config.get("PAGE_DEFAULT_LIMIT", 50)
+    max_limit = current_app.config.get("PAGE_MAX_LIMIT", 200)
+
+    try:
+        limit = int(request.args.get("limit", default_limit))
+    except ValueError:
+        return None, None, "limit 必須是整數"
+    if limit < 1:
+        return None, None, "limit 必須大於 0"
+    limit = min(limit, max_limit)
+
+    after = None
+    token = request.args.get("cursor")
+    if token:
+        try:
+            after = decode_cursor(token, kinds)
+        except ValueError as exc:
+            return None, None, str(exc)
+
+    return limit, after, None
+
+
+def keyset_filter(keys, after):
+    """
+    keys: [(column, descending), ...]，after: 上一頁最後一筆的排序鍵
+    產生「排在 after 之後」的條件
+    """
+    columns = [col for col, _ in keys]
+    directions = {desc for _, desc in keys}
+
+    # 方向一致時用 row value 比較，Postgres 可以直接走複合索引
+    if len(directions) == 1 and len(keys) > 1:
+        left, right = tuple_(*columns), tuple_(*after)
+        return left < right if directions.pop() else left > right
+
+    clauses = []
+    for i, (col, desc) in enumerate(keys):
+        prefix = [c == v for c, v in zip(columns[:i], after[:i])]
+        clauses.append(and_(*prefix, col < after[i] if desc else col > after[i]))
+    return or_(*clauses)
+
+
+def fetch_page(query, keys, after, limit):
+    """
+    對 ORM query 或 select() 套用 keyset 分頁，多抓一筆判斷有沒有下一頁
+    回傳 (rows, has_more)；select() 回傳的是 Row
+    """
+    if after is not None:
+        query = query.filter(keyset_filter(keys, after))
+
+    query = query.order_by(*[col.desc() if desc else col.asc() for col, desc in keys])
+    query = query.limit(limit + 1)
+    if isinstance(query, Select):
+        rows = db.session.execute(query).all()
+    else:
+        rows = query.all()
+    return rows[:limit], len(rows) > limit
+
+
+def next_cursor(rows, has_more, key_fn, kind):
+    """有下一頁才回傳 cursor，key_fn 從最後一筆取出排序鍵"""
+    if not has_more or not rows:
+        return None
+    return encode_cursor(list(key_fn(rows[-1])), kind)
@@ -0,0 +1,281 @@
+# app/project_stats.py
+# 每個專案的統計（反正規化）：content 數（依 primary_type / source_tool）、版本數、
+# 最後活動時間、各標籤的 content 數
+# - 交易中新增的 content / 版本 / 標籤關聯先記在 session.info，commit 前一次累加
+#   （SET n = n + :delta，並行寫入不會互相蓋掉）
+# - ORM 新增的物件在 after_flush 自動收集；bulk INSERT（匯入、掛標籤）要自己呼叫 record_*
+# - 算錯或漏算時用 flask project-stats-rebuild 從原始資料重算
+from collections import Counter
+from datetime import datetime
+
+import click
+from sqlalchemy import delete, event, func, select, update
+
+from .extensions import db
+from .models import (
+    Content, ContentTag, ContentVersion, Project, ProjectStatBucket, ProjectStats,
+    ProjectTagStat, Tag,
+)
+
+# session.info 裡暫存這次交易的變動
+_PENDING_KEY = "project_stats_pending"
+
+# 分組統計的欄位
+DIMENSIONS = ("primary_type", "source_tool")
+
+
+def _bucket(value):
+    return value or ""
+
+
+# ======================
+# 記錄變動
+# ======================
+def _pending(session):
+    return session.info.setdefault(
+        _PENDING_KEY, {"contents": [], "versions": [], "tags": []}
+    )
+
+
+def record_contents(session, contents):
+    """新增的 content：[(project_id, primary_type, source_tool), ...]"""
+    _pending(session)["contents"].extend(contents)
+
+
+def record_versions(session, content_ids):
+    """新增的版本，每個版本給一個 content_id"""
+    _pending(session)["versions"].extend(content_ids)
+
+
+def record_tag_links(session, links):
+    """新增的 content_tag 關聯：[(content_id, tag_id), ...]"""
+    _pending(session)["tags"].extend(links)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_new_rows(session, flush_context):
+    contents, versions, links = [], [], []
+    for obj in session.new:
+        if isinstance(obj, Content):
+            contents.append((obj.project_id, obj.primary_type, obj.source_tool))
+        elif isinstance(obj, ContentVersion):
+            versions.append(obj.content_id)
+        elif isinstance(obj, ContentTag):
+            links.append((obj.content_id, obj.tag_id))
+    if contents:
+        record_contents(session, contents)
+    if versions:
+        record_versions(session, versions)
+    if links:
+        record_tag_links(session, links)
+
+
+@event.listens_for(db.session, "before_commit")
+def _apply_before_commit(session):
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        apply_changes(session.connection(), pending)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ======================
+# 累加
+# ======================
+def apply_changes(conn, pending):
+    """把記下來的變動換算成各專案的增量，寫進統計表"""
+    # 版本、標籤只知道 content_id，一次查出各自屬於哪個專案
+    content_ids = set(pending["versions"]) | {c for c, _ in pending["tags"]}
+    projects = {}
+    if content_ids:
+        projects = dict(conn.execute(
+            select(Content.content_id, Content.project_id)
+            .where(Content.content_id.in_(sorted(content_ids)))
+        ).all())
+
+    totals = {}
+    buckets = Counter()
+    for project_id, primary_type, source_tool in pending["contents"]:
+        totals.setdefault(project_id, Counter())["content_count"] += 1
+        buckets[(project_id, "primary_type", _bucket(primary_type))] += 1
+        buckets[(project_id, "source_tool", _bucket(source_tool))] += 1
+    for content_id in pending["versions"]:
+        if content_id in projects:
+            totals.setdefault(projects[content_id], Counter())["version_count"] += 1
+    tags = Counter()
+    for content_id, tag_id in pending["tags"]:
+        if content_id in projects:
+            tags[(projects[content_id], tag_id)] += 1
+            totals.setdefault(projects[content_id], Counter())
+
+    now = datetime.utcnow()
+    for project_id, delta in sorted(totals.items()):
+        _increment(
+            conn, ProjectStats, {"project_id": project_id},
+            {"content_count": delta["content_count"], "version_count": delta["version_count"]},
+            {"last_activity_at": now},
+        )
+    for (project_id, dimension, bucket), n in sorted(buckets.items()):
+        _increment(
+            conn, ProjectStatBucket,
+            {"project_id": project_id, "dimension": dimension, "bucket": bucket},
+            {"count": n},
+        )
+    for (project_id, tag_id), n in sorted(tags.items()):
+        _increment(
+            conn, ProjectTagStat, {"project_id": project_id, "tag_id": tag_id},
+            {"content_count": n},
+        )
+
+
+def _increment(conn, model, key, deltas, assign=None):
+    """
+    有這一列就把 deltas 加上去，沒有就新增（INSERT ... ON CONFLICT DO UPDATE）
+    assign 是直接覆寫的欄位
+    """
+    from .tagging import dialect_insert  # tagging 也會 import 這個模組
+
+    assign = assign or {}
+    insert = dialect_insert(conn.dialect.name)
+    if insert is not None:
+        stmt = insert(model).values(**key, **deltas, **assign)
+        changes = {
+            name: getattr(model, name) + getattr(stmt.excluded, name) for name in deltas
+        }
+        changes.update({name: getattr(stmt.excluded, name) for name in assign})
+        conn.execute(stmt.on_conflict_do_update(index_elements=list(key), set_=changes))
+        return
+
+    # 其他資料庫：先 UPDATE，沒有這一列再 INSERT
+    values = {name: getattr(model, name) + n for name, n in deltas.items()}
+    values.update(assign)
+    result = conn.execute(
+        update(model)
+        .where(*[getattr(model, name) == value for name, value in key.items()])
+        .values(**values)
+    )
+    if result.rowcount == 0:
+        conn.execute(model.__table__.insert().values(**key, **deltas, **assign))
+
+
+# ======================
+# 重算
+# ======================
+def rebuild(conn, project_ids=None):
+    """從原始資料重算統計（project_ids 是 None 時全部重算），回傳重算了幾個專案"""
+    def only(column):
+        return [] if project_ids is None else [column.in_(project_ids)]
+
+    for model in (ProjectStats, ProjectStatBucket, ProjectTagStat):
+        conn.execute(delete(model).where(*only(model.project_id)))
+
+    stats = {
+        project_id: {
+            "project_id": project_id, "content_count": 0, "version_count": 0,
+            "last_activity_at": None,
+        }
+        for project_id in conn.scalars(
+            select(Project.project_id).where(*only(Project.project_id))
+        )
+    }
+    if not stats:
+        return 0
+
+    def touch(project_id, at):
+        current = stats[project_id]["last_activity_at"]
+        if at is not None and (current is None or at > current):
+            stats[project_id]["last_activity_at"] = at
+
+    bucket_rows = Counter()
+    for project_id, primary_type, source_tool, n, last_at in conn.execute(
+        select(
+            Content.project_id, Content.primary_type, Content.source_tool,
+            func.count(), func.max(Content.created_at),
+        )
+        .where(*only(Content.project_id))
+        .group_by(Content.project_id, Content.primary_type, Content.source_tool)
+    ):
+        stats[project_id]["content_count"] += n
+        touch(project_id, last_at)
+        bucket_rows[(project_id, "primary_type", _bucket(primary_type))] += n
+        bucket_rows[(project_id, "source_tool", _bucket(source_tool))] += n
+
+    for project_id, n, last_at in conn.execute(
+        select(Content.project_id, func.count(), func.max(ContentVersion.created_at))
+        .join(ContentVersion, ContentVersion.content_id == Content.content_id)
+        .where(*only(Content.project_id))
+        .group_by(Content.project_id)
+    ):
+        stats[project_id]["version_count"] = n
+        touch(project_id, last_at)
+
+    tag_rows = [
+        {"project_id": project_id, "tag_id": tag_id, "content_count": n}
+        for project_id, tag_id, n in conn.execute(
+            select(Content.project_id, ContentTag.tag_id, func.count())
+            .join(ContentTag, ContentTag.content_id == Content.content_id)
+            .where(*only(Content.project_id))
+            .group_by(Content.project_id, ContentTag.tag_id)
+        )
+    ]
+
+    conn.execute(ProjectStats.__table__.insert(), list(stats.values()))
+    if bucket_rows:
+        conn.execute(ProjectStatBucket.__table__.insert(), [
+            {"project_id": p, "dimension": d, "bucket": b, "count": n}
+            for (p, d, b), n in bucket_rows.items()
+        ])
+    for i in range(0, len(tag_rows), 1000):
+        conn.execute(ProjectTagStat.__table__.insert(), tag_rows[i:i + 1000])
+    return len(stats)
+
+
+# ======================
+# 讀取
+# ======================
+def summary(session, project_id, top_tags=50):
+    """專案統計；還沒有任何資料的專案回傳全部是 0"""
+    stats = session.get(ProjectStats, project_id)
+    result = {
+        "project_id": project_id,
+        "content_count": stats.content_count if stats else 0,
+        "version_count": stats.version_count if stats else 0,
+        "last_activity_at": stats.last_activity_at if stats else None,
+    }
+    for dimension in DIMENSIONS:
+        result[f"by_{dimension}"] = {}
+    for dimension, bucket, count in session.execute(
+        select(ProjectStatBucket.dimension, ProjectStatBucket.bucket, ProjectStatBucket.count)
+        .where(ProjectStatBucket.project_id == project_id, ProjectStatBucket.count > 0)
+    ):
+        result[f"by_{dimension}"][bucket] = count
+
+    result["tags"] = [
+        {"tag_id": tag_id, "name": name, "content_count": count}
+        for tag_id, name, count in session.execute(
+            select(Tag.tag_id, Tag.name, ProjectTagStat.content_count)
+            .join(Tag, Tag.tag_id == ProjectTagStat.tag_id)
+            .where(ProjectTagStat.project_id == project_id, ProjectTagStat.content_count > 0)
+            .order_by(ProjectTagStat.content_count.desc(), Tag.tag_id.asc())
+            .limit(top_tags)
+        )
+    ]
+    return result
+
+
+# ======================
+# Flask 整合
+# ======================
+def init_app(app):
+    @app.cli.command("project-stats-rebuild")
+    @click.option("--project", "project_ids", type=int, multiple=True,
+                  help="只重算這些專案（可以給多次，預設全部）")
+    def project_stats_rebuild(project_ids):
+        """從原始資料重算專案統計（修正累加造成的誤差）"""
+        with db.engine.begin() as conn:
+            count = rebuild(conn, list(project_ids) or None)
+        click.echo(f"已重算 {count} 個專案的統計")
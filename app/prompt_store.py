@@ -0,0 +1,453 @@
+# app/prompt_store.py
+# 版本 prompt 的存放方式
+# 1. 文字去重：完整文字存在 prompt_text（主鍵是 SHA-256），版本只記 prompt_sha256
+#    - 套同一個範本、重新產生、匯入重複資料時，同樣的文字只存一份
+#    - 新增版本時先填 ContentVersion.prompt，flush 前整批存進 prompt_text（一個 INSERT）
+#    - bulk INSERT 不經過 ORM 時自己呼叫 intern_prompts()
+#    - PROMPT_INLINE_COPY 開著時 content_version.prompt 也留一份（升級期間給舊程式讀）
+#    - 舊程式都下線後用 `flask prompts-drop-inline` 清掉 content_version.prompt 裡的文字
+#    - 沒有版本使用的文字由 `flask prompts-gc` 清掉
+# 2. 差異壓縮（reverse delta，跟 RCS 一樣）
+# - 最新版本一定存完整的 prompt（搜尋、列表第一頁都直接用）
+# - 新增版本時，把上一個版本改存成「相對於下一版」的差異（prompt_delta）
+# - 每 PROMPT_SNAPSHOT_INTERVAL 版保留一份完整快照，還原時最多往回套這麼多次
+# - PROMPT_STORAGE = "full" 時維持舊行為，全部存完整文字
+import hashlib
+import json
+import re
+
+import click
+from flask import current_app
+from sqlalchemy import bindparam, delete, event, exists, inspect, select, text, update
+
+from . import queries
+from .extensions import db
+from .models import Content, ContentVersion, PromptText
+from .tagging import dialect_insert
+
+# 以「空白 / 非空白」切 token，接起來可以完全還原原文
+_TOKEN_RE = re.compile(r"\s+|\S+")
+
+# 差異要比原文小這個比例才值得存
+_MIN_SAVING = 0.8
+
+# 一個 INSERT 最多帶幾筆文字
+_INTERN_BATCH = 500
+
+# Postgres：寫入文字時拿共享鎖、prompts-gc 刪除時拿排他鎖（見 collect_garbage）
+_GC_LOCK_ID = 74_210_025
+
+
+def tokenize(text_value):
+    return _TOKEN_RE.findall(text_value or "")
+
+
+# ======================
+# 文字去重
+# ======================
+def prompt_hash(text_value):
+    return hashlib.sha256(text_value.encode("utf-8")).hexdigest()
+
+
+def intern_prompts(session, texts):
+    """
+    把 texts 存進 prompt_text（已經有的略過），回傳 {文字: sha256}；None 不處理
+    不會 commit；用 session 目前的連線，flush 進行中也可以呼叫
+    """
+    hashes = {t: prompt_hash(t) for t in texts if t is not None}
+    if not hashes:
+        return {}
+    # 依雜湊排序再寫，兩個交易同時寫入同樣的文字時鎖的順序一樣，不會互相卡死
+    rows = sorted(
+        ({"sha256": h, "text": t} for t, h in hashes.items()), key=lambda r: r["sha256"]
+    )
+    conn = session.connection()
+    if conn.dialect.name == "postgresql":
+        # 鎖到 commit：「文字已經存在」到版本寫進去之間，prompts-gc 不會把它刪掉
+        conn.execute(text("SELECT pg_advisory_xact_lock_shared(:id)"), {"id": _GC_LOCK_ID})
+    insert = dialect_insert(conn.dialect.name)
+    for i in range(0, len(rows), _INTERN_BATCH):
+        chunk = rows[i:i + _INTERN_BATCH]
+        if insert is not None:
+            conn.execute(
+                insert(PromptText).on_conflict_do_nothing(index_elements=["sha256"]), chunk
+            )
+            continue
+        known = set(conn.scalars(
+            select(PromptText.sha256)
+            .where(PromptText.sha256.in_([r["sha256"] for r in chunk]))
+        ))
+        missing = [r for r in chunk if r["sha256"] not in known]
+        if missing:
+            conn.execute(PromptText.__table__.insert(), missing)
+    return hashes
+
+
+def keep_inline_copy():
+    return current_app.config.get("PROMPT_INLINE_COPY", False)
+
+
+def version_prompt(version):
+    """ORM 物件的完整 prompt（差異壓縮的版本是 None，要用 load_prompts 還原）"""
+    if version.prompt is not None:
+        return version.prompt
+    if version.prompt_sha256 is None:
+        return None
+    return version.prompt_text.text
+
+
+@event.listens_for(db.session, "before_flush")
+def _intern_before_flush(session, flush_context, instances):
+    pending = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, ContentVersion) and obj.prompt is not None
+        and (obj.prompt_sha256 is None or inspect(obj).attrs.prompt.history.has_changes())
+    ]
+    if not pending:
+        return
+    hashes = intern_prompts(session, [obj.prompt for obj in pending])
+    inline = keep_inline_copy()
+    for obj in pending:
+        obj.prompt_sha256 = hashes[obj.prompt]
+        if not inline:
+            obj.prompt = None
+
+
+def collect_garbage(session, batch=1000):
+    """
+    刪除沒有任何版本使用的 prompt_text（差異壓縮後留下的），回傳刪了幾筆；每批各自 commit
+    跟同時新增的版本不會衝突：
+    - Postgres：每批拿排他的 advisory lock，intern_prompts 拿共享鎖到 commit，
+      拿到鎖時用到這些文字的版本都已經 commit，NOT EXISTS 看得到
+    - SQLite：寫入本來就一次一個交易
+    """
+    removed = 0
+    last = ""
+    while True:
+        keys = session.scalars(
+            select(PromptText.sha256)
+            .where(PromptText.sha256 > last)
+            .order_by(PromptText.sha256)
+            .limit(batch)
+        ).all()
+        if not keys:
+            break
+        last = keys[-1]
+        conn = session.connection()
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _GC_LOCK_ID})
+        removed += session.execute(
+            delete(PromptText)
+            .where(
+                PromptText.sha256.in_(keys),
+                ~exists().where(ContentVersion.prompt_sha256 == PromptText.sha256),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+    return removed
+
+
+def drop_inline_copies(session, batch=1000):
+    """
+    清掉 content_version.prompt 裡的文字（改由 prompt_text 提供），回傳清了幾筆；每批各自 commit
+    升級期間舊程式寫的版本（只有 prompt、沒有 prompt_sha256）先存進 prompt_text 再清
+    中斷後重跑會從還沒清的地方繼續
+    """
+    table = ContentVersion.__table__
+    cleared = 0
+    last = 0
+    while True:
+        rows = session.execute(
+            select(table.c.version_id, table.c.prompt, table.c.prompt_sha256)
+            .where(table.c.version_id > last, table.c.prompt.is_not(None))
+            .order_by(table.c.version_id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            break
+        last = rows[-1].version_id
+        hashes = intern_prompts(
+            session, [row.prompt for row in rows if row.prompt_sha256 is None]
+        )
+        # prompt 還有值才清：同時被 prompts-compact 改成差異的版本不要把 prompt_sha256 填回去
+        cleared += session.execute(
+            update(table)
+            .where(table.c.version_id == bindparam("b_version_id"), table.c.prompt.is_not(None))
+            .values(prompt=None, prompt_sha256=bindparam("b_sha256")),
+            [
+                {"b_version_id": row.version_id,
+                 "b_sha256": row.prompt_sha256 or hashes[row.prompt]}
+                for row in rows
+            ],
+        ).rowcount
+        session.commit()
+    return cleared
+
+
+# ======================
+# 差異編碼
+# ======================
+def make_delta(base, target):
+    """
+    產生「從 base 變成 target」的差異（JSON 字串）
+    ops: ["=", n] 複製 base 的 n 個 token / ["-", n] 跳過 n 個 / ["+", "文字"] 插入
+    """
+    import difflib  # 只有寫入 / diff 時用到，不在啟動時載入
+
+    a, b = tokenize(base), tokenize(target)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if j2 > j1:
+            ops.append(["+", "".join(b[j1:j2])])
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+
+def apply_delta(base, delta):
+    tokens = tokenize(base)
+    out = []
+    pos = 0
+    for op, arg in json.loads(delta):
+        if op == "=":
+            out.extend(tokens[pos:pos + arg])
+            pos += arg
+        elif op == "-":
+            pos += arg
+        else:
+            out.append(arg)
+    return "".join(out)
+
+
+def delta_to_diff(base, delta):
+    """
+    直接用存好的差異產生 diff，不用重新比對
+    base 是較新的版本，delta 描述怎麼變回舊版本；回傳「舊 → 新」的 diff
+    """
+    tokens = tokenize(base)
+    diff = []
+    pos = 0
+    for op, arg in json.loads(delta):
+        if op == "=":
+            diff.append({"op": "equal", "text": "".join(tokens[pos:pos + arg])})
+            pos += arg
+        elif op == "-":
+            # 新版本有、舊版本沒有
+            diff.append({"op": "insert", "text": "".join(tokens[pos:pos + arg])})
+            pos += arg
+        else:
+            diff.append({"op": "delete", "text": arg})
+    return diff
+
+
+def text_diff(old, new):
+    """兩段完整文字直接比對，格式同 delta_to_diff"""
+    import difflib
+
+    a, b = tokenize(old), tokenize(new)
+    diff = []
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            diff.append({"op": "equal", "text": "".join(a[i1:i2])})
+            continue
+        if i2 > i1:
+            diff.append({"op": "delete", "text": "".join(a[i1:i2])})
+        if j2 > j1:
+            diff.append({"op": "insert", "text": "".join(b[j1:j2])})
+    return diff
+
+
+# ======================
+# 寫入
+# ======================
+def _delta_enabled():
+    return current_app.config.get("PROMPT_STORAGE", "full") == "delta"
+
+
+def _snapshot_interval():
+    return max(1, current_app.config.get("PROMPT_SNAPSHOT_INTERVAL", 10))
+
+
+def encode_against_next(version, next_prompt):
+    """
+    version 的下一版文字是 next_prompt 時，視情況把 version 改存成差異
+    回傳是否有改
+    """
+    prompt = version_prompt(version)
+    if prompt is None or next_prompt is None or version.prompt_delta is not None:
+        return False
+    if version.version_number % _snapshot_interval() == 0:
+        return False
+
+    delta = make_delta(next_prompt, prompt)
+    if len(delta) >= len(prompt) * _MIN_SAVING:
+        return False
+
+    # 文字本身留在 prompt_text（可能還有別的版本共用），沒人用的由 prompts-gc 清掉
+    version.prompt_delta = delta
+    version.prompt = None
+    version.prompt_sha256 = None
+    return True
+
+
+def on_new_version(content_id, version_number, new_prompt):
+    """
+    新增第 version_number 版時呼叫，把前一版改存成差異
+    只找「剛好前一號」的版本，確保差異的基準一定是緊接的下一版
+    """
+    if version_number <= 1 or not _delta_enabled():
+        return
+    previous = (
+        ContentVersion.query
+        .filter_by(content_id=content_id, version_number=version_number - 1)
+        .first()
+    )
+    if previous is not None:
+        encode_against_next(previous, new_prompt)
+
+
+# ======================
+# 讀取 / 還原
+# ======================
+def reconstruct(rows):
+    """
+    rows: 同一個 content、版號由大到小連續的版本（dict 或 ORM 物件皆可，
+    需要 version_number / prompt / prompt_delta）
+    回傳 {version_number: prompt}；缺少基準版本時那幾筆是 None
+    """
+    texts = {}
+    newer = None
+    for row in rows:
+        prompt, delta = _get(row, "prompt"), _get(row, "prompt_delta")
+        number = _get(row, "version_number")
+        if delta is None:
+            texts[number] = prompt
+        elif newer is not None and texts.get(newer) is not None and newer == number + 1:
+            texts[number] = apply_delta(texts[newer], delta)
+        else:
+            texts[number] = None
+        newer = number
+    return texts
+
+
+def _get(row, key):
+    if isinstance(row, ContentVersion) and key == "prompt":
+        return version_prompt(row)
+    return row[key] if isinstance(row, dict) else getattr(row, key)
+
+
+def load_prompts(session, content_id, versions):
+    """
+    versions: 同一個 content、一頁由新到舊的版本
+    第一筆是差異時，往上找到完整版本的那一段一起撈，回傳 {version_number: prompt}
+    """
+    if not versions:
+        return {}
+    versions = sorted(versions, key=lambda v: v.version_number, reverse=True)
+    chain = []
+    if versions[0].prompt_delta is not None:
+        chain = _chain_above(session, content_id, versions[0].version_number)
+    texts = reconstruct(chain + list(versions))
+    return {v.version_number: texts.get(v.version_number) for v in versions}
+
+
+def _chain_above(session, content_id, version_number):
+    """version_number 以上、直到第一個完整版本（含）的那幾版，由新到舊"""
+    rows = []
+    step = _snapshot_interval()
+    lower = version_number
+    while True:
+        batch = session.execute(
+            select(
+                ContentVersion.version_number,
+                queries.prompt_column().label("prompt"),
+                ContentVersion.prompt_delta,
+            )
+            .where(
+                ContentVersion.content_id == content_id,
+                ContentVersion.version_number > lower,
+            )
+            .order_by(ContentVersion.version_number.asc())
+            .limit(step)
+        ).mappings().all()
+        rows.extend(batch)
+        if not batch or any(r["prompt_delta"] is None for r in batch):
+            break
+        lower = batch[-1]["version_number"]
+
+    # 只留到第一個完整版本
+    for i, r in enumerate(rows):
+        if r["prompt_delta"] is None:
+            rows = rows[:i + 1]
+            break
+    return list(reversed(rows))
+
+
+def load_prompt(session, content_id, version):
+    return load_prompts(session, content_id, [version])[version.version_number]
+
+
+# ======================
+# 既有資料壓縮
+# ======================
+def compact_content(session, content_id):
+    """把一個 content 的歷史版本改存差異，回傳改了幾筆"""
+    versions = (
+        session.query(ContentVersion)
+        .filter(ContentVersion.content_id == content_id)
+        .order_by(ContentVersion.version_number.desc())
+        .all()
+    )
+    texts = reconstruct(versions)
+    changed = 0
+    for newer, version in zip(versions, versions[1:]):
+        if newer.version_number != version.version_number + 1:
+            continue
+        if encode_against_next(version, texts.get(newer.version_number)):
+            changed += 1
+    return changed
+
+
+def init_app(app):
+    @app.cli.command("prompts-compact")
+    @click.option("--batch", default=200, help="每處理幾個 content commit 一次")
+    def prompts_compact(batch):
+        """把既有的版本歷史改存成快照 + 差異（需要 PROMPT_STORAGE=delta）"""
+        if not _delta_enabled():
+            click.echo("PROMPT_STORAGE 不是 delta，略過")
+            return
+
+        content_ids = db.session.scalars(
+            select(Content.content_id).order_by(Content.content_id)
+        ).all()
+        total = 0
+        for i, content_id in enumerate(content_ids, 1):
+            total += compact_content(db.session, content_id)
+            if i % batch == 0:
+                db.session.commit()
+                db.session.expunge_all()
+        db.session.commit()
+        click.echo(f"已壓縮 {total} 個版本（共 {len(content_ids)} 個 content）")
+
+    @app.cli.command("prompts-gc")
+    @click.option("--batch", default=1000, help="每批檢查幾筆文字（每批 commit 一次）")
+    def prompts_gc(batch):
+        """刪除沒有任何版本使用的 prompt 文字（差異壓縮後留下的）"""
+        removed = collect_garbage(db.session, batch)
+        click.echo(f"已刪除 {removed} 筆沒有使用的 prompt 文字")
+
+    @app.cli.command("prompts-drop-inline")
+    @click.option("--batch", default=1000, help="每批清幾個版本（每批 commit 一次）")
+    def prompts_drop_inline(batch):
+        """清掉 content_version.prompt 的文字，只留 prompt_text 那份（升級到第 7 版的第二階段）"""
+        if keep_inline_copy():
+            click.echo("PROMPT_INLINE_COPY 還開著（新版本仍會寫入 content_version.prompt），略過")
+            return
+        cleared = drop_inline_copies(db.session, batch)
+        click.echo(f"已清掉 {cleared} 個版本的 content_version.prompt")
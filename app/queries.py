@@ -0,0 +1,136 @@
+# app/queries.py
+# 列表 API 的唯讀查詢：select() 只撈需要的欄位，回傳 Row（tuple，可用屬性取值），
+# 不建立 ORM entity，也不進 identity map
+# ?fields=a,b,c 可以只要部分欄位（例如不要很長的 prompt），沒給就是全部
+from flask import request
+from sqlalchemy import func, select
+
+from .extensions import db
+from .models import Content, ContentTag, ContentVersion, PromptText, Tag
+
+# 各列表可以用 ?fields= 挑的欄位（也是預設輸出的欄位與順序）
+CONTENT_LIST_FIELDS = (
+    "content_id", "title", "primary_type", "source_tool", "created_at", "latest_version",
+)
+VERSION_LIST_FIELDS = (
+    "version_id", "version_number", "created_by", "created_at", "prompt", "file_url",
+    "response_ref",
+)
+# search 的 prompt 指的是 latest_version.prompt
+SEARCH_FIELDS = (
+    "content_id", "title", "project_id", "primary_type", "latest_version", "prompt",
+)
+
+
+def prompt_column():
+    """
+    版本 prompt 的欄位運算式；prompt 存放方式改變時只要改這裡
+    content_version.prompt 有值（舊程式寫的、還沒清掉的、PROMPT_INLINE_COPY）就直接用，
+    否則用 prompt_sha256 到 prompt_text 查（主鍵）
+    """
+    interned = (
+        select(PromptText.text)
+        .where(PromptText.sha256 == ContentVersion.prompt_sha256)
+        .scalar_subquery()
+    )
+    return func.coalesce(ContentVersion.prompt, interned)
+
+
+def parse_fields(allowed):
+    """
+    讀取 ?fields=（逗號分隔）
+    回傳 (fields, error)；error 不是 None 時請直接回 400
+    """
+    raw = request.args.get("fields")
+    if not raw:
+        return set(allowed), None
+    fields = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        return None, f"fields 不支援：{', '.join(sorted(unknown))}（可用：{', '.join(allowed)}）"
+    return fields, None
+
+
+def pick(item, fields, allowed):
+    """依 allowed 的順序，只留 fields 裡有的 key（item 沒有的 key 略過）"""
+    return {name: item[name] for name in allowed if name in fields and name in item}
+
+
+# ======================
+# 單一欄位
+# ======================
+def content_project_id(content_id):
+    """content 屬於哪個專案；content 不存在回傳 None（權限檢查用，不載入整個 Content）"""
+    return db.session.execute(
+        select(Content.project_id).where(Content.content_id == content_id)
+    ).scalar_one_or_none()
+
+
+# ======================
+# 列表
+# ======================
+def project_contents(project_id, fields):
+    """專案的 content 列表；分頁鍵 created_at / content_id 一定會選"""
+    columns = [Content.content_id, Content.created_at]
+    columns += [
+        getattr(Content, name)
+        for name in ("title", "primary_type", "source_tool")
+        if name in fields
+    ]
+    stmt = select(*columns).where(Content.project_id == project_id)
+    if "latest_version" in fields:
+        # latest_version_id 本身就是版本 id，只有版號需要 JOIN
+        stmt = stmt.add_columns(
+            Content.latest_version_id,
+            ContentVersion.version_number.label("latest_version_number"),
+        ).outerjoin(ContentVersion, ContentVersion.version_id == Content.latest_version_id)
+    return stmt
+
+
+def content_versions(content_id, fields):
+    """content 的版本列表；要 prompt 時連 prompt_delta 一起選（差異壓縮要還原）"""
+    columns = [ContentVersion.version_id, ContentVersion.version_number]
+    columns += [
+        getattr(ContentVersion, name)
+        for name in ("created_by", "created_at", "file_url")
+        if name in fields
+    ]
+    if "prompt" in fields:
+        columns += [prompt_column().label("prompt"), ContentVersion.prompt_delta]
+    return select(*columns).where(ContentVersion.content_id == content_id)
+
+
+def contents_with_latest(fields):
+    """content + 最新版本（search 用）；分頁鍵 created_at 一定會選"""
+    columns = [
+        Content.content_id, Content.title, Content.project_id, Content.primary_type,
+        Content.created_at,
+        ContentVersion.version_id, ContentVersion.version_number,
+    ]
+    if "prompt" in fields:
+        columns.append(prompt_column().label("prompt"))
+    return select(*columns).outerjoin(
+        ContentVersion, Content.latest_version_id == ContentVersion.version_id
+    )
+
+
+def tag_list():
+    return select(Tag.tag_id, Tag.name)
+
+
+def content_tag_rows(content_id):
+    """某個 content 的標籤，依掛上去的順序"""
+    return db.session.execute(
+        select(Tag.tag_id, Tag.name)
+        .join(ContentTag, ContentTag.tag_id == Tag.tag_id)
+        .where(ContentTag.content_id == content_id)
+        .order_by(ContentTag.id.asc())
+    ).all()
+
+
+def contents_by_tag(tag_id):
+    return (
+        select(Content.content_id, Content.title, Content.project_id)
+        .join(ContentTag, ContentTag.content_id == Content.content_id)
+        .where(ContentTag.tag_id == tag_id)
+    )
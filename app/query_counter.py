@@ -0,0 +1,51 @@
+# app/query_counter.py
+# 計算一段程式碼送出多少條 SQL，用來抓 N+1 查詢
+#
+# 用法：
+#     with count_queries(db.engine) as counter:
+#         client.get("/api/contents/project/1", headers=...)
+#     print(counter.count, counter.statements)
+#
+#     with assert_max_queries(db.engine, 4):
+#         client.get("/api/versions/content/1", headers=...)
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """在 with 區塊內記錄 engine 送出的每一條 SQL"""
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(engine, max_count):
+    """with 區塊內的 SQL 數量超過 max_count 就丟 AssertionError（附上所有 SQL）"""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > max_count:
+        detail = "\n".join(
+            f"  {i}. {sql}" for i, sql in enumerate(counter.statements, 1)
+        )
+        raise AssertionError(
+            f"預期最多 {max_count} 條 SQL，實際送出 {counter.count} 條：\n{detail}"
+        )
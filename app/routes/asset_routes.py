@@ -0,0 +1,109 @@
+# app/routes/asset_routes.py
+# 檔案上傳 / 下載（內容定址，同樣的檔案只存一份）
+from flask import Blueprint, Response, current_app, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from ..extensions import blob_store, db
+from .. import assets
+from ..authz import user_in_project
+from ..blob_store import SHA256_RE, BlobMismatch, BlobTooLarge
+
+asset_bp = Blueprint("assets", __name__)
+
+# 內容不會變（網址就是內容的雜湊），快取一年；要登入才能下載，所以是 private
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+@asset_bp.route("/project/<int:project_id>", methods=["POST"])
+@jwt_required()
+def upload_asset(project_id):
+    """
+    上傳檔案：body 直接是檔案內容（不是 multipart），邊收邊寫到磁碟
+    - Content-Type：檔案的類型（預設 application/octet-stream）
+    - X-Filename（可選）：原始檔名
+    - X-Content-SHA256（可選）：用戶端算好的雜湊，內容不符回 400
+    回傳的 file_url 可以直接填進版本的 file_url；這個專案已經有同樣的檔案時回 200，否則 201
+    （只看這個專案，不會透露別的專案有沒有同樣的檔案）
+    """
+    user_id = int(get_jwt_identity())
+
+    if not user_in_project(user_id, project_id):
+        return jsonify({"message": "你沒有這個專案的權限"}), 403
+
+    if request.mimetype.startswith("multipart/"):
+        return jsonify({"message": "請直接上傳檔案內容，不支援 multipart"}), 415
+
+    max_bytes = blob_store.max_bytes
+    if max_bytes is not None and (request.content_length or 0) > max_bytes:
+        return jsonify({"message": f"檔案最大 {max_bytes} bytes"}), 413
+
+    expected = request.headers.get("X-Content-SHA256")
+    if expected is not None:
+        expected = expected.strip().lower()
+        if not SHA256_RE.match(expected):
+            return jsonify({"message": "X-Content-SHA256 必須是 64 個十六進位字元"}), 400
+
+    try:
+        sha256, size, _ = blob_store.save_stream(request.stream, expected)
+    except BlobTooLarge:
+        return jsonify({"message": f"檔案最大 {max_bytes} bytes"}), 413
+    except BlobMismatch:
+        return jsonify({"message": "檔案內容跟 X-Content-SHA256 不符"}), 400
+
+    content_type, linked = assets.register(
+        db.session, project_id, user_id, sha256, size,
+        request.mimetype or "application/octet-stream",
+        filename=request.headers.get("X-Filename"),
+    )
+    db.session.commit()
+
+    return jsonify({
+        "sha256": sha256,
+        "size": size,
+        "content_type": content_type,
+        "file_url": assets.asset_url(sha256),
+        "deduplicated": not linked,
+    }), 201 if linked else 200
+
+
+@asset_bp.route("/<sha256>", methods=["GET"])
+@jwt_required()
+def download_asset(sha256):
+    """
+    下載檔案（HEAD 也可以）：支援 Range（續傳、影片拖拉）與 If-None-Match（ETag 就是 SHA-256）
+    Content-Type 是上傳者填的：不在 assets.INLINE_CONTENT_TYPES 裡的一律當附件下載，
+    並加上 nosniff 與 CSP sandbox，瀏覽器不會把檔案當成這個網域的網頁執行
+    有設 ASSET_X_ACCEL_PREFIX 時交給 nginx 送檔（X-Accel-Redirect）；
+    否則用 WSGI server 的 file_wrapper（gunicorn 會用 sendfile），USE_X_SENDFILE 也有效
+    """
+    user_id = get_jwt_identity()
+
+    sha256 = sha256.lower()
+    if not SHA256_RE.match(sha256):
+        return jsonify({"message": "檔案不存在"}), 404
+
+    asset = assets.readable_asset(user_id, sha256)
+    if asset is None or not blob_store.exists(sha256):
+        return jsonify({"message": "檔案不存在"}), 404
+
+    accel_prefix = current_app.config.get("ASSET_X_ACCEL_PREFIX")
+    if accel_prefix:
+        response = Response(mimetype=asset.content_type)
+        response.headers["X-Accel-Redirect"] = (
+            accel_prefix.rstrip("/") + "/" + blob_store.relative_path(sha256).replace("\\", "/")
+        )
+        response.set_etag(sha256)
+    else:
+        response = send_file(
+            blob_store.path(sha256),
+            mimetype=asset.content_type,
+            conditional=True,
+            etag=sha256,
+            last_modified=asset.created_at,
+        )
+    if not assets.inline_allowed(asset.content_type):
+        response.headers.set("Content-Disposition", "attachment", filename=sha256)
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    response.headers["Content-Security-Policy"] = "default-src 'none'; sandbox"
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
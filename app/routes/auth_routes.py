@@ -1,12 +1,17 @@
 # Auth 路由（註冊 / 登入）
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
-from ..extensions import db, bcrypt
+from ..extensions import db, password_hasher
+from ..hashing import HashingBusy
 from ..models import User
 
 auth_bp = Blueprint("auth", __name__)
 
 
+def _busy_response():
+    return jsonify({"message": "系統忙碌中，請稍後再試"}), 503, {"Retry-After": "1"}
+
+
 @auth_bp.route("/register", methods=["POST"])
 def register():
     data = request.get_json() or {}
@@ -21,7 +26,10 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"message": "此 email 已被註冊"}), 400
 
-    pw_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+    try:
+        pw_hash = password_hasher.hash_password(password)
+    except HashingBusy:
+        return _busy_response()
 
     user = User(email=email, username=username, password_hash=pw_hash)
     db.session.add(user)
@@ -40,9 +48,20 @@ def login():
         return jsonify({"message": "email 和 password 必填"}), 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not bcrypt.check_password_hash(user.password_hash, password):
+    if not user:
         return jsonify({"message": "帳號或密碼錯誤"}), 401
 
+    try:
+        if not password_hasher.check_password(user.password_hash, password):
+            return jsonify({"message": "帳號或密碼錯誤"}), 401
+
+        # cost 設定改過：趁拿到明碼時換成新 cost 的雜湊
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash_password(password)
+            db.session.commit()
+    except HashingBusy:
+        return _busy_response()
+
     # ✅ 使用 user.user_id，且轉成字串，避免「Subject must be a string」
     access_token = create_access_token(identity=str(user.user_id))
 
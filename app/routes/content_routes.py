@@ -1,24 +1,23 @@
 # Content 的 API 範例（建立＋列表）
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
+from .. import assets, conditional, importer, queries
+from ..authz import user_in_project
+from ..json_provider import items_response
+from ..pagination import CursorKind, get_page_args, fetch_page, next_cursor
 from ..models import (
     Project,
-    ProjectMember,
     Content,
     ContentVersion,
 )
 
 content_bp = Blueprint("content", __name__)
 
-
-def _user_in_project(user_id, project_id):
-    return (
-        ProjectMember.query
-        .filter_by(user_id=user_id, project_id=project_id)
-        .first()
-        is not None
-    )
+# 列表依 (created_at, content_id) 由新到舊
+_LIST_CURSOR = CursorKind("contents", datetime, int)
 
 
 @content_bp.route("/project/<int:project_id>", methods=["GET"])
@@ -26,31 +25,52 @@ def _user_in_project(user_id, project_id):
 def list_project_contents(project_id):
     user_id = get_jwt_identity()
 
-    if not _user_in_project(user_id, project_id):
+    if not user_in_project(user_id, project_id):
         return jsonify({"message": "你沒有這個專案的權限"}), 403
 
-    contents = (
-        Content.query.filter_by(project_id=project_id)
-        .order_by(Content.created_at.desc())
-        .all()
+    limit, after, error = get_page_args(_LIST_CURSOR)
+    if error:
+        return jsonify({"message": error}), 400
+    fields, error = queries.parse_fields(queries.CONTENT_LIST_FIELDS)
+    if error:
+        return jsonify({"message": error}), 400
+
+    # 資料沒變就回 304，不撈資料也不序列化
+    etag, last_modified = conditional.project_contents_validators(project_id)
+    if conditional.is_not_modified(etag, last_modified):
+        return conditional.not_modified_response(etag, last_modified)
+
+    # 只選需要的欄位，latest_version 的版號用 JOIN 一起撈
+    contents, has_more = fetch_page(
+        queries.project_contents(project_id, fields),
+        [(Content.created_at, True), (Content.content_id, True)],
+        after,
+        limit,
     )
 
     result = []
     for c in contents:
-        latest = c.latest_version
-        result.append({
+        item = {
             "content_id": c.content_id,
-            "title": c.title,
-            "primary_type": c.primary_type,
-            "source_tool": c.source_tool,
-            "created_at": c.created_at.isoformat() if c.created_at else None,
-            "latest_version": {
-                "version_id": latest.version_id if latest else None,
-                "version_number": latest.version_number if latest else None,
-            },
-        })
-
-    return jsonify(result), 200
+            "created_at": c.created_at,
+        }
+        for name in ("title", "primary_type", "source_tool"):
+            if name in fields:
+                item[name] = getattr(c, name)
+        if "latest_version" in fields:
+            item["latest_version"] = {
+                "version_id": c.latest_version_id,
+                "version_number": c.latest_version_number,
+            }
+        result.append(queries.pick(item, fields, queries.CONTENT_LIST_FIELDS))
+
+    response = items_response(
+        result,
+        next_cursor=next_cursor(
+            contents, has_more, lambda c: (c.created_at, c.content_id), _LIST_CURSOR
+        ),
+    )
+    return conditional.with_validators(response, etag, last_modified), 200
 
 
 @content_bp.route("/project/<int:project_id>", methods=["POST"])
@@ -70,7 +90,7 @@ def create_content_with_first_version(project_id):
     user_id = get_jwt_identity()
     data = request.get_json() or {}
 
-    if not _user_in_project(user_id, project_id):
+    if not user_in_project(user_id, project_id):
         return jsonify({"message": "你沒有這個專案的權限"}), 403
 
     title = data.get("title")
@@ -81,6 +101,8 @@ def create_content_with_first_version(project_id):
 
     if not title:
         return jsonify({"message": "title 必填"}), 400
+    if assets.missing_assets(db.session, project_id, [file_url]):
+        return jsonify({"message": "file_url 指向的檔案不存在，或沒有上傳到這個專案"}), 400
 
     # 1. 建立 content
     content = Content(
@@ -89,6 +111,7 @@ def create_content_with_first_version(project_id):
         title=title,
         primary_type=primary_type,
         source_tool=source_tool,
+        version_counter=1,
     )
     db.session.add(content)
     db.session.flush()  # 先拿到 content_id
@@ -121,3 +144,36 @@ def create_content_with_first_version(project_id):
         },
     }), 201
 
+
+
+@content_bp.route("/project/<int:project_id>/import", methods=["POST"])
+@jwt_required()
+def import_contents(project_id):
+    """
+    大量匯入 content（各帶第一個版本，可選 tags）
+    - Content-Type: application/json     → body 是 JSON 陣列
+    - Content-Type: application/x-ndjson → 每行一筆，邊讀邊寫
+    每筆格式同 create_content_with_first_version，另外可帶 "tags": [...]
+    有問題的資料會列在 errors（index 從 0 開始，最多列 1000 筆，其餘只算進 failed），不影響其他筆
+    回應：{"imported": 筆數, "failed": 筆數, "errors": [...], "errors_truncated": bool}
+    """
+    user_id = int(get_jwt_identity())
+
+    if not user_in_project(user_id, project_id):
+        return jsonify({"message": "你沒有這個專案的權限"}), 403
+
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        records = importer.iter_ndjson(request.stream)
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return jsonify({"message": "body 必須是 JSON 陣列或 NDJSON"}), 400
+        records = importer.iter_json_array(items)
+
+    result = importer.import_contents(
+        project_id,
+        user_id,
+        records,
+        batch_size=current_app.config.get("IMPORT_BATCH_SIZE", 500),
+    )
+    return jsonify(result.to_dict()), 200
@@ -0,0 +1,140 @@
+# app/routes/job_routes.py
+# 背景工作 API：送出、查進度、取消、下載結果（只看得到自己送出的工作）
+import os
+
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+
+from ..extensions import db
+from .. import jobs
+from ..json_provider import items_response
+from ..models import Job
+from ..pagination import CursorKind, get_page_args, fetch_page, next_cursor
+
+job_bp = Blueprint("jobs", __name__)
+
+_LIST_CURSOR = CursorKind("jobs", int)
+
+
+def _job_json(job):
+    item = {
+        "job_id": job.job_id,
+        "type": job.job_type,
+        "status": job.status,
+        "project_id": job.project_id,
+        "progress": {"done": job.progress_done, "total": job.progress_total},
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "cancel_requested": job.cancel_requested,
+        "error": job.error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == "succeeded" and jobs.result_path(job):
+        item["result_url"] = f"/api/jobs/{job.job_id}/result"
+    return item
+
+
+def _own_job(job_id):
+    """自己送出的工作；別人的當作不存在"""
+    job = db.session.get(Job, job_id)
+    if job is None or job.created_by != int(get_jwt_identity()):
+        return None
+    return job
+
+
+@job_bp.route("", methods=["POST"])
+@jwt_required()
+def submit_job():
+    """
+    送出背景工作，立刻回 202
+    body 範例：{"type": "project-export", "params": {"project_id": 1, "format": "csv"}}
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    name = data.get("type")
+    params = data.get("params") or {}
+
+    public = sorted(n for n, spec in jobs.JOB_TYPES.items() if spec.public)
+    if name not in public:
+        return jsonify({"message": f"type 不支援：{name}（可用：{', '.join(public)}）"}), 400
+
+    try:
+        job = jobs.submit(db.session, name, params, user_id=user_id)
+    except jobs.JobRejected as exc:
+        return jsonify({"message": exc.message}), exc.status
+
+    return jsonify(_job_json(job)), 202, {"Location": f"/api/jobs/{job.job_id}"}
+
+
+@job_bp.route("", methods=["GET"])
+@jwt_required()
+def list_jobs():
+    """自己送出的工作，新到舊分頁；?status= ?type= 篩選"""
+    user_id = int(get_jwt_identity())
+
+    limit, after, error = get_page_args(_LIST_CURSOR)
+    if error:
+        return jsonify({"message": error}), 400
+
+    query = select(Job).where(Job.created_by == user_id)
+    status = request.args.get("status")
+    if status:
+        if status not in jobs.STATUSES:
+            return jsonify({"message": f"status 只能是 {', '.join(jobs.STATUSES)}"}), 400
+        query = query.where(Job.status == status)
+    name = request.args.get("type")
+    if name:
+        query = query.where(Job.job_type == name)
+
+    rows, has_more = fetch_page(query, [(Job.job_id, True)], after, limit)
+    items = [_job_json(row.Job) for row in rows]
+    return items_response(
+        items,
+        next_cursor=next_cursor(rows, has_more, lambda row: (row.Job.job_id,), _LIST_CURSOR),
+    ), 200
+
+
+@job_bp.route("/<int:job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({"message": "工作不存在"}), 404
+    return jsonify(_job_json(job)), 200
+
+
+@job_bp.route("/<int:job_id>/cancel", methods=["POST"])
+@jwt_required()
+def cancel_job(job_id):
+    """queued 的工作直接取消；running 的會在下次回報進度時中止（回 202）"""
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({"message": "工作不存在"}), 404
+    if not jobs.cancel(db.session, job):
+        return jsonify({"message": "工作已經結束，不能取消"}), 409
+    return jsonify(_job_json(job)), 200 if job.status == "cancelled" else 202
+
+
+@job_bp.route("/<int:job_id>/result", methods=["GET"])
+@jwt_required()
+def download_result(job_id):
+    """下載工作產生的檔案（例如 project-export）"""
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({"message": "工作不存在"}), 404
+    if job.status != "succeeded":
+        return jsonify({"message": "工作還沒完成"}), 409
+
+    path = jobs.result_path(job)
+    if path is None or not os.path.exists(path):
+        return jsonify({"message": "這個工作沒有可下載的檔案"}), 404
+    return send_file(
+        path,
+        mimetype=job.result.get("mimetype"),
+        as_attachment=True,
+        download_name=job.result.get("filename") or os.path.basename(path),
+    )
@@ -1,7 +1,11 @@
 # app/routes/project_routes.py
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
+from .. import exporter, project_stats
+from ..authz import user_in_project
 from ..models import Project, ProjectMember
 
 project_bp = Blueprint("projects", __name__)
@@ -42,3 +46,64 @@ def create_project():
             "owner_id": project.owner_id,
         }
     ), 201
+
+
+@project_bp.route("/<int:project_id>/summary", methods=["GET"])
+@jwt_required()
+def project_summary(project_id):
+    """
+    專案統計：content 數（依 primary_type / source_tool 分組）、版本數、最後活動時間、
+    各標籤的 content 數（多到少，最多 PROJECT_SUMMARY_TOP_TAGS 個）
+    讀的是預先累加好的統計表，不會去掃 content / content_version
+    by_source_tool 裡沒填 source_tool 的 content 算在 "" 底下
+    """
+    user_id = get_jwt_identity()
+
+    if not user_in_project(user_id, project_id):
+        return jsonify({"message": "你沒有這個專案的權限"}), 403
+
+    result = project_stats.summary(
+        db.session, project_id,
+        top_tags=current_app.config.get("PROJECT_SUMMARY_TOP_TAGS", 50),
+    )
+    return jsonify(result), 200
+
+
+@project_bp.route("/<int:project_id>/export", methods=["GET"])
+@jwt_required()
+def export_project(project_id):
+    """
+    匯出專案所有 content、版本與標籤（串流輸出，不會整包放進記憶體）
+    ?format=ndjson（預設，一個 content 一行）| csv（一個版本一列）| json（一個 JSON 陣列）
+    ?gzip=1 邊輸出邊壓縮
+    ?since=2024-01-01T00:00:00 只匯出這個時間之後建立的版本
+    """
+    user_id = get_jwt_identity()
+
+    if not user_in_project(user_id, project_id):
+        return jsonify({"message": "你沒有這個專案的權限"}), 403
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in exporter.FORMATS:
+        return jsonify({"message": "format 只能是 ndjson、csv 或 json"}), 400
+
+    since = request.args.get("since")
+    if since:
+        try:
+            since = datetime.fromisoformat(since)
+        except ValueError:
+            return jsonify({"message": "since 必須是 ISO 8601 時間格式"}), 400
+
+    use_gzip = request.args.get("gzip") in ("1", "true")
+
+    def generate():
+        records = exporter.iter_project_records(db.session, project_id, since=since)
+        yield from exporter.export_chunks(records, fmt, current_app.json, use_gzip)
+
+    filename, mimetype = exporter.export_filename(project_id, fmt, use_gzip)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,69 +1,230 @@
-#簡單搜尋 API：title + prompt 用 SQL ILIKE 查
-from flask import Blueprint, request, jsonify
+#搜尋 API：title + prompt 全文檢索（沒有索引時用 SQL ILIKE 查）
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 from ..extensions import db
-from ..models import (
-    ProjectMember,
-    Content,
-    ContentVersion,
-)
+from .. import facets, history_index, queries, search_index
+from ..json_provider import items_response
+from ..pagination import CursorKind, get_page_args, fetch_page, next_cursor
+from ..authz import get_project_roles
+from ..models import Content
 
 search_bp = Blueprint("search", __name__)
 
+# 三種排序各自的 cursor：索引的相關度 (score, content_id)、ILIKE 的 (created_at, content_id)、
+# scope=history 的最近命中 version_id；拿 A 的 cursor 翻 B 會回 400
+_RANK_CURSOR = CursorKind("search-rank", float, int)
+_RECENT_CURSOR = CursorKind("search-recent", datetime, int)
+_HISTORY_CURSOR = CursorKind("search-history", int)
+
 
 @search_bp.route("", methods=["GET"])
 @jwt_required()
 def search_contents():
     """
-    簡單搜尋：
+    全文檢索：
     - 在 content.title
     - 以及最新版本的 prompt
-    做 ILIKE 關鍵字查詢
+    用索引查詢並依相關度排序，支援 "片語" 與 前綴* 查詢
+    資料庫沒有建索引時，退回 ILIKE 關鍵字查詢
+
+    ?scope=history：改查所有歷史版本的 prompt（反向索引，見 history_index.py），
+    每筆多一個 matched_versions 列出命中的版本，依最近一次命中的版本新到舊排序
+
+    篩選（見 facets.py）：?tag=（可多個，全部都要有）&primary_type=&source_tool=&creator=
+    （可多個，符合其一）&project_id=&created_after=&created_before=
+    有篩選條件時 q 可以不給，列出所有符合的 content（新到舊）
+    ?facets=primary_type,source_tool,tag：另外回傳 facets，
+    是所有符合條件的 content（不只這一頁）的分組計數，total 是總筆數
     """
     user_id = get_jwt_identity()
     query = (request.args.get("q") or "").strip()
 
-    if not query:
-        return jsonify({"message": "請提供 q 參數作為搜尋關鍵字"}), 400
+    filters, error = facets.parse_filters()
+    if error:
+        return jsonify({"message": error}), 400
+    facet_names, error = facets.parse_facets()
+    if error:
+        return jsonify({"message": error}), 400
+
+    if not query and not filters:
+        return jsonify({"message": "請提供 q 參數作為搜尋關鍵字（或至少一個篩選條件）"}), 400
+
+    scope = request.args.get("scope", "latest")
+    if scope not in ("latest", "history"):
+        return jsonify({"message": "scope 只能是 latest 或 history"}), 400
+    if scope == "history" and not query:
+        return jsonify({"message": "scope=history 需要 q"}), 400
+
+    # 找出使用者有參與的專案 id（走權限快取）
+    project_ids = list(get_project_roles(user_id))
+    if "project_id" in filters:
+        if filters["project_id"] not in project_ids:
+            return jsonify({"message": "你沒有這個專案的權限"}), 403
+        project_ids = [filters["project_id"]]
+    if scope == "history":
+        limit, after, error = get_page_args(_HISTORY_CURSOR)
+    else:
+        limit, after, error = get_page_args(_RANK_CURSOR, _RECENT_CURSOR)
+    if error:
+        return jsonify({"message": error}), 400
+    fields, error = queries.parse_fields(queries.SEARCH_FIELDS)
+    if error:
+        return jsonify({"message": error}), 400
 
-    # 找出使用者有參與的專案 id
-    memberships = ProjectMember.query.filter_by(user_id=user_id).all()
-    project_ids = [m.project_id for m in memberships]
     if not project_ids:
-        return jsonify([]), 200
+        extra = {"facets": _empty_facets(facet_names)} if facet_names else {}
+        return jsonify({"items": [], "next_cursor": None, **extra}), 200
 
-    # JOIN content & content_version（只取最新版本）
-    q = (
-        db.session.query(Content, ContentVersion)
-        .join(
-            ContentVersion,
-            Content.latest_version_id == ContentVersion.version_id,
-            isouter=True
+    # 篩選條件先變成 content_id 的子查詢，跟索引查詢在資料庫裡取交集
+    restrict = facets.filtered_ids(project_ids, filters) if filters else None
+
+    if scope == "history":
+        return _history_search(project_ids, query, after, limit, fields, restrict, facet_names)
+
+    # 多抓一筆判斷有沒有下一頁
+    ranked = None
+    if query:
+        ranked = search_index.ranked_content_ids(
+            db.session, project_ids, query, limit=limit + 1,
+            after=after if after is not None and after.kind is _RANK_CURSOR else None,
+            restrict=restrict,
         )
-        .filter(Content.project_id.in_(project_ids))
-        .filter(
-            or_(
-                Content.title.ilike(f"%{query}%"),
-                ContentVersion.prompt.ilike(f"%{query}%")
-            )
+    # cursor 的排序方式要跟這次實際用的一樣（例如索引重建期間換成了 ILIKE）
+    expected = _RECENT_CURSOR if ranked is None else _RANK_CURSOR
+    if after is not None and after.kind is not expected:
+        return jsonify({"message": "cursor 跟目前的排序方式不符，請從第一頁重新查詢"}), 400
+    if ranked is None:
+        stmt = _ilike_query(project_ids, query, filters, fields)
+        rows, has_more = fetch_page(
+            stmt,
+            [(Content.created_at, True), (Content.content_id, True)],
+            after,
+            limit,
         )
-        .order_by(Content.created_at.desc())
-        .limit(50)
+        scores = {}
+        cursor = next_cursor(
+            rows, has_more, lambda row: (row.created_at, row.content_id), _RECENT_CURSOR
+        )
+        matched_ids = stmt.with_only_columns(Content.content_id)
+    else:
+        has_more = len(ranked) > limit
+        ranked = ranked[:limit]
+        scores = dict(ranked)
+        rows = _load_ranked(ranked, fields)
+        cursor = next_cursor(ranked, has_more, lambda r: (r[1], r[0]), _RANK_CURSOR)
+        matched = search_index.match_query(db.session.connection(), project_ids, query)
+        matched_ids = select(matched.c.content_id)
+        if restrict is not None:
+            matched_ids = matched_ids.where(matched.c.content_id.in_(restrict))
+
+    results = []
+    for row in rows:
+        item = _result_item(row, fields)
+        if row.content_id in scores:
+            item["score"] = scores[row.content_id]
+        results.append(item)
+
+    extra = {}
+    if facet_names:
+        extra["facets"] = _facet_counts(matched_ids, facet_names)
+    return items_response(results, next_cursor=cursor, **extra), 200
+
+
+def _facet_counts(matched_ids, facet_names):
+    return facets.facet_counts(
+        db.session, matched_ids, facet_names,
+        top_tags=current_app.config.get("SEARCH_FACET_TOP_TAGS", 20),
     )
 
+
+def _empty_facets(facet_names):
+    return {"total": 0, **{name: [] for name in facet_names}}
+
+
+def _history_search(project_ids, query, after, limit, fields, restrict, facet_names):
+    """所有歷史版本的 prompt 裡找，cursor 是上一頁最後一筆的最近命中 version_id"""
+    found = history_index.search(
+        db.session, project_ids, query,
+        limit=limit,
+        after=after[0] if after else None,
+        max_versions=current_app.config.get("HISTORY_SEARCH_MAX_VERSIONS", 20),
+        restrict=restrict,
+    )
+    if found is None:
+        return jsonify({"message": "q 裡沒有可以搜尋的字"}), 400
+    matches, has_more = found
+
+    rows = _load_ranked([(content_id, None) for content_id, _, _ in matches], fields)
+    versions = {content_id: hits for content_id, _, hits in matches}
     results = []
-    for content, version in q.all():
-        results.append({
-            "content_id": content.content_id,
-            "title": content.title,
-            "project_id": content.project_id,
-            "primary_type": content.primary_type,
-            "latest_version": {
-                "version_id": version.version_id if version else None,
-                "version_number": version.version_number if version else None,
-                "prompt": version.prompt if version else None,
-            },
-        })
-
-    return jsonify(results), 200
+    for row in rows:
+        item = _result_item(row, fields)
+        item["matched_versions"] = [
+            {
+                "version_id": v.version_id,
+                "version_number": v.version_number,
+                "created_at": v.created_at,
+            }
+            for v in versions[row.content_id]
+        ]
+        results.append(item)
+
+    cursor = next_cursor(matches, has_more, lambda m: (m[1],), _HISTORY_CURSOR)
+    extra = {}
+    if facet_names:
+        matched_ids = history_index.matched_content_ids(project_ids, query, restrict)
+        extra["facets"] = _facet_counts(matched_ids, facet_names)
+    return items_response(results, next_cursor=cursor, **extra), 200
+
+
+def _result_item(row, fields):
+    item = {
+        "content_id": row.content_id,
+        "title": row.title,
+        "project_id": row.project_id,
+        "primary_type": row.primary_type,
+    }
+    if "latest_version" in fields:
+        latest = {
+            "version_id": row.version_id,
+            "version_number": row.version_number,
+        }
+        if "prompt" in fields:
+            latest["prompt"] = row.prompt
+        item["latest_version"] = latest
+    return queries.pick(item, fields, queries.SEARCH_FIELDS)
+
+
+def _load_ranked(ranked, fields):
+    """依索引排好的 content_id 把資料撈回來，保持相關度順序"""
+    if not ranked:
+        return []
+    ids = [content_id for content_id, _ in ranked]
+    rows = db.session.execute(
+        queries.contents_with_latest(fields).where(Content.content_id.in_(ids))
+    ).all()
+    by_id = {row.content_id: row for row in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def _ilike_query(project_ids, query, filters, fields):
+    """
+    沒有全文索引時的舊做法：title + prompt 用 ILIKE 查（還沒分頁的 select）
+    query 是空字串時只套篩選條件
+    """
+    q = (
+        queries.contents_with_latest(fields)
+        .where(Content.project_id.in_(project_ids))
+        .where(*facets.conditions(filters))
+    )
+    if query:
+        q = q.where(
+            or_(
+                Content.title.ilike(f"%{query}%"),
+                queries.prompt_column().ilike(f"%{query}%")
+            )
+        )
+    return q
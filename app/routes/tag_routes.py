@@ -2,40 +2,75 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
+from ..authz import user_in_project
+from ..json_provider import items_response
+from ..pagination import CursorKind, get_page_args, fetch_page, next_cursor
+from ..tagging import attach_tags
+from .. import queries, tag_index
 from ..models import (
     Tag,
-    ContentTag,
     Content,
-    ProjectMember
+    normalize_tag_name,
 )
 
 tag_bp = Blueprint("tag", __name__)
 
+_TAG_CURSOR = CursorKind("tags", str)
+_CONTENT_CURSOR = CursorKind("tag-contents", int)
 
-def _user_in_project(user_id, project_id):
-    return (
-        ProjectMember.query
-        .filter_by(user_id=user_id, project_id=project_id)
-        .first()
-        is not None
-    )
+# 批次掛標籤一次最多處理幾個 content
+BULK_TAG_MAX_CONTENTS = 1000
+
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
 
 
 @tag_bp.route("", methods=["GET"])
 @jwt_required()
 def list_tags():
-    """列出所有標籤（可選簡單搜尋）"""
+    """列出所有標籤（可選簡單搜尋），依名稱分頁"""
     q = request.args.get("q")
 
-    query = Tag.query
+    limit, after, error = get_page_args(_TAG_CURSOR)
+    if error:
+        return jsonify({"message": error}), 400
+
+    query = queries.tag_list()
     if q:
-        query = query.filter(Tag.name.ilike(f"%{q}%"))
+        query = query.where(Tag.name.ilike(f"%{q}%"))
 
-    tags = query.order_by(Tag.name.asc()).all()
+    tags, has_more = fetch_page(query, [(Tag.name, False)], after, limit)
     result = [
         {"tag_id": t.tag_id, "name": t.name}
         for t in tags
     ]
+    return items_response(
+        result, next_cursor=next_cursor(tags, has_more, lambda t: (t.name,), _TAG_CURSOR)
+    ), 200
+
+
+@tag_bp.route("/autocomplete", methods=["GET"])
+@jwt_required()
+def autocomplete_tags():
+    """
+    標籤自動完成（打字時呼叫），不查資料庫
+    ?q=前綴&limit=10&sort=usage|name
+    """
+    prefix = normalize_tag_name(request.args.get("q"))
+    sort = request.args.get("sort", "usage")
+    if sort not in ("usage", "name"):
+        return jsonify({"message": "sort 只能是 usage 或 name"}), 400
+
+    try:
+        limit = int(request.args.get("limit", AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"message": "limit 必須是整數"}), 400
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+
+    result = [
+        {"tag_id": tag_id, "name": name, "usage": usage}
+        for tag_id, name, usage in tag_index.complete(prefix, limit=limit, sort=sort)
+    ]
     return jsonify(result), 200
 
 
@@ -50,7 +85,7 @@ def create_tag():
     if not name:
         return jsonify({"message": "name 必填"}), 400
 
-    existed = Tag.query.filter(Tag.name.ilike(name)).first()
+    existed = Tag.query.filter_by(name_normalized=normalize_tag_name(name)).first()
     if existed:
         # 已存在就直接回傳現有的
         return jsonify({
@@ -87,38 +122,14 @@ def add_tags_to_content(content_id):
     if not content:
         return jsonify({"message": "content 不存在"}), 404
 
-    if not _user_in_project(user_id, content.project_id):
+    if not user_in_project(user_id, content.project_id):
         return jsonify({"message": "你沒有這個專案的權限"}), 403
 
     if not isinstance(names, list) or len(names) == 0:
         return jsonify({"message": "tags 必須是非空的陣列"}), 400
 
-    attached = []
-    for raw_name in names:
-        name = (raw_name or "").strip()
-        if not name:
-            continue
-
-        # 1. 找或建 tag
-        tag = Tag.query.filter(Tag.name.ilike(name)).first()
-        if not tag:
-            tag = Tag(name=name, created_by=user_id)
-            db.session.add(tag)
-            db.session.flush()
-
-        # 2. 建 ContentTag（如果還沒有）
-        exists_ct = ContentTag.query.filter_by(
-            content_id=content_id,
-            tag_id=tag.tag_id
-        ).first()
-        if not exists_ct:
-            ct = ContentTag(content_id=content_id, tag_id=tag.tag_id)
-            db.session.add(ct)
-
-        attached.append({
-            "tag_id": tag.tag_id,
-            "name": tag.name
-        })
+    # 所有名稱一次處理：查既有標籤、補建缺的、掛上關聯
+    attached, _ = attach_tags([content_id], names, user_id)
 
     db.session.commit()
 
@@ -128,20 +139,75 @@ def add_tags_to_content(content_id):
     }), 200
 
 
+@tag_bp.route("/bulk", methods=["POST"])
+@jwt_required()
+def bulk_tag_contents():
+    """
+    一次幫多個 content 加上同一組標籤
+    body 範例：
+    {
+      "content_ids": [1, 2, 3],
+      "tags": ["企劃", "AI 回覆"]
+    }
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    content_ids = data.get("content_ids") or []
+    names = data.get("tags") or []
+
+    if not isinstance(content_ids, list) or len(content_ids) == 0:
+        return jsonify({"message": "content_ids 必須是非空的陣列"}), 400
+    if len(content_ids) > BULK_TAG_MAX_CONTENTS:
+        return jsonify({
+            "message": f"content_ids 一次最多 {BULK_TAG_MAX_CONTENTS} 筆，"
+                       "更多請送背景工作 tags-bulk（POST /api/jobs）",
+        }), 400
+    if not all(isinstance(i, int) for i in content_ids):
+        return jsonify({"message": "content_ids 必須是整數陣列"}), 400
+    if not isinstance(names, list) or len(names) == 0:
+        return jsonify({"message": "tags 必須是非空的陣列"}), 400
+
+    content_ids = list(dict.fromkeys(content_ids))
+    rows = (
+        db.session.query(Content.content_id, Content.project_id)
+        .filter(Content.content_id.in_(content_ids))
+        .all()
+    )
+    found = {content_id: project_id for content_id, project_id in rows}
+
+    missing = [i for i in content_ids if i not in found]
+    if missing:
+        return jsonify({"message": "content 不存在", "content_ids": missing}), 404
+
+    for project_id in set(found.values()):
+        if not user_in_project(user_id, project_id):
+            return jsonify({"message": "你沒有這個專案的權限"}), 403
+
+    tags, attached = attach_tags(content_ids, names, user_id)
+    db.session.commit()
+
+    return jsonify({
+        "content_ids": content_ids,
+        "tags": tags,
+        "attached": attached,
+    }), 200
+
+
 @tag_bp.route("/content/<int:content_id>", methods=["GET"])
 @jwt_required()
 def list_content_tags(content_id):
     """列出某個 content 的所有標籤"""
     user_id = get_jwt_identity()
-    content = Content.query.get(content_id)
+    project_id = queries.content_project_id(content_id)
 
-    if not content:
+    if project_id is None:
         return jsonify({"message": "content 不存在"}), 404
 
-    if not _user_in_project(user_id, content.project_id):
+    if not user_in_project(user_id, project_id):
         return jsonify({"message": "你沒有這個專案的權限"}), 403
 
-    tags = [ct.tag for ct in content.content_tags]
+    # 一次 JOIN 撈出 tag，不逐筆 lazy load ct.tag
+    tags = queries.content_tag_rows(content_id)
 
     result = [
         {"tag_id": t.tag_id, "name": t.name}
@@ -153,13 +219,22 @@ def list_content_tags(content_id):
 @tag_bp.route("/<int:tag_id>/contents", methods=["GET"])
 @jwt_required()
 def list_contents_by_tag(tag_id):
-    """依標籤列出所有內容（簡單版）"""
+    """依標籤列出所有內容（簡單版），依 content_id 分頁"""
     tag = Tag.query.get(tag_id)
     if not tag:
         return jsonify({"message": "tag 不存在"}), 404
 
+    limit, after, error = get_page_args(_CONTENT_CURSOR)
+    if error:
+        return jsonify({"message": error}), 400
+
     # 這裡 demo 簡單版：列出所有有這個 tag 的 content（沒有再做專案權限過濾）
-    cts = [ct.content for ct in tag.content_tags]
+    cts, has_more = fetch_page(
+        queries.contents_by_tag(tag_id),
+        [(Content.content_id, False)],
+        after,
+        limit,
+    )
 
     result = []
     for c in cts:
@@ -172,5 +247,6 @@ def list_contents_by_tag(tag_id):
     return jsonify({
         "tag_id": tag.tag_id,
         "tag_name": tag.name,
-        "contents": result
+        "contents": result,
+        "next_cursor": next_cursor(cts, has_more, lambda c: (c.content_id,), _CONTENT_CURSOR),
     }), 200
@@ -1,58 +1,80 @@
 #版本管理 API：新增版本、列出版本
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import update
 from ..extensions import db
+from ..authz import user_in_project
+from ..json_provider import items_response
+from ..pagination import CursorKind, get_page_args, fetch_page, next_cursor
+from .. import assets, conditional, prompt_store, queries
 from ..models import (
-    ProjectMember,
     Content,
     ContentVersion,
 )
 
 version_bp = Blueprint("version", __name__)
 
-
-def _user_in_project(user_id, project_id):
-    return (
-        ProjectMember.query
-        .filter_by(user_id=user_id, project_id=project_id)
-        .first()
-        is not None
-    )
+_LIST_CURSOR = CursorKind("versions", int)
 
 
 @version_bp.route("/content/<int:content_id>", methods=["GET"])
 @jwt_required()
 def list_versions(content_id):
-    """列出某個 content 的所有版本"""
+    """列出某個 content 的所有版本（?fields= 可以不要 prompt 這類大欄位）"""
     user_id = get_jwt_identity()
 
-    content = Content.query.get(content_id)
-    if not content:
+    project_id = queries.content_project_id(content_id)
+    if project_id is None:
         return jsonify({"message": "content 不存在"}), 404
 
-    if not _user_in_project(user_id, content.project_id):
+    if not user_in_project(user_id, project_id):
         return jsonify({"message": "你沒有這個專案的權限"}), 403
 
-    versions = (
-        ContentVersion.query
-        .filter_by(content_id=content_id)
-        .order_by(ContentVersion.version_number.desc())
-        .all()
+    limit, after, error = get_page_args(_LIST_CURSOR)
+    if error:
+        return jsonify({"message": error}), 400
+    fields, error = queries.parse_fields(queries.VERSION_LIST_FIELDS)
+    if error:
+        return jsonify({"message": error}), 400
+
+    # 資料沒變就回 304，不撈資料也不序列化
+    etag, last_modified = conditional.content_versions_validators(content_id)
+    if conditional.is_not_modified(etag, last_modified):
+        return conditional.not_modified_response(etag, last_modified)
+
+    versions, has_more = fetch_page(
+        queries.content_versions(content_id, fields),
+        [(ContentVersion.version_number, True)],
+        after,
+        limit,
     )
 
+    # 差異壓縮的版本要還原成完整 prompt
+    prompts = {}
+    if "prompt" in fields:
+        prompts = prompt_store.load_prompts(db.session, content_id, versions)
+
     result = []
     for v in versions:
-        result.append({
+        item = {
             "version_id": v.version_id,
             "version_number": v.version_number,
-            "created_by": v.created_by,
-            "created_at": v.created_at.isoformat() if v.created_at else None,
-            "prompt": v.prompt,
-            "file_url": v.file_url,
-            "response_ref": str(v.response_ref) if v.response_ref else None,
-        })
-
-    return jsonify(result), 200
+            "prompt": prompts.get(v.version_number),
+            # response_ref 目前 model 還沒有這個欄位，之後接 NoSQL 再補
+            "response_ref": None,
+        }
+        for name in ("created_by", "created_at", "file_url"):
+            if name in fields:
+                item[name] = getattr(v, name)
+        result.append(queries.pick(item, fields, queries.VERSION_LIST_FIELDS))
+
+    response = items_response(
+        result,
+        next_cursor=next_cursor(
+            versions, has_more, lambda v: (v.version_number,), _LIST_CURSOR
+        ),
+    )
+    return conditional.with_validators(response, etag, last_modified), 200
 
 
 @version_bp.route("/content/<int:content_id>", methods=["POST"])
@@ -73,20 +95,26 @@ def create_new_version(content_id):
     if not content:
         return jsonify({"message": "content 不存在"}), 404
 
-    if not _user_in_project(user_id, content.project_id):
+    if not user_in_project(user_id, content.project_id):
         return jsonify({"message": "你沒有這個專案的權限"}), 403
 
     prompt = data.get("prompt")
     file_url = data.get("file_url")
-
-    # 找現在最大版號
-    last_version = (
-        ContentVersion.query
-        .filter_by(content_id=content_id)
-        .order_by(ContentVersion.version_number.desc())
-        .first()
-    )
-    next_version_number = (last_version.version_number + 1) if last_version else 1
+    if assets.missing_assets(db.session, content.project_id, [file_url]):
+        return jsonify({"message": "file_url 指向的檔案不存在，或沒有上傳到這個專案"}), 400
+
+    # 版號計數器 +1 並拿回新值（單一 UPDATE ... RETURNING，
+    # 同時鎖住這筆 content，同一個 content 的並行寫入會排隊，不會拿到重複版號）
+    next_version_number = db.session.execute(
+        update(Content)
+        .where(Content.content_id == content_id)
+        .values(version_counter=Content.version_counter + 1)
+        .returning(Content.version_counter)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+    # 上一版改存成相對於新版本的差異（PROMPT_STORAGE=delta 時）
+    prompt_store.on_new_version(content_id, next_version_number, prompt)
 
     new_version = ContentVersion(
         content_id=content_id,
@@ -108,3 +136,57 @@ def create_new_version(content_id):
         "version_id": new_version.version_id,
         "version_number": new_version.version_number,
     }), 201
+
+
+@version_bp.route("/content/<int:content_id>/diff", methods=["GET"])
+@jwt_required()
+def diff_versions(content_id):
+    """
+    比較兩個版本的 prompt
+    ?from=1&to=2（to 預設是 from + 1）
+    相鄰版本且舊版本存的是差異時，直接用存好的差異，不重新比對
+    """
+    user_id = get_jwt_identity()
+
+    content = Content.query.get(content_id)
+    if not content:
+        return jsonify({"message": "content 不存在"}), 404
+
+    if not user_in_project(user_id, content.project_id):
+        return jsonify({"message": "你沒有這個專案的權限"}), 403
+
+    try:
+        from_number = int(request.args["from"])
+        to_number = int(request.args.get("to", from_number + 1))
+    except (KeyError, ValueError):
+        return jsonify({"message": "from / to 必須是版本號（整數）"}), 400
+
+    low, high = sorted((from_number, to_number))
+    versions = (
+        ContentVersion.query
+        .filter(
+            ContentVersion.content_id == content_id,
+            ContentVersion.version_number.between(low, high),
+        )
+        .order_by(ContentVersion.version_number.desc())
+        .all()
+    )
+    by_number = {v.version_number: v for v in versions}
+    if from_number not in by_number or to_number not in by_number:
+        return jsonify({"message": "版本不存在"}), 404
+
+    old = by_number[from_number]
+    if to_number == from_number + 1 and old.prompt_delta is not None:
+        new_prompt = prompt_store.load_prompt(db.session, content_id, by_number[to_number])
+        diff = prompt_store.delta_to_diff(new_prompt, old.prompt_delta)
+    else:
+        # 區間內的版本都撈了，還原只需要再往上補一段
+        prompts = prompt_store.load_prompts(db.session, content_id, versions)
+        diff = prompt_store.text_diff(prompts[from_number], prompts[to_number])
+
+    return jsonify({
+        "content_id": content_id,
+        "from": from_number,
+        "to": to_number,
+        "diff": diff,
+    }), 200
@@ -0,0 +1,273 @@
+# app/search_index.py
+# 全文檢索索引：Postgres 用 tsvector + GIN、SQLite 用 FTS5 虛擬表
+# 每個 content 一筆索引（title + 最新版本的 prompt），在 commit 前同步更新
+import re
+
+import click
+from flask import current_app
+from sqlalchemy import Float, Integer, and_, bindparam, event, inspect, or_, select, text
+
+from .extensions import db
+from .models import Content, ContentVersion
+
+SEARCH_TABLE = "content_search"
+
+# session.info 裡暫存「這次交易中有變動的 content_id」
+_DIRTY_KEY = "search_dirty_content_ids"
+
+# engine -> 是否有索引表（避免每次搜尋都去查 schema）
+_index_present = {}
+
+# "片語" 或單字（結尾 * 代表前綴查詢）
+_QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ======================
+# 建立 / 檢查索引
+# ======================
+def create_search_index(conn):
+    """
+    在 conn 的交易裡建立索引表（已存在就略過），回傳這個資料庫是否支援
+    索引表是第一次建立時，順便把既有資料灌進去（由 migration 呼叫）
+    """
+    dialect = conn.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        return False
+
+    existed = inspect(conn).has_table(SEARCH_TABLE)
+    if dialect == "postgresql":
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            " content_id INTEGER PRIMARY KEY"
+            "  REFERENCES content (content_id) ON DELETE CASCADE,"
+            " project_id INTEGER NOT NULL,"
+            " document TSVECTOR NOT NULL)"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+            f"ON {SEARCH_TABLE} USING GIN (document)"
+        ))
+    else:
+        # rowid 直接用 content_id；project_id 只存不索引
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            " title, prompt, project_id UNINDEXED,"
+            " tokenize = 'unicode61')"
+        ))
+    if not existed:
+        rebuild(conn)
+
+    _index_present[conn.engine] = True
+    return True
+
+
+def has_search_index(conn):
+    engine = conn.engine
+    if engine not in _index_present:
+        _index_present[engine] = inspect(conn).has_table(SEARCH_TABLE)
+    return _index_present[engine]
+
+
+# ======================
+# 同步索引內容
+# ======================
+def sync_contents(conn, content_ids):
+    """重建指定 content 的索引列（已刪除的 content 會一併移除）"""
+    ids = sorted({int(i) for i in content_ids if i is not None})
+    if not ids or not has_search_index(conn):
+        return
+
+    key = "content_id" if conn.dialect.name == "postgresql" else "rowid"
+    conn.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN :ids")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": ids},
+    )
+    conn.execute(
+        _insert_sql(conn.dialect.name, "WHERE c.content_id IN :ids", interned=True)
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": ids, "cfg": _ts_config()},
+    )
+
+
+def rebuild(conn):
+    """整個索引重建（初次建立索引或資料對不起來時用）"""
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    # 第 1 版 migration 建索引時還沒有 prompt_text（第 7 版才加），文字直接在 content_version
+    interned = inspect(conn).has_table("prompt_text")
+    conn.execute(
+        _insert_sql(conn.dialect.name, "", interned=interned), {"cfg": _ts_config()}
+    )
+
+
+def _insert_sql(dialect, where, interned):
+    """interned：prompt 文字存在 prompt_text（見 prompt_store.py）"""
+    if interned:
+        prompt = "coalesce(v.prompt, p.text, '')"
+        join = (
+            "LEFT JOIN content_version v ON v.version_id = c.latest_version_id "
+            "LEFT JOIN prompt_text p ON p.sha256 = v.prompt_sha256 "
+        )
+    else:
+        prompt = "coalesce(v.prompt, '')"
+        join = "LEFT JOIN content_version v ON v.version_id = c.latest_version_id "
+    if dialect == "postgresql":
+        # title 權重比 prompt 高
+        return text(
+            f"INSERT INTO {SEARCH_TABLE} (content_id, project_id, document) "
+            "SELECT c.content_id, c.project_id, "
+            " setweight(to_tsvector(CAST(:cfg AS regconfig), coalesce(c.title, '')), 'A')"
+            f" || setweight(to_tsvector(CAST(:cfg AS regconfig), {prompt}), 'B') "
+            f"FROM content c {join}"
+            f"{where}"
+        )
+    return text(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, prompt, project_id) "
+        f"SELECT c.content_id, c.title, {prompt}, c.project_id "
+        f"FROM content c {join}"
+        f"{where}"
+    )
+
+
+def _ts_config():
+    return current_app.config.get("SEARCH_TS_CONFIG", "simple")
+
+
+def mark_dirty(session, content_ids):
+    """標記需要重建索引的 content，commit 前會一次同步"""
+    session.info.setdefault(_DIRTY_KEY, set()).update(content_ids)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_dirty(session, flush_context):
+    ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Content, ContentVersion)):
+            ids.add(obj.content_id)
+    if ids:
+        mark_dirty(session, ids)
+
+
+@event.listens_for(db.session, "before_commit")
+def _sync_before_commit(session):
+    # 先把剩下的變更 flush 掉，才能讀到最新的 latest_version_id
+    session.flush()
+    ids = session.info.pop(_DIRTY_KEY, None)
+    if ids:
+        sync_contents(session.connection(), ids)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_dirty(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+# ======================
+# 查詢
+# ======================
+def parse_query(raw):
+    """
+    把使用者輸入拆成查詢單元：
+    - "red cat"  片語
+    - cat*       前綴
+    - 其他       一般單字（全部 AND）
+    回傳 [(words, is_prefix), ...]
+    """
+    terms = []
+    for phrase, word in _QUERY_TOKEN_RE.findall(raw or ""):
+        if phrase:
+            words = _WORD_RE.findall(phrase.lower())
+            if words:
+                terms.append((words, False))
+        else:
+            words = _WORD_RE.findall(word.lower())
+            if words:
+                terms.append((words, word.endswith("*") and len(words) == 1))
+    return terms
+
+
+def _fts5_match(terms):
+    parts = []
+    for words, is_prefix in terms:
+        part = '"' + " ".join(words) + '"'
+        parts.append(part + "*" if is_prefix else part)
+    return " ".join(parts)
+
+
+def _pg_tsquery(terms):
+    parts = []
+    for words, is_prefix in terms:
+        if is_prefix:
+            parts.append(f"'{words[0]}':*")
+        else:
+            parts.append("(" + " <-> ".join(f"'{w}'" for w in words) + ")")
+    return " & ".join(parts)
+
+
+def match_query(conn, project_ids, raw_query):
+    """
+    索引比對的子查詢（欄位 content_id, score，參數都已經綁好，可以再組進其他查詢）
+    沒有索引（或查詢字串解析不出任何單字）時回傳 None
+    """
+    terms = parse_query(raw_query)
+    if not terms or not project_ids or not has_search_index(conn):
+        return None
+
+    pids = bindparam("pids", value=list(project_ids), expanding=True)
+    if conn.dialect.name == "postgresql":
+        sql = text(
+            "SELECT s.content_id, ts_rank_cd(s.document, q) AS score "
+            f"FROM {SEARCH_TABLE} s, to_tsquery(CAST(:cfg AS regconfig), :q) q "
+            "WHERE s.document @@ q AND s.project_id IN :pids"
+        ).bindparams(pids, q=_pg_tsquery(terms), cfg=_ts_config())
+    else:
+        # bm25 越小越相關，這裡轉成越大越相關，跟 Postgres 一致
+        sql = text(
+            "SELECT rowid AS content_id, "
+            f" -bm25({SEARCH_TABLE}, 10.0, 1.0) AS score "
+            f"FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH :q "
+            " AND CAST(project_id AS INTEGER) IN :pids"
+        ).bindparams(pids, q=_fts5_match(terms))
+    return sql.columns(content_id=Integer, score=Float).subquery("matched")
+
+
+def ranked_content_ids(session, project_ids, raw_query, limit=50, after=None, restrict=None):
+    """
+    用索引查詢並依相關度排序，回傳 [(content_id, score), ...]
+    after 是上一頁最後一筆的 (score, content_id)，用來做 keyset 分頁
+    restrict 是 content_id 的 select()，只在這些 content 裡找（篩選條件）
+    沒有索引（或查詢字串解析不出任何單字）時回傳 None，由呼叫端改用 ILIKE
+    """
+    conn = session.connection()
+    matched = match_query(conn, project_ids, raw_query)
+    if matched is None:
+        return None
+
+    stmt = select(matched.c.content_id, matched.c.score)
+    if restrict is not None:
+        stmt = stmt.where(matched.c.content_id.in_(restrict))
+    if after is not None:
+        stmt = stmt.where(or_(
+            matched.c.score < after[0],
+            and_(matched.c.score == after[0], matched.c.content_id < after[1]),
+        ))
+    stmt = stmt.order_by(matched.c.score.desc(), matched.c.content_id.desc()).limit(limit)
+    rows = conn.execute(stmt).all()
+    return [(row.content_id, float(row.score)) for row in rows]
+
+
+# ======================
+# Flask 整合
+# ======================
+def init_app(app):
+    @app.cli.command("search-reindex")
+    def search_reindex():
+        """建立（若不存在）並重建全文檢索索引"""
+        with db.engine.begin() as conn:
+            if not create_search_index(conn):
+                click.echo(f"{conn.dialect.name} 不支援全文檢索索引，搜尋會使用 ILIKE")
+                return
+            rebuild(conn)
+        click.echo("全文檢索索引已重建")
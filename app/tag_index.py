@@ -0,0 +1,136 @@
+# app/tag_index.py
+# 標籤自動完成用的 in-process 前綴索引
+# - 排序好的 name_normalized 陣列，用 bisect 找出前綴範圍
+# - 每個標籤記使用次數（content_tag 筆數），可以取使用次數前 k 名
+# - 第一次用到才從資料庫載入；之後新建標籤 / 新掛標籤在 commit 後增量更新
+# - 多個 worker 之間不會互通，所以每隔 TAG_INDEX_REFRESH 秒重新載入一次
+import bisect
+import heapq
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, func
+
+from .extensions import db
+from .models import Tag, ContentTag
+
+_PENDING_KEY = "tag_index_pending"
+
+
+class TagPrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []      # 排序好的 name_normalized
+        self._entries = {}   # name_normalized -> [tag_id, name, usage]
+        self._by_id = {}     # tag_id -> name_normalized
+        self.loaded_at = None
+
+    # ----- 載入 -----
+    def load(self, session):
+        rows = (
+            session.query(
+                Tag.tag_id,
+                Tag.name,
+                Tag.name_normalized,
+                func.count(ContentTag.id),
+            )
+            .outerjoin(ContentTag, ContentTag.tag_id == Tag.tag_id)
+            .group_by(Tag.tag_id, Tag.name, Tag.name_normalized)
+            .all()
+        )
+        entries = {key: [tag_id, name, usage] for tag_id, name, key, usage in rows}
+        with self._lock:
+            self._entries = entries
+            self._by_id = {entry[0]: key for key, entry in entries.items()}
+            self._keys = sorted(entries)
+            self.loaded_at = time.monotonic()
+
+    def is_stale(self, max_age):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > max_age
+
+    def reset(self):
+        with self._lock:
+            self._keys, self._entries, self._by_id = [], {}, {}
+            self.loaded_at = None
+
+    # ----- 增量更新 -----
+    def add_tag(self, tag_id, name, key):
+        with self._lock:
+            if self.loaded_at is None or key in self._entries:
+                return
+            self._entries[key] = [tag_id, name, 0]
+            self._by_id[tag_id] = key
+            bisect.insort(self._keys, key)
+
+    def add_usage(self, tag_id, delta=1):
+        with self._lock:
+            key = self._by_id.get(tag_id)
+            if key is not None:
+                self._entries[key][2] += delta
+
+    # ----- 查詢 -----
+    def complete(self, prefix, limit=10, sort="usage"):
+        """回傳 [(tag_id, name, usage), ...]"""
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + "\U0010ffff", lo)
+            if sort == "name":
+                keys = self._keys[lo:min(hi, lo + limit)]
+            else:
+                keys = heapq.nsmallest(
+                    limit,
+                    self._keys[lo:hi],
+                    key=lambda k: (-self._entries[k][2], k),
+                )
+            return [tuple(self._entries[k]) for k in keys]
+
+
+index = TagPrefixIndex()
+
+
+def complete(prefix, limit=10, sort="usage"):
+    """自動完成查詢，需要時才（重新）載入"""
+    max_age = current_app.config.get("TAG_INDEX_REFRESH", 300)
+    if index.is_stale(max_age):
+        index.load(db.session)
+    return index.complete(prefix, limit=limit, sort=sort)
+
+
+def record_usage(session, tag_ids):
+    """記錄這次交易新掛上的標籤（每個 tag_id 一次），commit 後才生效"""
+    pending = session.info.setdefault(_PENDING_KEY, {"tags": [], "usage": []})
+    pending["usage"].extend(tag_ids)
+
+
+def record_tags(session, tags):
+    """記錄這次交易新建的標籤 [(tag_id, name, name_normalized), ...]"""
+    pending = session.info.setdefault(_PENDING_KEY, {"tags": [], "usage": []})
+    pending["tags"].extend(tags)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_new_tags(session, flush_context):
+    new_tags = [
+        (obj.tag_id, obj.name, obj.name_normalized)
+        for obj in session.new
+        if isinstance(obj, Tag)
+    ]
+    if new_tags:
+        record_tags(session, new_tags)
+
+
+@event.listens_for(db.session, "after_commit")
+def _apply_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for tag_id, name, key in pending["tags"]:
+        index.add_tag(tag_id, name, key)
+    for tag_id in pending["usage"]:
+        index.add_usage(tag_id)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,186 @@
+# app/tagging.py
+# 批次掛標籤：所有名稱一次查、缺的標籤跟 content_tag 關聯都用
+# 「衝突就略過」的多筆 INSERT 一次寫入，不再逐筆 ILIKE + 檢查
+from sqlalchemy import bindparam, select
+
+from . import project_stats, tag_index
+from .extensions import db
+from .models import Tag, ContentTag, normalize_tag_name
+
+
+def dialect_insert(dialect_name):
+    """支援 ON CONFLICT 的 insert；用到才 import，啟動時不用載入用不到的方言"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def renormalize_tag_names(conn):
+    """
+    把 tag.name_normalized 重算成 normalize_tag_name(name)，回傳改了幾筆
+    給 migration 用：正規化只在 Python 做一次，不用 SQL 的 lower()
+    （SQLite 的 lower() 只處理 ASCII，非 ASCII 的名稱會跟寫入時算的不一樣）
+    重算後有兩個標籤撞在一起就停下來，請人工合併（不猜要留哪一個）
+    """
+    tags = Tag.__table__
+    rows = conn.execute(select(tags.c.tag_id, tags.c.name, tags.c.name_normalized)).all()
+    by_key = {}
+    for row in rows:
+        by_key.setdefault(normalize_tag_name(row.name), []).append(row.tag_id)
+    conflicts = [(key, ids) for key, ids in by_key.items() if len(ids) > 1]
+    if conflicts:
+        sample = ", ".join(f"{key!r}: {ids}" for key, ids in conflicts[:5])
+        raise RuntimeError(f"標籤名稱正規化後重複，請先合併這些標籤：{sample}")
+
+    changed = [
+        {"b_tag_id": row.tag_id, "key": normalize_tag_name(row.name)}
+        for row in rows
+        if row.name_normalized != normalize_tag_name(row.name)
+    ]
+    if changed:
+        conn.execute(
+            tags.update()
+            .where(tags.c.tag_id == bindparam("b_tag_id"))
+            .values(name_normalized=bindparam("key")),
+            changed,
+        )
+    return len(changed)
+
+
+def clean_tag_names(names):
+    """
+    去空白、去重複（不分大小寫，保留第一次出現的寫法與順序）
+    回傳 [(normalized, display_name), ...]
+    """
+    seen = set()
+    result = []
+    for raw in names:
+        if not isinstance(raw, str):
+            continue
+        name = raw.strip()
+        key = normalize_tag_name(name)
+        if key and key not in seen:
+            seen.add(key)
+            result.append((key, name))
+    return result
+
+
+def _insert_ignore(model, rows, conflict_columns):
+    """
+    INSERT ... ON CONFLICT DO NOTHING
+    回傳實際新增的那些列的 key（conflict_columns 組成的 tuple）
+    """
+    if not rows:
+        return []
+    session = db.session
+    insert = dialect_insert(session.get_bind().dialect.name)
+    if insert is None:
+        return _insert_missing(model, rows, conflict_columns)
+
+    stmt = (
+        insert(model)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=conflict_columns)
+        .returning(*[getattr(model, c) for c in conflict_columns])
+    )
+    return [tuple(row) for row in session.execute(stmt)]
+
+
+def _insert_missing(model, rows, conflict_columns):
+    """其他資料庫：先查已存在的 key，再插入缺的（一樣只有兩條 SQL）"""
+    session = db.session
+    columns = [getattr(model, c) for c in conflict_columns]
+    existing = {
+        tuple(row) for row in session.execute(
+            select(*columns).where(*[
+                col.in_(list({row[c] for row in rows}))
+                for col, c in zip(columns, conflict_columns)
+            ])
+        )
+    }
+    missing = [row for row in rows
+               if tuple(row[c] for c in conflict_columns) not in existing]
+    if missing:
+        session.execute(model.__table__.insert(), missing)
+    return [tuple(row[c] for c in conflict_columns) for row in missing]
+
+
+def resolve_tags(names, user_id):
+    """
+    找出（或建立）這些名稱對應的 Tag
+    回傳 [{"tag_id", "name"}, ...]，順序跟輸入一致
+    """
+    cleaned = clean_tag_names(names)
+    if not cleaned:
+        return []
+
+    inserted = _insert_ignore(
+        Tag,
+        [
+            {"name": name, "name_normalized": key, "created_by": user_id}
+            for key, name in cleaned
+        ],
+        ["name_normalized"],
+    )
+
+    keys = [key for key, _ in cleaned]
+    rows = db.session.execute(
+        select(Tag.tag_id, Tag.name, Tag.name_normalized)
+        .where(Tag.name_normalized.in_(keys))
+    ).all()
+    by_key = {row.name_normalized: row for row in rows}
+
+    # 新建的標籤 commit 後補進自動完成索引
+    tag_index.record_tags(db.session, [
+        (by_key[key].tag_id, by_key[key].name, key)
+        for (key,) in inserted
+        if key in by_key
+    ])
+
+    return [
+        {"tag_id": by_key[key].tag_id, "name": by_key[key].name}
+        for key in keys
+        if key in by_key
+    ]
+
+
+def attach_tags(content_ids, names, user_id):
+    """
+    幫多個 content 掛上同一組標籤（不存在的標籤會自動建立）
+    回傳 (tags, attached_count)；不會 commit，由呼叫端決定
+    """
+    tags = resolve_tags(names, user_id)
+    links = [
+        {"content_id": content_id, "tag_id": tag["tag_id"]}
+        for content_id in dict.fromkeys(content_ids)
+        for tag in tags
+    ]
+    return tags, _insert_links(links)
+
+
+def attach_tag_map(tag_map, user_id):
+    """
+    每個 content 掛各自的標籤：{content_id: [name, ...]}
+    所有名稱合併起來只查 / 建一次，關聯也一次寫入；回傳新增的關聯數
+    """
+    all_names = [name for names in tag_map.values() for name in names]
+    tags = resolve_tags(all_names, user_id)
+    tag_ids = {normalize_tag_name(tag["name"]): tag["tag_id"] for tag in tags}
+
+    links = []
+    for content_id, names in tag_map.items():
+        for key, _ in clean_tag_names(names):
+            if key in tag_ids:
+                links.append({"content_id": content_id, "tag_id": tag_ids[key]})
+    return _insert_links(links)
+
+
+def _insert_links(links):
+    inserted = _insert_ignore(ContentTag, links, ["content_id", "tag_id"])
+    tag_index.record_usage(db.session, [tag_id for _, tag_id in inserted])
+    project_stats.record_tag_links(db.session, inserted)
+    return len(inserted)
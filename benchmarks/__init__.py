@@ -0,0 +1,2 @@
+# benchmarks/
+# 壓力測試 / 效能量測腳本（不是單元測試，手動執行）
@@ -0,0 +1,193 @@
+# benchmarks/__main__.py
+# 整套 API benchmark：產生合成資料 → 逐一跑每個 route 的情境 → 輸出 JSON
+#
+# 用法：
+#     python -m benchmarks                                  # 暫存 SQLite、預設資料量
+#     python -m benchmarks --contents 1000 --versions 10 --concurrency 16
+#     python -m benchmarks --http --only search,tags        # 走本機 HTTP server，只跑部分情境
+#     python -m benchmarks --output after.json --compare before.json
+#     DATABASE_URL=postgresql://localhost/bench python -m benchmarks --reset
+#
+# 同一組參數（含 --seed）產生的資料與請求順序都一樣；GET 情境先跑，寫入類情境最後跑，
+# 讀取的數字才不會被前面寫進去的資料影響
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="API benchmark")
+    data = parser.add_argument_group("資料量")
+    data.add_argument("--users", type=int, default=5)
+    data.add_argument("--projects", type=int, default=4)
+    data.add_argument("--contents", type=int, default=200, help="每個專案幾個 content")
+    data.add_argument("--versions", type=int, default=5, help="每個 content 幾個版本")
+    data.add_argument("--tags", type=int, default=100)
+    data.add_argument("--tags-per-content", type=int, default=3)
+    data.add_argument("--seed", type=int, default=1)
+
+    run = parser.add_argument_group("執行")
+    run.add_argument("--requests", type=int, default=200, help="每個情境打幾次")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--http", action="store_true", help="走本機 HTTP server（預設用 test client）")
+    run.add_argument("--only", help="只跑名稱開頭符合的情境，逗號分隔（例如 search,tags.list）")
+    run.add_argument("--rounds", type=int, default=4,
+                     help="BCRYPT_LOG_ROUNDS（預設調低，登入以外的情境才不會被 bcrypt 拖住）")
+    run.add_argument("--reset", action="store_true",
+                     help="有設定 DATABASE_URL 時，先清空所有資料表再產生資料")
+
+    out = parser.add_argument_group("輸出")
+    out.add_argument("--output", help="結果寫到這個檔案（預設印到 stdout）")
+    out.add_argument("--compare", help="跟之前的結果 JSON 比較，差異印到 stderr")
+    return parser.parse_args(argv)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _pct(old, new):
+    if not old or new is None:
+        return "   n/a"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def compare(baseline, current, stream=sys.stderr):
+    """印出每個情境 p50 / p95 / 吞吐量 / SQL 數跟 baseline 的差異"""
+    rows = [("scenario", "p50_ms", "p95_ms", "rps", "sql")]
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        rows.append((
+            name,
+            f"{now['latency']['p50_ms']} ({_pct(before['latency']['p50_ms'], now['latency']['p50_ms'])})",
+            f"{now['latency']['p95_ms']} ({_pct(before['latency']['p95_ms'], now['latency']['p95_ms'])})",
+            f"{now['throughput_rps']} ({_pct(before['throughput_rps'], now['throughput_rps'])})",
+            f"{now['sql_per_request']['mean']} (was {before['sql_per_request']['mean']})",
+        ))
+    widths = [max(len(str(r[i])) for r in rows) for i in range(len(rows[0]))]
+    for r in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(r, widths)), file=stream)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    os.environ["BCRYPT_LOG_ROUNDS"] = str(args.rounds)
+    # 背景工作的 runner 不啟動：執行中的工作會跟請求搶資料庫；送出的工作留在佇列就好
+    os.environ["JOBS_RUN_IN_APP"] = "0"
+    # 上傳的檔案放在暫存目錄，不要寫進專案的 instance/
+    os.environ.setdefault("ASSET_STORE_DIR", tempfile.mkdtemp(prefix="bench-assets-"))
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}?timeout=30"
+        args.reset = True
+
+    from flask_jwt_extended import create_access_token
+
+    from app import create_app, migrations
+    from app.extensions import db
+    from app.models import User
+
+    from .runner import HTTPDriver, TestClientDriver, install_sql_counter, run_scenario
+    from .scenarios import SCENARIOS, Context
+    from .seed import reset_database, seed
+
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        if db.session.query(User.user_id).first() is not None:
+            if not args.reset:
+                print("資料庫裡已經有資料；確定要清空請加 --reset", file=sys.stderr)
+                return 2
+            db.session.remove()
+            reset_database(db)
+        db.session.remove()
+
+        started = time.perf_counter()
+        dataset = seed(
+            db,
+            users=args.users,
+            projects=args.projects,
+            contents_per_project=args.contents,
+            versions_per_content=args.versions,
+            tags=args.tags,
+            tags_per_content=args.tags_per_content,
+            seed_value=args.seed,
+        )
+        seed_elapsed = time.perf_counter() - started
+
+        tokens = {
+            u["user_id"]: create_access_token(
+                identity=str(u["user_id"]), expires_delta=False
+            )
+            for u in dataset.users
+        }
+        dialect = db.engine.dialect.name
+        install_sql_counter(app, db.engines.values())
+
+    ctx = Context(dataset, tokens)
+    scenarios = SCENARIOS
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(",") if p.strip())
+        scenarios = [s for s in scenarios if s.name.startswith(prefixes)]
+    # 讀取先跑、寫入後跑
+    scenarios = sorted(scenarios, key=lambda s: s.method != "GET")
+
+    driver = HTTPDriver(app) if args.http else TestClientDriver(app)
+    results = {}
+    try:
+        for scenario in scenarios:
+            print(f"running {scenario.name} ...", file=sys.stderr)
+            results[scenario.name] = run_scenario(
+                driver, scenario, ctx,
+                requests=args.requests,
+                concurrency=args.concurrency,
+                seed_value=args.seed,
+            )
+    finally:
+        driver.close()
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "database": dialect,
+            "driver": "http" if args.http else "test_client",
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "bcrypt_log_rounds": args.rounds,
+            "seed": args.seed,
+            "dataset": dataset.summary(),
+            "seed_elapsed_s": round(seed_elapsed, 3),
+        },
+        "scenarios": results,
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+# benchmarks/explain.py
+# 查詢計畫回歸檢查：每個情境實際打幾次，把 route 送出的 SQL 收集起來逐條 EXPLAIN，
+# 大表上出現全表掃描就列出來並以 exit code 1 結束（可以放進 CI）
+# 同時檢查每個請求的 SQL 條數：超過情境的 max_queries（見 scenarios.py）也算失敗，用來抓 N+1
+#   SQLite：EXPLAIN QUERY PLAN 裡「SCAN <表>」而且沒有走 index
+#   Postgres：先 SET LOCAL enable_seqscan = off，還是出現 Seq Scan 就代表根本沒有可用的 index
+#             （資料量小時 planner 本來就會選 Seq Scan，關掉才看得出缺不缺 index）
+#
+# 用法：
+#     python -m benchmarks.explain                        # 暫存 SQLite
+#     python -m benchmarks.explain --only contents,tags -v
+#     DATABASE_URL=postgresql://localhost/bench python -m benchmarks.explain --reset
+# CI：tests/test_query_plans.py 包成 pytest，DATABASE_URL 是 Postgres 時才跑（會清空那個資料庫）
+#     DATABASE_URL=postgresql://ci@localhost/ci python -m pytest tests
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from collections import OrderedDict
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+# 會隨資料量長大的表；tag / project 筆數有限，不檢查
+LARGE_TABLES = {
+    "user", "project_member", "content", "content_version", "content_tag", "version_term",
+    "project_tag_stat",
+}
+
+# 已知、可以接受的全表掃描：(情境名稱, 表名) -> 原因
+ALLOWED = {}
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE)\b", re.IGNORECASE)
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?')
+
+
+@dataclass
+class Report:
+    dialect: str
+    scenarios: int = 0
+    checked: int = 0
+    # [(情境名稱, [表], SQL, 計畫)]
+    failures: list = field(default_factory=list)
+    # [(Scenario, 條數, [SQL])]
+    over_budget: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.failures and not self.over_budget
+
+    def format(self):
+        parts = [
+            f"[{name}] 全表掃描：{', '.join(tables)}\n{statement}\n{plan}\n"
+            for name, tables, statement, plan in self.failures
+        ]
+        for scenario, count, statements in self.over_budget:
+            detail = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(statements, 1))
+            parts.append(
+                f"[{scenario.name}] SQL 超過上限：{count} 條 > {scenario.max_queries}\n{detail}\n"
+            )
+        parts.append(
+            f"{self.dialect}：{self.scenarios} 個情境、{self.checked} 條 SQL，"
+            f"{len(self.failures)} 條有全表掃描、{len(self.over_budget)} 個情境超過 SQL 上限"
+        )
+        return "\n".join(parts)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="EXPLAIN 每個 route 的查詢，找出全表掃描")
+    # 專案要夠多，「WHERE project_id = ?」才有選擇性；只有幾個專案時 planner 寧可整表掃描
+    parser.add_argument("--projects", type=int, default=40)
+    parser.add_argument("--contents", type=int, default=25, help="每個專案幾個 content")
+    parser.add_argument("--requests", type=int, default=3, help="每個情境打幾次")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="只跑名稱開頭符合的情境，逗號分隔")
+    parser.add_argument("--reset", action="store_true",
+                        help="有設定 DATABASE_URL 時，先清空所有資料表再產生資料")
+    parser.add_argument("-v", "--verbose", action="store_true", help="印出每條 SQL 的計畫")
+    return parser.parse_args(argv)
+
+
+def sqlite_full_scans(conn, statement, parameters):
+    """回傳 (掃描的表, 計畫文字)"""
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    plan = [row[-1] for row in rows]
+    tables = set()
+    for detail in plan:
+        # 「SCAN t USING (COVERING) INDEX」也是整個讀一遍，一樣算；走 index 查的是 SEARCH
+        match = _SQLITE_SCAN.match(detail)
+        if match:
+            tables.add(match.group(1))
+    return tables, "\n".join(plan)
+
+
+def postgres_full_scans(conn, statement, parameters):
+    with conn.begin():
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    tables = set()
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan":
+            tables.add(node.get("Relation Name"))
+        for child in node.get("Plans", ()):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return tables, json.dumps(plan[0]["Plan"], indent=2)
+
+
+def collect_statements(engines, scenarios, ctx, driver, requests, seed_value):
+    """
+    依序跑每個情境，回傳 (captured, counts)
+    captured：{情境名稱: OrderedDict(statement -> parameters)}，同一條 SQL 只留第一次的參數
+    counts：{情境名稱: (單一請求最多幾條 SQL, 那個請求送出的 SQL)}
+    """
+    from app.query_counter import count_queries
+
+    captured = {}
+    counts = {}
+    current = {"name": None}
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        name = current["name"]
+        if name is None or executemany or not _EXPLAINABLE.match(statement):
+            return
+        captured.setdefault(name, OrderedDict()).setdefault(statement, parameters)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        for scenario in scenarios:
+            current["name"] = scenario.name
+            rng = random.Random(f"{seed_value}:{scenario.name}")
+            user_id = ctx.dataset.users[0]["user_id"]
+            for _ in range(requests):
+                path, body = scenario.build(ctx, rng)
+                headers = {}
+                if scenario.auth:
+                    headers["Authorization"] = f"Bearer {ctx.tokens[user_id]}"
+                with ExitStack() as stack:
+                    counters = [stack.enter_context(count_queries(e)) for e in engines]
+                    status, _ = driver.request(scenario.method, path, body, headers)
+                if status >= 400:
+                    print(f"  {scenario.name} {path} -> {status}", file=sys.stderr)
+                statements = [sql for c in counters for sql in c.statements]
+                if len(statements) > counts.get(scenario.name, (-1,))[0]:
+                    counts[scenario.name] = (len(statements), statements)
+        current["name"] = None
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", _capture)
+    return captured, counts
+
+
+def main(argv=None):
+    report = run(argv)
+    if report is None:
+        print("資料庫裡已經有資料；確定要清空請加 --reset", file=sys.stderr)
+        return 2
+    print(report.format())
+    return 0 if report.ok else 1
+
+
+def run(argv=None):
+    """跑所有情境並檢查，回傳 Report；資料庫已經有資料又沒加 --reset 時回傳 None"""
+    args = _parse_args(argv)
+
+    os.environ.setdefault("BCRYPT_LOG_ROUNDS", "4")
+    # 背景工作的 runner 不啟動：它的 SQL 會被記到當時正在跑的情境底下
+    os.environ["JOBS_RUN_IN_APP"] = "0"
+    # 上傳的檔案放在暫存目錄，不要寫進專案的 instance/
+    os.environ.setdefault("ASSET_STORE_DIR", tempfile.mkdtemp(prefix="bench-assets-"))
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "explain.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        args.reset = True
+
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import text
+
+    from app import create_app, migrations
+    from app.extensions import db
+    from app.models import User
+
+    from .runner import TestClientDriver
+    from .scenarios import SCENARIOS, Context
+    from .seed import reset_database, seed
+
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        if db.session.query(User.user_id).first() is not None:
+            if not args.reset:
+                return None
+            db.session.remove()
+            reset_database(db)
+        db.session.remove()
+
+        dataset = seed(
+            db, projects=args.projects, contents_per_project=args.contents,
+            seed_value=args.seed,
+        )
+        engine = db.engine
+        with engine.begin() as conn:
+            # 讓 planner 有統計資料，跟正式環境比較像
+            conn.execute(text("ANALYZE"))
+        tokens = {
+            u["user_id"]: create_access_token(identity=str(u["user_id"]), expires_delta=False)
+            for u in dataset.users
+        }
+        engines = list(db.engines.values())
+
+    ctx = Context(dataset, tokens)
+    scenarios = SCENARIOS
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(",") if p.strip())
+        scenarios = [s for s in scenarios if s.name.startswith(prefixes)]
+    scenarios = sorted(scenarios, key=lambda s: s.method != "GET")
+
+    driver = TestClientDriver(app)
+    # 每個 process 的第一個請求會順便檢查 schema 版本，先打掉，不要算進第一個情境
+    driver.request("GET", "/api/projects", None, {})
+    captured, counts = collect_statements(
+        engines, scenarios, ctx, driver, args.requests, args.seed
+    )
+
+    report = Report(engine.dialect.name, scenarios=len(scenarios))
+    for scenario in scenarios:
+        count, statements = counts.get(scenario.name, (0, []))
+        if args.verbose:
+            print(f"-- {scenario.name}：最多 {count} 條 SQL（上限 {scenario.max_queries}）",
+                  file=sys.stderr)
+        if scenario.max_queries is not None and count > scenario.max_queries:
+            report.over_budget.append((scenario, count, statements))
+
+    explain = postgres_full_scans if engine.dialect.name == "postgresql" else sqlite_full_scans
+    with engine.connect() as conn:
+        for scenario in scenarios:
+            for statement, parameters in captured.get(scenario.name, {}).items():
+                report.checked += 1
+                tables, plan = explain(conn, statement, parameters)
+                bad = sorted(
+                    t for t in tables
+                    if t in LARGE_TABLES and (scenario.name, t) not in ALLOWED
+                )
+                if args.verbose:
+                    print(f"-- {scenario.name}\n{statement}\n{plan}\n", file=sys.stderr)
+                if bad:
+                    report.failures.append((scenario.name, bad, statement, plan))
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(main())
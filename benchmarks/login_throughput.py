@@ -0,0 +1,104 @@
+# benchmarks/login_throughput.py
+# 登入吞吐量：很多 thread 同時登入，量 bcrypt 在獨立 thread pool 下的
+# 登入 req/s、延遲分佈、被 503 擋掉的數量，以及同時間 /api/health 的延遲
+#
+# 用法：
+#     python -m benchmarks.login_throughput --threads 32 --requests 200 --rounds 12
+#     BCRYPT_WORKERS=2 BCRYPT_MAX_PENDING=8 python -m benchmarks.login_throughput
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from .stats import summarize
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="登入吞吐量量測")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="登入總次數")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_LOG_ROUNDS")
+    args = parser.parse_args(argv)
+
+    os.environ["BCRYPT_LOG_ROUNDS"] = str(args.rounds)
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "login_bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}?timeout=30"
+
+    from app import create_app, migrations
+    from app.extensions import db, password_hasher
+
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine)
+    client = app.test_client()
+    client.post("/api/auth/register", json={
+        "email": "bench@example.com", "username": "bench", "password": "bench-pw",
+    })
+
+    statuses = Counter()
+    login_latencies = []
+    health_latencies = []
+    lock = threading.Lock()
+    remaining = [args.requests]
+    done = threading.Event()
+
+    def login_worker():
+        c = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            r = c.post("/api/auth/login", json={
+                "email": "bench@example.com", "password": "bench-pw",
+            })
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[r.status_code] += 1
+                if r.status_code == 200:
+                    login_latencies.append(elapsed)
+
+    def health_worker():
+        # 登入壓力下，其他 endpoint 還回不回得來
+        c = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            c.get("/api/health")
+            health_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_worker) for _ in range(args.threads)]
+    prober = threading.Thread(target=health_worker)
+    started = time.perf_counter()
+    prober.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+
+    report = {
+        "bcrypt_log_rounds": args.rounds,
+        "bcrypt_workers": password_hasher.workers,
+        "bcrypt_max_pending": password_hasher.max_pending,
+        "threads": args.threads,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(statuses[200] / elapsed, 2),
+        "status": dict(statuses),
+        "login": summarize(login_latencies),
+        "health_during_load": summarize(health_latencies),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# benchmarks/runner.py
+# 用多個 thread 重複打同一個情境，記錄延遲、狀態碼、每個請求送出幾條 SQL
+# - test client 模式：直接在 process 內呼叫 app（沒有網路、序列化以外的開銷）
+# - HTTP 模式：在背景起一個 threaded werkzeug server，用 http.client 打 localhost
+# SQL 數量用 thread-local 計數：before_request 歸零、after_request 放到 X-Bench-SQL header，
+# 兩種模式都從 header 讀；串流回應（export）在 after_request 之後才查詢，只算得到開頭那幾條
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from .stats import summarize
+
+SQL_HEADER = "X-Bench-SQL"
+
+_local = threading.local()
+
+
+def install_sql_counter(app, engines):
+    """在 app 上掛每個請求的 SQL 計數（engines：要計數的所有 engine，含 replica）"""
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, "active", False):
+            _local.count += 1
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _count)
+
+    @app.before_request
+    def _reset_sql_count():
+        _local.active = True
+        _local.count = 0
+
+    @app.after_request
+    def _report_sql_count(response):
+        response.headers[SQL_HEADER] = str(getattr(_local, "count", 0))
+        _local.active = False
+        return response
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.app = app
+        self._clients = threading.local()
+
+    def request(self, method, path, body, headers):
+        client = getattr(self._clients, "client", None)
+        if client is None:
+            client = self._clients.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers)
+        response.get_data()
+        return response.status_code, response.headers.get(SQL_HEADER)
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    def __init__(self, app, host="127.0.0.1"):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server(
+            host, 0, app, threaded=True, request_handler=QuietHandler
+        )
+        self.host, self.port = host, self.server.server_port
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        self._conns = threading.local()
+
+    def request(self, method, path, body, headers):
+        conn = getattr(self._conns, "conn", None)
+        if conn is None:
+            conn = self._conns.conn = http.client.HTTPConnection(self.host, self.port)
+        headers = dict(headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            # 連線被 server 關掉就重連一次
+            conn.close()
+            conn = self._conns.conn = http.client.HTTPConnection(self.host, self.port)
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        return response.status, response.getheader(SQL_HEADER)
+
+    def close(self):
+        self.server.shutdown()
+
+
+def run_scenario(driver, scenario, ctx, *, requests=200, concurrency=8, seed_value=1):
+    """跑一個情境，回傳結果 dict"""
+    # 每個請求先決定好要打什麼，同一個 seed 每次打的網址都一樣
+    rng = random.Random(f"{seed_value}:{scenario.name}")
+    plan = [scenario.build(ctx, rng) for _ in range(requests)]
+    users = [u["user_id"] for u in ctx.dataset.users]
+    plan = [(path, body, rng.choice(users)) for path, body in plan]
+
+    latencies, sql_counts = [], []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(item):
+        path, body, user_id = item
+        headers = {}
+        if scenario.auth:
+            headers["Authorization"] = f"Bearer {ctx.tokens[user_id]}"
+        started = time.perf_counter()
+        status, sql = driver.request(scenario.method, path, body, headers)
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[status] += 1
+            latencies.append(elapsed)
+            if sql is not None:
+                sql_counts.append(int(sql))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, plan))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "method": scenario.method,
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": sum(v for k, v in statuses.items() if k >= 400),
+        "latency": summarize(latencies),
+        "sql_per_request": {
+            "mean": round(sum(sql_counts) / len(sql_counts), 2) if sql_counts else None,
+            "max": max(sql_counts) if sql_counts else None,
+        },
+    }
+    return result
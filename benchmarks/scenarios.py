@@ -0,0 +1,213 @@
+# benchmarks/scenarios.py
+# 每個 blueprint 的每個 route 各一個情境：決定要打哪個網址、帶什麼 body
+# build(ctx, rng) 回傳 (path, json_body)；json_body 是 None 代表沒有 body
+import itertools
+from dataclasses import dataclass
+from typing import Callable
+
+from .seed import PASSWORD, WORDS
+
+# 寫入類情境需要不重複的名稱（各 thread 共用，next() 在 GIL 下是原子的）
+_serial = itertools.count(1)
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    build: Callable
+    auth: bool = True
+    # 單一請求最多幾條 SQL（python -m benchmarks.explain 會檢查）；
+    # 跟回傳筆數無關的固定上限，列表多一筆就多一條查詢（N+1）時會超過
+    max_queries: int = None
+
+
+class Context:
+    """情境產生請求時需要的資料：seed 出來的 id、各使用者的 token"""
+
+    def __init__(self, dataset, tokens):
+        self.dataset = dataset
+        self.tokens = tokens
+
+    def project(self, rng):
+        return rng.choice(self.dataset.projects)
+
+    def content(self, rng):
+        return rng.choice(self.dataset.contents[self.project(rng)])
+
+    def tag(self, rng):
+        return rng.choice(self.dataset.tags)
+
+    def asset(self, rng):
+        return rng.choice(self.dataset.assets[self.project(rng)])
+
+
+def _word(rng):
+    return rng.choice(WORDS)
+
+
+def _register(ctx, rng):
+    n = next(_serial)
+    return "/api/auth/register", {
+        "email": f"bench-new-{n}@example.com",
+        "username": f"new{n}",
+        "password": PASSWORD,
+    }
+
+
+def _login(ctx, rng):
+    user = rng.choice(ctx.dataset.users)
+    return "/api/auth/login", {"email": user["email"], "password": PASSWORD}
+
+
+def _create_project(ctx, rng):
+    return "/api/projects", {"name": f"bench project new {next(_serial)}"}
+
+
+def _export(ctx, rng):
+    return f"/api/projects/{ctx.project(rng)}/export?format=ndjson", None
+
+
+def _summary(ctx, rng):
+    return f"/api/projects/{ctx.project(rng)}/summary", None
+
+
+def _list_contents(ctx, rng):
+    return f"/api/contents/project/{ctx.project(rng)}?limit=50", None
+
+
+def _create_content(ctx, rng):
+    return f"/api/contents/project/{ctx.project(rng)}", {
+        "title": f"{_word(rng)} {_word(rng)}",
+        "prompt": " ".join(_word(rng) for _ in range(15)),
+        "primary_type": "text",
+    }
+
+
+def _import(ctx, rng):
+    lines = [
+        {
+            "title": f"imported {_word(rng)}",
+            "prompt": " ".join(_word(rng) for _ in range(15)),
+            "tags": [_word(rng)],
+        }
+        for _ in range(20)
+    ]
+    return f"/api/contents/project/{ctx.project(rng)}/import", lines
+
+
+def _list_versions(ctx, rng):
+    return f"/api/versions/content/{ctx.content(rng)}", None
+
+
+def _create_version(ctx, rng):
+    return f"/api/versions/content/{ctx.content(rng)}", {
+        "prompt": " ".join(_word(rng) for _ in range(18)),
+    }
+
+
+def _diff(ctx, rng):
+    content_id = ctx.content(rng)
+    top = ctx.dataset.versions[content_id]
+    older = max(1, top - 1)
+    return f"/api/versions/content/{content_id}/diff?from={older}&to={top}", None
+
+
+def _list_tags(ctx, rng):
+    return f"/api/tags?q={_word(rng)[:3]}", None
+
+
+def _autocomplete(ctx, rng):
+    return f"/api/tags/autocomplete?q={_word(rng)[:2]}", None
+
+
+def _create_tag(ctx, rng):
+    return "/api/tags", {"name": f"new-tag-{next(_serial)}"}
+
+
+def _attach(ctx, rng):
+    return f"/api/tags/content/{ctx.content(rng)}", {
+        "tags": [ctx.tag(rng)[1], _word(rng)],
+    }
+
+
+def _bulk(ctx, rng):
+    ids = ctx.dataset.contents[ctx.project(rng)]
+    return "/api/tags/bulk", {
+        "content_ids": rng.sample(ids, min(50, len(ids))),
+        "tags": [ctx.tag(rng)[1]],
+    }
+
+
+def _content_tags(ctx, rng):
+    return f"/api/tags/content/{ctx.content(rng)}", None
+
+
+def _contents_by_tag(ctx, rng):
+    return f"/api/tags/{ctx.tag(rng)[0]}/contents", None
+
+
+def _search(ctx, rng):
+    return f"/api/search?q={_word(rng)}+{_word(rng)[:3]}*", None
+
+
+def _search_faceted(ctx, rng):
+    return (
+        f"/api/search?q={_word(rng)}&tag={ctx.tag(rng)[1]}"
+        "&facets=primary_type,source_tool,tag"
+    ), None
+
+
+def _search_history(ctx, rng):
+    return f"/api/search?scope=history&q={_word(rng)}+{_word(rng)}", None
+
+
+def _upload_asset(ctx, rng):
+    # driver 只會送 JSON，就把一份 JSON 當成檔案內容上傳；內容只有幾種，大多會命中去重
+    return f"/api/assets/project/{ctx.project(rng)}", {"sample": rng.randint(1, 5)}
+
+
+def _download_asset(ctx, rng):
+    return f"/api/assets/{ctx.asset(rng)}", None
+
+
+def _submit_job(ctx, rng):
+    # 只量送出（排進佇列）的成本；benchmark 不執行背景工作
+    return "/api/jobs", {
+        "type": "project-export",
+        "params": {"project_id": ctx.project(rng), "format": "ndjson"},
+    }
+
+
+def _list_jobs(ctx, rng):
+    return "/api/jobs?limit=20", None
+
+
+SCENARIOS = [
+    Scenario("auth.register", "POST", _register, auth=False, max_queries=2),
+    Scenario("auth.login", "POST", _login, auth=False, max_queries=1),
+    Scenario("projects.create", "POST", _create_project, max_queries=3),
+    Scenario("projects.export", "GET", _export, max_queries=5),
+    Scenario("projects.summary", "GET", _summary, max_queries=3),
+    Scenario("contents.list", "GET", _list_contents, max_queries=2),
+    Scenario("contents.create", "POST", _create_content, max_queries=15),
+    # SQLite 的 INSERT ... RETURNING 要照參數順序時一筆一條（content、content_version 各 20 條）
+    Scenario("contents.import", "POST", _import, max_queries=72),
+    Scenario("versions.list", "GET", _list_versions, max_queries=3),
+    Scenario("versions.create", "POST", _create_version, max_queries=12),
+    Scenario("versions.diff", "GET", _diff, max_queries=4),
+    Scenario("tags.list", "GET", _list_tags, max_queries=1),
+    Scenario("tags.autocomplete", "GET", _autocomplete, max_queries=1),
+    Scenario("tags.create", "POST", _create_tag, max_queries=3),
+    Scenario("tags.attach", "POST", _attach, max_queries=8),
+    Scenario("tags.bulk", "POST", _bulk, max_queries=7),
+    Scenario("tags.content_tags", "GET", _content_tags, max_queries=2),
+    Scenario("tags.contents_by_tag", "GET", _contents_by_tag, max_queries=2),
+    Scenario("search.query", "GET", _search, max_queries=2),
+    Scenario("search.faceted", "GET", _search_faceted, max_queries=3),
+    Scenario("search.history", "GET", _search_history, max_queries=3),
+    Scenario("jobs.submit", "POST", _submit_job, max_queries=2),
+    Scenario("assets.upload", "POST", _upload_asset, max_queries=3),
+    Scenario("assets.download", "GET", _download_asset, max_queries=1),
+    Scenario("jobs.list", "GET", _list_jobs, max_queries=1),
+]
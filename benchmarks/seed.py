@@ -0,0 +1,222 @@
+# benchmarks/seed.py
+# 產生 benchmark 用的合成資料（使用者、專案、content、版本、標籤、上傳的檔案）
+# 直接用 Core 的多筆 INSERT 寫入，主鍵自己指定，幾萬筆也只要幾秒；
+# 同一個 --seed 每次產生的資料都一樣，不同次的量測結果才能互相比較
+import io
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+WORDS = (
+    "sunset portrait cyberpunk city neon forest river mountain watercolor "
+    "anime studio cinematic lighting macro product logo minimal vintage poster "
+    "robot dragon ocean castle desert snow night market coffee cat dog bird "
+    "illustration render isometric pixel sketch oil painting character concept"
+).split()
+
+PASSWORD = "bench-pw"
+
+
+@dataclass
+class Dataset:
+    users: list = field(default_factory=list)          # [{"user_id", "email"}]
+    projects: list = field(default_factory=list)       # [project_id]
+    contents: dict = field(default_factory=dict)       # {project_id: [content_id]}
+    versions: dict = field(default_factory=dict)       # {content_id: version 數}
+    tags: list = field(default_factory=list)           # [(tag_id, name)]
+    assets: dict = field(default_factory=dict)         # {project_id: [sha256]}
+
+    def summary(self):
+        return {
+            "users": len(self.users),
+            "projects": len(self.projects),
+            "contents": sum(len(ids) for ids in self.contents.values()),
+            "versions": sum(self.versions.values()),
+            "tags": len(self.tags),
+            "assets": sum(len(s) for s in self.assets.values()),
+        }
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _chunks(rows, size=1000):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def reset_database(db):
+    """砍掉所有資料表（含全文索引、schema_version）再重新升級到最新 schema"""
+    from app import migrations, search_index
+
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {search_index.SEARCH_TABLE}"))
+    db.drop_all()
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {migrations.SCHEMA_VERSION_TABLE}"))
+    migrations.upgrade(db.engine)
+
+
+def seed(db, *, users=5, projects=4, contents_per_project=200,
+         versions_per_content=5, tags=100, tags_per_content=3, seed_value=1,
+         assets_per_project=3, asset_bytes=256 * 1024):
+    """
+    在空的資料庫裡產生一份資料，回傳 Dataset
+    所有使用者都是每個專案的成員（第一個使用者是 owner，其他是 editor）
+    """
+    from app import history_index, project_stats, search_index
+    from app.extensions import blob_store, password_hasher
+    from app.models import (
+        Asset, Content, ContentTag, ContentVersion, Project, ProjectAsset, ProjectMember,
+        PromptText, Tag, User, normalize_tag_name,
+    )
+    from app.prompt_store import prompt_hash
+
+    rng = random.Random(seed_value)
+    data = Dataset()
+    base_time = datetime(2024, 1, 1)
+    # 所有人共用同一個密碼雜湊，bcrypt 只算一次
+    pw_hash = password_hasher.hash_password(PASSWORD)
+
+    user_rows = [
+        {
+            "user_id": i,
+            "email": f"bench{i}@example.com",
+            "username": f"bench{i}",
+            "password_hash": pw_hash,
+            "created_at": base_time,
+        }
+        for i in range(1, users + 1)
+    ]
+    data.users = [{"user_id": r["user_id"], "email": r["email"]} for r in user_rows]
+
+    project_rows, member_rows = [], []
+    for p in range(1, projects + 1):
+        project_rows.append({
+            "project_id": p, "name": f"bench project {p}", "owner_id": 1,
+        })
+        for u in range(1, users + 1):
+            member_rows.append({
+                "project_id": p,
+                "user_id": u,
+                "role": "owner" if u == 1 else "editor",
+                "joined_at": base_time,
+            })
+    data.projects = [r["project_id"] for r in project_rows]
+
+    tag_rows = []
+    for t in range(1, tags + 1):
+        name = f"{rng.choice(WORDS)}-{t}"
+        tag_rows.append({
+            "tag_id": t,
+            "name": name,
+            "name_normalized": normalize_tag_name(name),
+            "created_by": 1,
+        })
+    data.tags = [(r["tag_id"], r["name"]) for r in tag_rows]
+
+    content_rows, version_rows, link_rows = [], [], []
+    prompt_texts = {}  # sha256 -> 文字
+    content_id = version_id = link_id = 0
+    for p in data.projects:
+        data.contents[p] = []
+        for _ in range(contents_per_project):
+            content_id += 1
+            created = base_time + timedelta(minutes=content_id)
+            prompt = _sentence(rng, 12)
+            for number in range(1, versions_per_content + 1):
+                version_id += 1
+                # 每一版在上一版後面多幾個字，跟實際改 prompt 的樣子比較像
+                prompt = f"{prompt} {_sentence(rng, 3)}"
+                sha256 = prompt_hash(prompt)
+                prompt_texts[sha256] = prompt
+                version_rows.append({
+                    "version_id": version_id,
+                    "content_id": content_id,
+                    "created_by": rng.randint(1, users),
+                    "version_number": number,
+                    "prompt_sha256": sha256,
+                    "created_at": created + timedelta(seconds=number),
+                })
+            content_rows.append({
+                "content_id": content_id,
+                "project_id": p,
+                "creator_user_id": rng.randint(1, users),
+                "latest_version_id": version_id,
+                "title": _sentence(rng, 4),
+                "primary_type": "text",
+                "source_tool": "bench",
+                "created_at": created,
+                "version_counter": versions_per_content,
+            })
+            if tag_rows:
+                picks = rng.sample(range(1, tags + 1), min(tags_per_content, tags))
+                for tag_id in picks:
+                    link_id += 1
+                    link_rows.append({
+                        "id": link_id, "content_id": content_id, "tag_id": tag_id,
+                    })
+            data.contents[p].append(content_id)
+            data.versions[content_id] = versions_per_content
+
+    # 檔案直接寫進 blob store（ASSET_STORE_DIR），資料表只記中繼資料
+    asset_rows, project_asset_rows = [], []
+    for p in data.projects:
+        data.assets[p] = []
+        for _ in range(assets_per_project):
+            sha256, size, _ = blob_store.save_stream(io.BytesIO(rng.randbytes(asset_bytes)))
+            asset_rows.append({
+                "sha256": sha256, "size": size, "content_type": "image/png",
+                "created_at": base_time,
+            })
+            project_asset_rows.append({
+                "sha256": sha256, "project_id": p, "created_by": 1, "created_at": base_time,
+            })
+            data.assets[p].append(sha256)
+
+    with db.engine.begin() as conn:
+        for model, rows in (
+            (User, user_rows),
+            (Project, project_rows),
+            (ProjectMember, member_rows),
+            (Tag, tag_rows),
+            # content.latest_version_id 指向 content_version，先寫 content 時不檢查；
+            # SQLite 預設不開外鍵檢查，Postgres 上這個 FK 沒有 deferrable，所以先寫 NULL 再補
+            (Content, [dict(r, latest_version_id=None) for r in content_rows]),
+            (PromptText, [{"sha256": h, "text": t} for h, t in prompt_texts.items()]),
+            (ContentVersion, version_rows),
+            (ContentTag, link_rows),
+            (Asset, asset_rows),
+            (ProjectAsset, project_asset_rows),
+        ):
+            for chunk in _chunks(rows):
+                conn.execute(insert(model), chunk)
+
+        for chunk in _chunks(content_rows):
+            conn.execute(
+                text("UPDATE content SET latest_version_id = :v WHERE content_id = :c"),
+                [{"v": r["latest_version_id"], "c": r["content_id"]} for r in chunk],
+            )
+
+        if conn.dialect.name == "postgresql":
+            # 主鍵是自己指定的，sequence 要跟上，之後 API 新增的資料才不會撞號
+            for table, pk in (
+                ("user", "user_id"), ("project", "project_id"),
+                ("project_member", "id"), ("tag", "tag_id"),
+                ("content", "content_id"), ("content_version", "version_id"),
+                ("content_tag", "id"),
+            ):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', '{pk}'), "
+                    f"coalesce((SELECT max({pk}) FROM \"{table}\"), 1))"
+                ))
+
+        if search_index.has_search_index(conn):
+            search_index.rebuild(conn)
+        history_index.rebuild(conn)
+        project_stats.rebuild(conn)
+
+    return data
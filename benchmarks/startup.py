@@ -0,0 +1,102 @@
+# benchmarks/startup.py
+# 冷啟動時間：每一輪開一個全新的 Python process，量
+#   import app → create_app() → 第一個請求（/api/health，不碰資料庫）
+#   → 第一個要查資料庫的請求（/api/tags，含 schema 版本檢查）
+# 模擬 pre-fork worker / autoscaling 新開機器時，多久才能開始服務
+#
+# 用法：
+#     python -m benchmarks.startup --runs 10
+#     DATABASE_URL=postgresql://... python -m benchmarks.startup
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD_FLAG = "--child"
+
+
+def _child():
+    """在新 process 裡量各階段時間，結果以 JSON 印到 stdout"""
+    import time
+
+    t0 = time.perf_counter()
+    from app import create_app
+    t1 = time.perf_counter()
+    app = create_app()
+    t2 = time.perf_counter()
+
+    client = app.test_client()
+    client.get("/api/health")
+    t3 = time.perf_counter()
+
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1")
+    t4 = time.perf_counter()
+    status = client.get("/api/tags", headers={"Authorization": f"Bearer {token}"}).status_code
+    t5 = time.perf_counter()
+
+    print(json.dumps({
+        "import_s": t1 - t0,
+        "create_app_s": t2 - t1,
+        "first_request_s": t3 - t2,
+        "first_db_request_s": t5 - t4,
+        "total_s": (t3 - t0) + (t5 - t4),
+        "db_request_status": status,
+    }))
+
+
+def _prepare_database():
+    from app import create_app, migrations
+    from app.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine)
+
+
+def _stats(values):
+    return {
+        "median_ms": round(statistics.median(values) * 1000, 2),
+        "min_ms": round(min(values) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="冷啟動時間量測")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "startup_bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    _prepare_database()
+
+    runs = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", _CHILD_FLAG],
+            capture_output=True, text=True, check=True, env=os.environ.copy(),
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+
+    phases = ("import_s", "create_app_s", "first_request_s", "first_db_request_s", "total_s")
+    report = {
+        "runs": args.runs,
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "db_request_status": sorted({r["db_request_status"] for r in runs}),
+    }
+    report.update({phase[:-2]: _stats([r[phase] for r in runs]) for phase in phases})
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    if _CHILD_FLAG in sys.argv:
+        _child()
+    else:
+        sys.exit(main())
@@ -0,0 +1,25 @@
+# benchmarks/stats.py
+# 延遲統計的小工具（各個 benchmark 共用）
+
+
+def percentile(values, pct):
+    """最近秩（nearest-rank）百分位數；values 可以沒排序"""
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def summarize(latencies):
+    """秒為單位的延遲 → {count, p50_ms, p95_ms, p99_ms, max_ms}"""
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "count": len(latencies),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(max(latencies) if latencies else None),
+    }
@@ -0,0 +1,110 @@
+# benchmarks/version_stress.py
+# 並行新增版本的壓力測試：很多 thread 同時對同一個 content 發版本，
+# 檢查版號沒有重複、沒有跳號，而且 latest_version_id 指向最大版號
+#
+# 用法：
+#     python -m benchmarks.version_stress --threads 16 --per-thread 25
+#     DATABASE_URL=postgresql://... python -m benchmarks.version_stress
+# 沒設定 DATABASE_URL 時使用暫存的 SQLite 檔
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="並行新增版本的壓力測試")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--per-thread", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "version_stress.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}?timeout=30"
+
+    from app import create_app, migrations
+    from app.extensions import db
+    from app.models import Content, ContentVersion, ProjectStats
+
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine)
+    client = app.test_client()
+
+    email = f"stress-{time.time_ns()}@example.com"
+    client.post("/api/auth/register", json={
+        "email": email, "username": "stress", "password": "stress-pw",
+    })
+    token = client.post("/api/auth/login", json={
+        "email": email, "password": "stress-pw",
+    }).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    project_id = client.post(
+        "/api/projects", json={"name": "stress"}, headers=headers
+    ).get_json()["id"]
+    content_id = client.post(
+        f"/api/contents/project/{project_id}",
+        json={"title": "stress", "prompt": "v1"},
+        headers=headers,
+    ).get_json()["content_id"]
+
+    statuses = Counter()
+    lock = threading.Lock()
+    start_gate = threading.Barrier(args.threads)
+
+    def worker(n):
+        c = app.test_client()
+        start_gate.wait()
+        for i in range(args.per_thread):
+            r = c.post(
+                f"/api/versions/content/{content_id}",
+                json={"prompt": f"thread {n} version {i}"},
+                headers=headers,
+            )
+            with lock:
+                statuses[r.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        numbers = db.session.scalars(
+            db.select(ContentVersion.version_number)
+            .where(ContentVersion.content_id == content_id)
+        ).all()
+        content = db.session.get(Content, content_id)
+        latest = db.session.get(ContentVersion, content.latest_version_id)
+        # 專案統計的版本數是並行累加的，要跟實際筆數一樣
+        stats = db.session.get(ProjectStats, content.project_id)
+
+    created = statuses[201]
+    duplicates = [n for n, k in Counter(numbers).items() if k > 1]
+    expected = list(range(1, created + 2))
+    ok = (
+        not duplicates
+        and sorted(numbers) == expected
+        and latest.version_number == max(numbers)
+        and content.version_counter == max(numbers)
+        and stats is not None and stats.version_count == len(numbers)
+    )
+
+    print(f"requests: {sum(statuses.values())}  status: {dict(statuses)}")
+    print(f"elapsed: {elapsed:.2f}s  ({sum(statuses.values()) / elapsed:.1f} req/s)")
+    print(f"versions: {len(numbers)}  duplicates: {duplicates}")
+    print(f"latest version_number: {latest.version_number}  counter: {content.version_counter}")
+    print(f"project_stats.version_count: {stats.version_count if stats else None}")
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
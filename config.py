@@ -8,8 +8,94 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 唯讀 replica（逗號分隔，可以多台）；GET 請求的查詢會分到這些資料庫
+    REPLICA_DATABASE_URLS = [
+        url.strip()
+        for url in os.getenv("REPLICA_DATABASE_URLS", "").split(",")
+        if url.strip()
+    ]
+    # 寫入 commit 後幾秒內 replica 視為落後，同一個用戶端（cookie）的讀取仍走 primary
+    REPLICA_STALE_SECONDS = float(os.getenv("REPLICA_STALE_SECONDS", "2"))
+
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-key")
 
+    # bcrypt cost（改了之後，舊密碼會在登入成功時重新雜湊）
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", "12"))
+    # 雜湊專用 thread 數、排隊上限（超過回 503）、等待秒數
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "0")) or None
+    BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "0")) or None
+    BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", "10"))
+
+    # 單條 SQL 超過幾毫秒就記 log（含 SQL 原文）；0 = 不記
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+    # GET /api/metrics 要帶 Authorization: Bearer <METRICS_TOKEN>
+    # 沒設定時只接受本機直接連線（沒有 X-Forwarded-For 的 127.0.0.1 / ::1）
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # 第一個請求時檢查資料庫 schema 版本（部署流程保證先跑 flask db-upgrade 的話可以關掉）
+    SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "1") not in ("0", "false")
+
     PG_SCHEMA = os.getenv("PG_SCHEMA", "g9")
 
+    # 全文檢索用的 Postgres text search config（中英混合建議用 simple）
+    SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+    # 歷史版本搜尋（?scope=history）每個 content 最多列出幾個命中的版本
+    HISTORY_SEARCH_MAX_VERSIONS = int(os.getenv("HISTORY_SEARCH_MAX_VERSIONS", "20"))
+    # 搜尋的 ?facets=tag 最多列出幾個標籤
+    SEARCH_FACET_TOP_TAGS = int(os.getenv("SEARCH_FACET_TOP_TAGS", "20"))
+
+    # JSON 輸出：auto（有 orjson 就用）/ orjson / stdlib
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")
+
+    # 列表 API 的分頁大小（?limit= 的預設值與上限）
+    PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+    PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "200"))
+
+    # 專案統計（/api/projects/<id>/summary）最多列出幾個標籤
+    PROJECT_SUMMARY_TOP_TAGS = int(os.getenv("PROJECT_SUMMARY_TOP_TAGS", "50"))
+
+    # 專案成員權限快取（秒 / 最多幾個使用者）
+    # 快取在每個 process 裡：成員異動只會立刻清掉處理那個請求的 process，
+    # 其他 worker 最久 AUTHZ_CACHE_TTL 秒後才看到（被移除的成員在這段時間內還能讀寫）；
+    # 需要立即撤銷權限時調低這個值，設 0 等於不快取（每個請求多一條 SQL）
+    AUTHZ_CACHE_TTL = float(os.getenv("AUTHZ_CACHE_TTL", "30"))
+    AUTHZ_CACHE_SIZE = int(os.getenv("AUTHZ_CACHE_SIZE", "10000"))
+
+    # 標籤自動完成索引多久從資料庫整個重新載入一次（秒）
+    TAG_INDEX_REFRESH = float(os.getenv("TAG_INDEX_REFRESH", "300"))
+
+    # 背景工作預設在 web process 裡執行（收到第一個請求時啟動 runner）；
+    # 多個 process 各跑一份也沒關係，同時執行數的上限是所有 process 合計
+    # 正式環境想把工作跟請求分開：設 JOBS_RUN_IN_APP=0，另外跑 `flask jobs-worker`
+    # JOBS_WORKERS 是每個 runner 的 thread 數
+    JOBS_RUN_IN_APP = os.getenv("JOBS_RUN_IN_APP", "1") not in ("0", "false")
+    JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+    # 多久檢查一次佇列、heartbeat 超過幾秒視為 process 中斷、第一次重試前等幾秒（之後加倍）
+    JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "2"))
+    JOBS_STALE_SECONDS = float(os.getenv("JOBS_STALE_SECONDS", "300"))
+    JOBS_RETRY_DELAY = float(os.getenv("JOBS_RETRY_DELAY", "10"))
+    # 匯出等工作產生的檔案放在哪裡（預設 instance/job-results）
+    JOBS_RESULT_DIR = os.getenv("JOBS_RESULT_DIR")
+    # 背景工作 tags-bulk 一次最多幾個 content
+    JOBS_BULK_TAG_MAX = int(os.getenv("JOBS_BULK_TAG_MAX", "100000"))
+
+    # 上傳的檔案（內容定址）放在哪裡（預設 instance/assets）、單一檔案上限（bytes，0 = 不限）
+    ASSET_STORE_DIR = os.getenv("ASSET_STORE_DIR")
+    ASSET_MAX_BYTES = int(os.getenv("ASSET_MAX_BYTES", str(100 * 1024 * 1024)))
+    # 前面有 nginx 時，下載改用 X-Accel-Redirect 交給 nginx 送檔（internal location 的前綴，例如 /_assets）
+    ASSET_X_ACCEL_PREFIX = os.getenv("ASSET_X_ACCEL_PREFIX")
+
+    # 大量匯入每批寫幾筆
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+    # prompt 儲存方式：full（每版完整文字）/ delta（快照 + 差異）
+    PROMPT_STORAGE = os.getenv("PROMPT_STORAGE", "full")
+    # delta 模式下每幾版保留一份完整快照
+    PROMPT_SNAPSHOT_INTERVAL = int(os.getenv("PROMPT_SNAPSHOT_INTERVAL", "10"))
+    # 新版本的 prompt 除了 prompt_text 之外，content_version.prompt 也留一份
+    # 從第 7 版以前的程式滾動升級時分兩階段：
+    #   1. 升級期間設 PROMPT_INLINE_COPY=1，還沒換掉的舊程式讀得到新版本的 prompt
+    #   2. 舊程式都下線後拿掉這個設定，再跑 `flask prompts-drop-inline` 清掉既有的 inline 文字
+    PROMPT_INLINE_COPY = os.getenv("PROMPT_INLINE_COPY", "0") in ("1", "true")
+
 
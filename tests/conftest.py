@@ -0,0 +1,50 @@
+# tests/conftest.py
+# 共用的 fixture：暫存的 SQLite 資料庫、升級到最新 schema 的 app、登入好的 test client
+# 設定在 import config 時就讀進來，環境變數要在 import app 之前設好
+import os
+import tempfile
+import uuid
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="app-tests-")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(_DB_DIR, "test.db"))
+os.environ.setdefault("BCRYPT_LOG_ROUNDS", "4")
+os.environ.setdefault("JOBS_RUN_IN_APP", "0")
+
+from app import create_app, migrations  # noqa: E402
+from app.extensions import db  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine)
+    return app
+
+
+@pytest.fixture(scope="session")
+def engine(app):
+    with app.app_context():
+        return db.engine
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    """註冊一個新使用者並登入，回傳帶 JWT 的 header"""
+    email = f"{uuid.uuid4().hex}@example.com"
+    client.post("/api/auth/register", json={"email": email, "username": "u", "password": "pw"})
+    response = client.post("/api/auth/login", json={"email": email, "password": "pw"})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def project_id(client, auth_headers):
+    response = client.post("/api/projects", json={"name": "p"}, headers=auth_headers)
+    return response.get_json()["id"]
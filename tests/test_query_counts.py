@@ -0,0 +1,86 @@
+# tests/test_query_counts.py
+# N+1 回歸測試：列表 API 送出的 SQL 條數固定，不隨資料筆數增加
+# 每個情境用不同筆數各跑一次，SQL 條數要一樣，而且不超過上限
+# （權限快取先用一個請求暖好，量的是一般請求的條數）
+import uuid
+
+from app.query_counter import assert_max_queries
+
+SIZES = (1, 25)
+
+# 權限已經快取時各 API 的 SQL 上限（跟 benchmarks/scenarios.py 的 max_queries 一樣）
+CONTENTS_LIST_MAX = 2
+CONTENT_TAGS_MAX = 2
+CONTENTS_BY_TAG_MAX = 2
+
+
+def _import(client, headers, project_id, items):
+    response = client.post(
+        f"/api/contents/project/{project_id}/import", json=items, headers=headers
+    )
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["imported"] == len(items)
+
+
+def _measure(engine, client, headers, path, max_count):
+    assert client.get(path, headers=headers).status_code == 200
+    with assert_max_queries(engine, max_count) as counter:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return counter.count, response.get_json()
+
+
+def test_list_project_contents(engine, client, auth_headers, project_id):
+    counts = set()
+    seeded = 0
+    for size in SIZES:
+        _import(client, auth_headers, project_id, [
+            {"title": f"c{i}", "prompt": f"prompt {i}", "tags": [f"t{i}", "shared"]}
+            for i in range(size - seeded)
+        ])
+        seeded = size
+        count, body = _measure(
+            engine, client, auth_headers,
+            f"/api/contents/project/{project_id}?limit=200&fields=title,latest_version",
+            CONTENTS_LIST_MAX,
+        )
+        assert len(body["items"]) == size
+        counts.add(count)
+    assert len(counts) == 1, f"SQL 條數隨筆數改變：{sorted(counts)}"
+
+
+def test_list_content_tags(engine, client, auth_headers, project_id):
+    counts = set()
+    for size in SIZES:
+        _import(client, auth_headers, project_id, [
+            {"title": f"tagged-{size}", "tags": [f"tag-{size}-{i}" for i in range(size)]}
+        ])
+        listing = client.get(
+            f"/api/contents/project/{project_id}?limit=1", headers=auth_headers
+        ).get_json()
+        content_id = listing["items"][0]["content_id"]
+        count, body = _measure(
+            engine, client, auth_headers, f"/api/tags/content/{content_id}", CONTENT_TAGS_MAX
+        )
+        assert len(body) == size
+        counts.add(count)
+    assert len(counts) == 1, f"SQL 條數隨標籤數改變：{sorted(counts)}"
+
+
+def test_list_contents_by_tag(engine, client, auth_headers, project_id):
+    tag = f"by-tag-{uuid.uuid4().hex[:8]}"
+    counts = set()
+    seeded = 0
+    for size in SIZES:
+        _import(client, auth_headers, project_id, [
+            {"title": f"c{i}", "tags": [tag]} for i in range(size - seeded)
+        ])
+        seeded = size
+        tags = client.get(f"/api/tags?q={tag}", headers=auth_headers).get_json()["items"]
+        count, body = _measure(
+            engine, client, auth_headers,
+            f"/api/tags/{tags[0]['tag_id']}/contents?limit=200", CONTENTS_BY_TAG_MAX,
+        )
+        assert len(body["contents"]) == size
+        counts.add(count)
+    assert len(counts) == 1, f"SQL 條數隨筆數改變：{sorted(counts)}"
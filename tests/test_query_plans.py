@@ -0,0 +1,22 @@
+# tests/test_query_plans.py
+# 把 benchmarks/explain.py 的檢查放進測試：每個情境的 SQL 都 EXPLAIN，大表不能全表掃描、
+# 每個請求的 SQL 條數不能超過情境的 max_queries
+# 只在 DATABASE_URL 是 Postgres 時跑（CI 用拋棄式資料庫，會整個清空）：
+#     DATABASE_URL=postgresql://ci@localhost/ci python -m pytest tests
+# SQLite 上的同一套檢查用 `python -m benchmarks.explain`
+import os
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("DATABASE_URL", "").startswith("postgresql"),
+    reason="查詢計畫檢查只在 DATABASE_URL 是 Postgres 時跑",
+)
+
+
+def test_no_full_scans_or_query_budget_overruns():
+    from benchmarks import explain
+
+    report = explain.run(["--reset"])
+    assert report is not None
+    assert report.ok, report.format()